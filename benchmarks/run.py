@@ -0,0 +1,262 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from PIL import Image
+
+from benchmarks.synthetic import FLOORPLAN_SIZES, LAYOUTS, generate_measurements
+from core.grid_cache import grid_cache
+from core.interpolation import INTERPOLATION_WORKERS
+from gui.heatmap import HeatmapGenerator
+from gui.wifi_app import WifiMapApp
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+
+# Limite de pontos por benchmark: acima disso o caso é pulado para a suíte terminar em tempo razoável
+DEFAULT_LIMITS = {
+    'interpolate': 10000,
+    'process_image_data': 100000,
+    'render_export': 2000,
+    'gradient_color': 10000,
+    'points_tree': 100000,
+}
+
+
+class _FakeTree:
+    # Substitui o ttk.Treeview para medir só o custo do lado Python sem precisar de display
+    def __init__(self):
+        self._items = {}
+        self._next_id = 0
+
+    def get_children(self):
+        return tuple(self._items)
+
+    def delete(self, *items):
+        for item in items:
+            del self._items[item]
+
+    def item(self, iid, values=()):
+        self._items[iid] = values
+
+    def insert(self, parent, index, values=()):
+        self._next_id += 1
+        self._items[self._next_id] = values
+        return self._next_id
+
+
+def _grid_args(generator, measurements):
+    x_coords, y_coords, dbm_values, _ = generator._process_image_data(measurements)
+    xi = np.linspace(min(x_coords) - 10, max(x_coords) + 10, 100)
+    yi = np.linspace(min(y_coords) - 10, max(y_coords) + 10, 100)
+    Xi, Yi = np.meshgrid(xi, yi)
+    return xi, yi, Xi, Yi, x_coords, y_coords, dbm_values
+
+
+def bench_interpolate(generator, measurements, image_path):
+    args = _grid_args(generator, measurements)
+
+    def run():
+        # Mede a interpolação em si, não o acerto no cache de grades
+        grid_cache.clear()
+        generator._interpolate_data(*args)
+    return run
+
+
+def bench_process_image_data(generator, measurements, image_path):
+    return lambda: generator._process_image_data(measurements)
+
+
+def bench_render_export(generator, measurements, image_path):
+    x_coords, y_coords, dbm_values, labels = generator._process_image_data(measurements)
+
+    def run():
+        grid_cache.clear()
+        fig, ax = generator._create_plot_with_image(x_coords, y_coords, dbm_values, labels, "bench", image_path)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+        plt.close(fig)
+    return run
+
+
+def _fake_app(measurements):
+    app = SimpleNamespace(
+        measurements={'Local': measurements},
+        image_points={name: m['coordinates'] for name, m in measurements.items()},
+        viewer=SimpleNamespace(base_scale=1.0),
+        tree=_FakeTree(),
+        _tree_items={},
+        _walk_rows={},
+    )
+    app._add_tree_rows = lambda rows: WifiMapApp._add_tree_rows(app, rows)
+    return app
+
+
+def bench_gradient_color(generator, measurements, image_path):
+    app = _fake_app(measurements)
+    # Recolorir alguns pontos espalhados, como após uma sequência de medições
+    names = list(measurements)[::max(1, len(measurements) // 20)]
+
+    def run():
+        for name in names:
+            WifiMapApp._calculate_gradient_color(app, name, '#FF0000')
+    return run
+
+
+def bench_points_tree(generator, measurements, image_path):
+    app = _fake_app(measurements)
+    app.measurements = measurements
+    return lambda: WifiMapApp.update_points_tree(app)
+
+
+BENCHMARKS = {
+    'interpolate': bench_interpolate,
+    'process_image_data': bench_process_image_data,
+    'render_export': bench_render_export,
+    'gradient_color': bench_gradient_color,
+    'points_tree': bench_points_tree,
+}
+
+
+def _floorplan_image(name, directory):
+    path = os.path.join(directory, f"planta_{name}.png")
+    if not os.path.exists(path):
+        Image.new('RGB', FLOORPLAN_SIZES[name], 'white').save(path)
+    return path
+
+
+def time_callable(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def run_suite(benchmarks, layouts, sizes, floorplans, repeat, limits, seed=0, verbose=True, workers=None):
+    generator = HeatmapGenerator(None)
+    if workers is not None:
+        generator.interpolation_workers = workers
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for floorplan in floorplans:
+            image_path = _floorplan_image(floorplan, directory)
+            for layout in layouts:
+                for size in sizes:
+                    measurements = generate_measurements(layout, size, floorplan, seed)
+                    for name in benchmarks:
+                        if size > limits.get(name, size):
+                            continue
+                        func = BENCHMARKS[name](generator, measurements, image_path)
+                        samples = time_callable(func, repeat)
+                        result = {
+                            'benchmark': name,
+                            'layout': layout,
+                            'points': size,
+                            'floorplan': floorplan,
+                            'repeat': repeat,
+                            'best_ms': min(samples),
+                            'median_ms': statistics.median(samples),
+                            'mean_ms': statistics.fmean(samples),
+                        }
+                        results.append(result)
+                        if verbose:
+                            print(f"{name:20} {layout:7} {floorplan:8} {size:>7} pts  "
+                                  f"best {result['best_ms']:10.2f} ms  median {result['median_ms']:10.2f} ms",
+                                  file=sys.stderr)
+    return results
+
+
+def _key(result):
+    return result['benchmark'], result['layout'], result['points'], result['floorplan']
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {_key(r): r for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get(_key(result))
+        if previous is None or previous['best_ms'] <= 0:
+            continue
+        ratio = result['best_ms'] / previous['best_ms']
+        result['baseline_best_ms'] = previous['best_ms']
+        result['ratio'] = ratio
+        if ratio > threshold:
+            regressions.append(result)
+    return regressions
+
+
+def _csv_list(value, cast=str):
+    return [cast(item) for item in value.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos críticos do mapa de calor")
+    parser.add_argument('--benchmarks', type=_csv_list, default=list(BENCHMARKS))
+    parser.add_argument('--layouts', type=_csv_list, default=list(LAYOUTS))
+    parser.add_argument('--sizes', type=lambda v: _csv_list(v, int), default=list(DEFAULT_SIZES))
+    parser.add_argument('--floorplans', type=_csv_list, default=['pequena'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=INTERPOLATION_WORKERS,
+                        help="threads da interpolação IDW")
+    parser.add_argument('--limit', action='append', default=[], metavar='BENCH=N',
+                        help="limite de pontos para um benchmark, ex.: interpolate=1000")
+    parser.add_argument('--output', help="arquivo JSON de resultados (padrão: stdout)")
+    parser.add_argument('--baseline', help="resultados anteriores para detectar regressões")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="razão máxima aceita em relação ao baseline")
+    args = parser.parse_args(argv)
+
+    limits = dict(DEFAULT_LIMITS)
+    for item in args.limit:
+        name, value = item.split('=', 1)
+        limits[name] = int(value)
+
+    results = run_suite(args.benchmarks, args.layouts, args.sizes, args.floorplans,
+                        args.repeat, limits, args.seed, workers=args.workers)
+
+    regressions = compare(results, args.baseline, args.threshold) if args.baseline else []
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'limits': limits,
+            'workers': args.workers,
+        },
+        'results': results,
+        'regressions': [_key(r) for r in regressions],
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    for result in regressions:
+        print(f"REGRESSÃO: {result['benchmark']} {result['layout']} {result['points']} pts "
+              f"{result['ratio']:.2f}x mais lento", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import numpy as np
+
+from core.utils import signal_dbm_to_percent
+
+FLOORPLAN_SIZES = {
+    'pequena': (600, 400),
+    'media': (2000, 1400),
+    'grande': (8000, 6000),
+}
+
+LAYOUTS = ('random', 'grid', 'walk')
+
+
+def random_layout(n, width, height, rng):
+    return rng.uniform(0, width, n), rng.uniform(0, height, n)
+
+
+def grid_layout(n, width, height, rng=None):
+    cols = max(1, int(np.ceil(np.sqrt(n * width / height))))
+    rows = max(1, int(np.ceil(n / cols)))
+    xs = (np.arange(cols) + 0.5) * width / cols
+    ys = (np.arange(rows) + 0.5) * height / rows
+    gx, gy = np.meshgrid(xs, ys)
+    return gx.ravel()[:n], gy.ravel()[:n]
+
+
+def walk_layout(n, width, height, rng):
+    # Caminhada aleatória com passos curtos, como em uma pesquisa andando pelo local
+    step = max(width, height) / 200
+    angles = np.cumsum(rng.normal(0, 0.3, n))
+    xs = np.empty(n)
+    ys = np.empty(n)
+    x, y = width / 2, height / 2
+    for i in range(n):
+        x = min(max(x + step * np.cos(angles[i]), 0), width)
+        y = min(max(y + step * np.sin(angles[i]), 0), height)
+        xs[i] = x
+        ys[i] = y
+    return xs, ys
+
+
+def synthetic_dbm(xs, ys, width, height, rng, access_points=3):
+    # Modelo log-distância com alguns APs e ruído de sombreamento
+    ap_x = rng.uniform(0, width, access_points)
+    ap_y = rng.uniform(0, height, access_points)
+    scale = max(width, height) / 30
+    distances = np.hypot(xs[:, None] - ap_x[None, :], ys[:, None] - ap_y[None, :]) / scale
+    rssi = -30 - 30 * np.log10(np.maximum(distances, 0.1) + 1)
+    rssi = rssi.max(axis=1) + rng.normal(0, 3, len(xs))
+    return np.clip(np.round(rssi), -95, -25).astype(int)
+
+
+def generate_survey(layout, n, floorplan='pequena', seed=0):
+    width, height = FLOORPLAN_SIZES[floorplan]
+    rng = np.random.default_rng(seed)
+    generator = {'random': random_layout, 'grid': grid_layout, 'walk': walk_layout}[layout]
+    xs, ys = generator(n, width, height, rng)
+    return xs, ys, synthetic_dbm(xs, ys, width, height, rng)
+
+
+def generate_measurements(layout, n, floorplan='pequena', seed=0):
+    xs, ys, dbms = generate_survey(layout, n, floorplan, seed)
+    measurements = {}
+    for i, (x, y, dbm) in enumerate(zip(xs.tolist(), ys.tolist(), dbms.tolist())):
+        measurements[f"Ponto {i + 1}"] = {
+            'dbm': dbm,
+            'percent': signal_dbm_to_percent(dbm),
+            'timestamp': "12:00:00",
+            'coordinates': (int(x), int(y)),
+        }
+    return measurements
@@ -0,0 +1,154 @@
+import numpy as np
+
+from core.interpolation import MAX_BLOCK_ELEMENTS
+from core.utils import DBM_COLOR_STOPS
+
+# Limites da classificação do README: -80, -70, -60, -50 e -40 dBm
+COVERAGE_THRESHOLDS = [dbm for dbm, _ in DBM_COLOR_STOPS[:-1]]
+DEAD_ZONE_DBM = -75
+
+# Quantos vizinhos medidos entram na estimativa de variação local
+UNCERTAINTY_NEIGHBORS = 4
+UNCERTAINTY_SPREAD_DB = 10.0
+
+# Variações menores que isso entre duas medições são tratadas como ruído
+CHANGE_THRESHOLD_DB = 3.0
+
+
+def coverage_by_threshold(grid, thresholds=None):
+    # Percentual da área interpolada com sinal >= cada limite
+    grid = np.asarray(grid, dtype=np.float64)
+    finite = grid[np.isfinite(grid)]
+    if thresholds is None:
+        thresholds = COVERAGE_THRESHOLDS
+    if finite.size == 0:
+        return [(dbm, 0.0) for dbm in thresholds]
+    return [(dbm, float((finite >= dbm).mean() * 100)) for dbm in thresholds]
+
+
+def label_components(mask):
+    # Rotulagem 4-conexa por segmentos de linha + union-find (sem scipy)
+    mask = np.asarray(mask, dtype=bool)
+    labels = np.zeros(mask.shape, dtype=np.int32)
+    parent = [0]
+
+    def find(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    previous_runs = []
+    for row in range(mask.shape[0]):
+        padded = np.concatenate(([False], mask[row], [False])).astype(np.int8)
+        edges = np.flatnonzero(np.diff(padded))
+        runs = []
+        for start, stop in zip(edges[::2].tolist(), edges[1::2].tolist()):
+            label = len(parent)
+            parent.append(label)
+            for p_start, p_stop, p_label in previous_runs:
+                if p_start < stop and start < p_stop:
+                    a, b = find(label), find(p_label)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+            labels[row, start:stop] = label
+            runs.append((start, stop, label))
+        previous_runs = runs
+
+    if len(parent) == 1:
+        return labels, 0
+    roots = np.array([find(a) for a in range(len(parent))], dtype=np.int32)
+    _, compact = np.unique(roots, return_inverse=True)
+    return compact.astype(np.int32)[labels], int(compact.max())
+
+
+def dead_zones(grid, xi, yi, threshold=DEAD_ZONE_DBM, min_cells=1):
+    grid = np.asarray(grid, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        labels, count = label_components(grid < threshold)
+
+    total = max(1, int(np.isfinite(grid).sum()))
+    sizes = np.bincount(labels.ravel(), minlength=count + 1)
+    rows, cols = np.indices(grid.shape)
+    row_sum = np.bincount(labels.ravel(), weights=rows.ravel(), minlength=count + 1)
+    col_sum = np.bincount(labels.ravel(), weights=cols.ravel(), minlength=count + 1)
+    minimum = np.full(count + 1, np.inf)
+    np.minimum.at(minimum, labels.ravel(), grid.ravel())
+
+    zones = []
+    for label in range(1, count + 1):
+        if sizes[label] < min_cells:
+            continue
+        zones.append({
+            'label': label,
+            'cells': int(sizes[label]),
+            'area_percent': float(sizes[label] * 100.0 / total),
+            'centroid': (float(np.interp(col_sum[label] / sizes[label], np.arange(len(xi)), xi)),
+                         float(np.interp(row_sum[label] / sizes[label], np.arange(len(yi)), yi))),
+            'min_dbm': float(minimum[label]),
+        })
+    zones.sort(key=lambda zone: zone['cells'], reverse=True)
+    return labels, zones
+
+
+def uncertainty_map(x_coords, y_coords, values, xi, yi):
+    # O IDW não dá variância; usamos a distância ao ponto medido mais próximo,
+    # ampliada onde os vizinhos medidos discordam entre si
+    xs = np.asarray(x_coords, dtype=np.float64)
+    ys = np.asarray(y_coords, dtype=np.float64)
+    vs = np.asarray(values, dtype=np.float64)
+    xi = np.asarray(xi, dtype=np.float64)
+    yi = np.asarray(yi, dtype=np.float64)
+
+    result = np.empty((len(yi), len(xi)), dtype=np.float64)
+    if len(xs) == 0:
+        result.fill(np.inf)
+        return result
+
+    k = min(UNCERTAINTY_NEIGHBORS, len(xs))
+    rows_per_block = max(1, MAX_BLOCK_ELEMENTS // max(1, len(xi) * len(xs)))
+    dx2 = (xi[:, None] - xs[None, :]) ** 2
+
+    for start in range(0, len(yi), rows_per_block):
+        stop = min(start + rows_per_block, len(yi))
+        dy2 = (yi[start:stop, None] - ys[None, :]) ** 2
+        distances = np.sqrt(dy2[:, None, :] + dx2[None, :, :])
+
+        nearest = np.argpartition(distances, k - 1, axis=2)[..., :k]
+        nearest_distance = np.take_along_axis(distances, nearest, axis=2).min(axis=2)
+        spread = vs[nearest].std(axis=2)
+        result[start:stop] = nearest_distance * (1.0 + spread / UNCERTAINTY_SPREAD_DB)
+    return result
+
+
+def suggest_next_point(x_coords, y_coords, values, xi, yi):
+    uncertainty = uncertainty_map(x_coords, y_coords, values, xi, yi)
+    row, col = np.unravel_index(np.argmax(uncertainty), uncertainty.shape)
+    return float(xi[col]), float(yi[row]), float(uncertainty[row, col])
+
+
+def compare_grids(before, after, threshold=CHANGE_THRESHOLD_DB, dead_zone=DEAD_ZONE_DBM):
+    # Diferença com sinal (depois - antes) na mesma grade; positivo = sinal melhorou
+    before = np.asarray(before, dtype=np.float64)
+    after = np.asarray(after, dtype=np.float64)
+    diff = after - before
+    finite = np.isfinite(diff)
+    total = max(1, int(finite.sum()))
+    delta = diff[finite]
+
+    def percent(mask):
+        return float(np.count_nonzero(mask) * 100.0 / total)
+
+    with np.errstate(invalid='ignore'):
+        covered_before = percent((before >= dead_zone) & finite)
+        covered_after = percent((after >= dead_zone) & finite)
+    return diff, {
+        'improved_percent': percent(delta >= threshold),
+        'regressed_percent': percent(delta <= -threshold),
+        'unchanged_percent': percent(np.abs(delta) < threshold),
+        'mean_delta': float(delta.mean()) if delta.size else 0.0,
+        'max_gain': float(delta.max()) if delta.size else 0.0,
+        'max_loss': float(delta.min()) if delta.size else 0.0,
+        'covered_before_percent': covered_before,
+        'covered_after_percent': covered_after,
+    }
@@ -0,0 +1,140 @@
+import csv
+import gzip
+import json
+import os
+import pickle
+import threading
+
+from core.metrics import metrics
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    def __init__(self, target, *args, **kwargs):
+        self._target = target
+        self._args = args
+        self._kwargs = kwargs
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.done = False
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def report(self, fraction, message=None):
+        # Chamado pela função de exportação; também é o ponto de cancelamento
+        if self._cancel.is_set():
+            raise ExportCancelled()
+        self.progress = max(0.0, min(1.0, fraction))
+        if message is not None:
+            self.message = message
+
+    def _run(self):
+        try:
+            self.result = self._target(self, *self._args, **self._kwargs)
+            self.progress = 1.0
+        except ExportCancelled:
+            self.message = "Cancelado"
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+
+def open_output(path, compress=None):
+    if compress is None:
+        compress = path.lower().endswith('.gz')
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def _remove_partial(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@metrics.timed('export.json')
+def write_json_stream(job, path, header, key, items, total, compress=None):
+    # Grava um objeto JSON cujo campo `key` é escrito item a item, sem montar o dicionário inteiro
+    report_every = max(1, total // 100)
+    try:
+        with open_output(path, compress) as f:
+            f.write('{\n')
+            for name, value in header.items():
+                f.write(f'  {json.dumps(name)}: {json.dumps(value, ensure_ascii=False)},\n')
+            f.write(f'  {json.dumps(key)}: {{')
+            for i, (item_key, item_value) in enumerate(items):
+                if i:
+                    f.write(',')
+                f.write(f'\n    {json.dumps(str(item_key), ensure_ascii=False)}: ')
+                f.write(json.dumps(item_value, ensure_ascii=False))
+                if job is not None and i % report_every == 0:
+                    job.report(i / total if total else 0.0, f"Gravando {i}/{total}")
+            f.write('\n  }\n}\n')
+    except BaseException:
+        _remove_partial(path)
+        raise
+    return path
+
+
+@metrics.timed('export.csv')
+def write_csv_stream(job, path, header, rows, total, compress=None):
+    report_every = max(1, total // 100)
+    try:
+        with open_output(path, compress) as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for i, row in enumerate(rows):
+                writer.writerow(row)
+                if job is not None and i % report_every == 0:
+                    job.report(i / total if total else 0.0, f"Gravando {i}/{total}")
+    except BaseException:
+        _remove_partial(path)
+        raise
+    return path
+
+
+def snapshot_figure(fig):
+    # Cópia serializada da figura, tirada na thread do Tk: a figura da janela não é thread-safe
+    # e o Tk a redesenha (zoom, redimensionamento) enquanto a exportação estiver rodando
+    return pickle.dumps(fig, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def save_figure(job, snapshot, path, **savefig_kwargs):
+    # Renderiza a cópia de snapshot_figure num canvas Agg próprio, na thread da exportação
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if job is not None:
+        job.report(0.05, "Copiando figura")
+    fig = pickle.loads(snapshot)
+    FigureCanvasAgg(fig)
+    if job is not None:
+        job.report(0.1, "Renderizando figura")
+    try:
+        fig.savefig(path, **savefig_kwargs)
+    except BaseException:
+        _remove_partial(path)
+        raise
+    if job is not None:
+        job.progress = 1.0
+        job.message = "Concluído"
+    return path
@@ -0,0 +1,122 @@
+import threading
+
+# Chave do filtro do sinal da rede selecionada (os APs usam o próprio BSSID)
+TARGET_KEY = '__rede__'
+
+
+class EwmaFilter:
+    __slots__ = ('alpha', 'value')
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, measurement):
+        if self.value is None:
+            self.value = float(measurement)
+        else:
+            self.value += self.alpha * (measurement - self.value)
+        return self.value
+
+
+class KalmanFilter:
+    # Modelo de passeio aleatório: process_noise é quanto o sinal real muda entre varreduras,
+    # measurement_noise é a variância do ruído de cada leitura (dB²)
+    __slots__ = ('process_noise', 'measurement_noise', 'value', 'variance')
+
+    def __init__(self, process_noise=1.0, measurement_noise=9.0):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.value = None
+        self.variance = None
+
+    def update(self, measurement):
+        if self.value is None:
+            self.value = float(measurement)
+            self.variance = self.measurement_noise
+            return self.value
+        self.variance += self.process_noise
+        gain = self.variance / (self.variance + self.measurement_noise)
+        self.value += gain * (measurement - self.value)
+        self.variance *= 1.0 - gain
+        return self.value
+
+
+FILTER_TYPES = {
+    'ewma': EwmaFilter,
+    'kalman': KalmanFilter,
+}
+
+
+class SignalFilterBank:
+    def __init__(self, kind=None, **params):
+        if kind is not None and kind not in FILTER_TYPES:
+            raise ValueError(f"Filtro desconhecido: {kind}")
+        self.kind = kind
+        self.params = params
+        self._filters = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.kind is not None
+
+    def config(self):
+        return {'kind': self.kind, 'params': dict(self.params)}
+
+    @classmethod
+    def from_config(cls, config):
+        if not config:
+            return cls()
+        return cls(config.get('kind'), **config.get('params', {}))
+
+    def reset(self):
+        with self._lock:
+            self._filters.clear()
+
+    def update(self, key, value):
+        # Estado O(1) por chave; leituras ausentes passam sem alterar o filtro
+        if value is None or self.kind is None:
+            return value
+        with self._lock:
+            state = self._filters.get(key)
+            if state is None:
+                state = self._filters[key] = FILTER_TYPES[self.kind](**self.params)
+            return round(state.update(value), 1)
+
+    def apply(self, sig, aps=None):
+        filtered_sig = self.update(TARGET_KEY, sig)
+        if not aps:
+            return filtered_sig, aps
+        if self.kind is None:
+            if not any('dbm_raw' in reading for reading in aps.values()):
+                return filtered_sig, aps
+            # Sem filtro, leituras já filtradas voltam ao valor bruto
+            return filtered_sig, {
+                bssid: {**{k: v for k, v in reading.items() if k != 'dbm_raw'},
+                        'dbm': reading.get('dbm_raw', reading['dbm'])}
+                for bssid, reading in aps.items()
+            }
+        filtered_aps = {}
+        for bssid, reading in aps.items():
+            raw = reading.get('dbm_raw', reading['dbm'])
+            filtered_aps[bssid] = dict(reading, dbm=self.update(bssid, raw), dbm_raw=raw)
+        return filtered_sig, filtered_aps
+
+
+def replay(samples, bank):
+    # Reaplica um filtro a um fluxo gravado de amostras brutas (identificador, dBm, leituras por AP);
+    # o estado é zerado antes: cada chamada é um fluxo contínuo, como um trajeto de caminhada
+    bank.reset()
+    for t, sig, aps in samples:
+        filtered_sig, filtered_aps = bank.apply(sig, aps)
+        yield t, filtered_sig, filtered_aps
+
+
+def raw_samples(measurements):
+    # Amostras brutas de medições já filtradas (nome -> medição), na ordem em que foram registradas
+    for name, measurement in measurements.items():
+        if 'dbm' not in measurement:
+            continue
+        dbm = measurement.get('dbm_raw', measurement['dbm'])
+        yield name, (None if dbm == 'N/A' else dbm), measurement.get('aps')
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core.metrics import metrics
+
+
+def default_cache_dir():
+    return os.path.join(os.path.expanduser('~'), '.wifi_mapa', 'grades')
+
+
+def grid_key(x_coords, y_coords, values, xi, yi, params=()):
+    # Mesmo conteúdo (pontos, grade e parâmetros do interpolador) gera sempre a mesma chave
+    digest = hashlib.blake2b(digest_size=20)
+    for array in (x_coords, y_coords, values, xi, yi):
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    digest.update(json.dumps(params, default=str).encode())
+    return digest.hexdigest()
+
+
+class GridCache:
+    def __init__(self, max_entries=32, directory=None, max_disk_entries=256):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        with self._lock:
+            grid = self._entries.get(key)
+            if grid is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.count('grid_cache.hits')
+                return grid
+
+        if self.directory:
+            try:
+                grid = np.load(self._path(key), allow_pickle=False)
+            except (OSError, ValueError):
+                grid = None
+            if grid is not None:
+                self.disk_hits += 1
+                metrics.count('grid_cache.disk_hits')
+                self._remember(key, grid)
+                return grid
+        return None
+
+    def put(self, key, grid):
+        grid = self._remember(key, np.asarray(grid))
+        if self.directory:
+            try:
+                self._write_disk(key, grid)
+            except OSError as e:
+                print(f"Aviso: não foi possível gravar grade em cache: {e}")
+        return grid
+
+    def get_or_compute(self, key, compute):
+        grid = self.get(key)
+        if grid is not None:
+            return grid
+        self.misses += 1
+        metrics.count('grid_cache.misses')
+        return self.put(key, compute())
+
+    def _remember(self, key, grid):
+        # As grades são compartilhadas entre chamadas; ninguém deve alterá-las no lugar
+        grid.setflags(write=False)
+        with self._lock:
+            self._entries[key] = grid
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return grid
+
+    def _write_disk(self, key, grid):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, grid, allow_pickle=False)
+        os.replace(temp_path, path)
+
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.npy')]
+        if len(files) > self.max_disk_entries:
+            files.sort(key=os.path.getmtime)
+            for old in files[:len(files) - self.max_disk_entries]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+        if disk and self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.npy'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+        }
+
+
+def _cache_dir_from_env():
+    # WIFI_MAPA_GRID_CACHE=1 usa o diretório padrão; qualquer outro valor é o caminho do cache em disco
+    value = os.environ.get('WIFI_MAPA_GRID_CACHE', '')
+    if value in ('', '0'):
+        return None
+    return default_cache_dir() if value == '1' else value
+
+
+grid_cache = GridCache(directory=_cache_dir_from_env())
@@ -0,0 +1,289 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from core.metrics import metrics
+
+# Pontos de levantamentos diferentes a até esta distância (pixels da planta) são o mesmo local
+ALIGN_DISTANCE = 25.0
+# Diferenças menores que isso em relação à base não entram no delta (os valores têm 0,1 dB de resolução)
+DELTA_TOLERANCE_DB = 0.05
+# Lado da célula das consultas agregadas, em pixels da planta
+HISTORY_CELL_SIZE = 50.0
+
+INDEX_FILE = 'index.json'
+POSITIONS_FILE = 'posicoes.npy'
+
+
+def default_history_dir():
+    return os.path.join(os.path.expanduser('~'), '.wifi_mapa', 'historico')
+
+
+def floorplan_key(path):
+    # O histórico é por planta: o conteúdo da imagem identifica a planta mesmo se o arquivo mudar de lugar
+    digest = hashlib.blake2b(digest_size=10)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_time(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _survey_time(survey):
+    # Instante do levantamento: a última medição com data completa; o app grava só a hora
+    # de cada ponto, e nesse caso vale o momento em que o levantamento entra no histórico
+    stamps = []
+    for stamp in survey.timestamps.tolist():
+        try:
+            stamps.append(datetime.fromisoformat(stamp))
+        except ValueError:
+            continue
+    return max(stamps).isoformat(timespec='seconds') if stamps else datetime.now().isoformat(timespec='seconds')
+
+
+class SurveyHistory:
+    # Levantamentos repetidos de uma mesma planta: o primeiro de cada rede é a base (valores de
+    # todos os pontos) e os seguintes guardam só o que mudou em relação a ela
+    def __init__(self, directory, align_distance=ALIGN_DISTANCE):
+        self.directory = directory
+        self.align_distance = align_distance
+        self._lock = threading.Lock()
+        self._index = self._read_index()
+        self._positions = self._read_positions()
+
+    @classmethod
+    def for_floorplan(cls, floorplan, root=None):
+        history = cls(os.path.join(root or default_history_dir(), floorplan_key(floorplan)))
+        history._index.setdefault('floorplan', floorplan)
+        return history
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'surveys': [], 'names': []}
+
+    def _read_positions(self):
+        try:
+            return np.load(os.path.join(self.directory, POSITIONS_FILE), allow_pickle=False)
+        except FileNotFoundError:
+            return np.empty((0, 2), dtype=np.float64)
+
+    def _write_atomic(self, name, write):
+        path = os.path.join(self.directory, name)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+
+    @property
+    def positions(self):
+        return self._positions
+
+    @property
+    def names(self):
+        return self._index['names']
+
+    def surveys(self, start=None, end=None, ssid=None):
+        # Só o índice é consultado; nenhum arquivo de levantamento é aberto
+        start, end = _parse_time(start), _parse_time(end)
+        selected = []
+        for entry in self._index['surveys']:
+            when = _parse_time(entry['timestamp'])
+            if ssid is not None and entry['ssid'] != ssid:
+                continue
+            if (start is not None and when < start) or (end is not None and when > end):
+                continue
+            selected.append(entry)
+        return selected
+
+    def _align(self, x, y, names):
+        # Casa cada ponto com a posição conhecida mais próxima (no máximo um ponto por posição);
+        # pontos sem correspondente viram posições novas
+        points = np.column_stack([x, y]).astype(np.float64)
+        known = len(self._positions)
+        index = np.full(len(points), -1, dtype=np.int64)
+        if known and len(points):
+            distance = np.hypot(points[:, None, 0] - self._positions[None, :, 0],
+                                points[:, None, 1] - self._positions[None, :, 1])
+            taken = np.zeros(known, dtype=bool)
+            nearest = distance.argmin(axis=1)
+            for i in np.argsort(distance[np.arange(len(points)), nearest], kind='stable'):
+                candidates = np.flatnonzero(~taken & (distance[i] <= self.align_distance))
+                if len(candidates):
+                    best = candidates[distance[i, candidates].argmin()]
+                    index[i] = best
+                    taken[best] = True
+
+        new = np.flatnonzero(index < 0)
+        index[new] = known + np.arange(len(new))
+        if len(new):
+            self._positions = np.concatenate([self._positions, points[new]])
+            self._index['names'].extend(str(names[i]) for i in new)
+        return index
+
+    @metrics.timed('history.add')
+    def add_survey(self, survey, timestamp=None):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            mask = survey.valid_mask
+            index = self._align(survey.x[mask], survey.y[mask], survey.names[mask])
+            values = np.full(len(self._positions), np.nan, dtype=np.float32)
+            values[index] = survey.dbm[mask]
+
+            survey_id = len(self._index['surveys'])
+            entry = {
+                'id': survey_id,
+                'timestamp': timestamp or _survey_time(survey),
+                'ssid': survey.ssid,
+                'points': int(mask.sum()),
+                'positions': len(self._positions),
+            }
+            base = self._base_entry(survey.ssid)
+            if base is None:
+                entry['kind'] = 'base'
+                entry['file'] = f"base_{survey_id:05d}.npz"
+                self._write_atomic(entry['file'], lambda f: np.savez_compressed(f, values=values))
+            else:
+                base_values = self._base_values(base, len(values))
+                with np.errstate(invalid='ignore'):
+                    changed = ~np.isnan(values) & ~(np.abs(values - base_values) <= DELTA_TOLERANCE_DB)
+                missing = np.isnan(values) & ~np.isnan(base_values)
+                entry['kind'] = 'delta'
+                entry['base'] = base['id']
+                entry['file'] = f"delta_{survey_id:05d}.npz"
+                entry['changed'] = int(changed.sum())
+                self._write_atomic(entry['file'], lambda f: np.savez_compressed(
+                    f, changed_index=np.flatnonzero(changed).astype(np.int32), changed_dbm=values[changed],
+                    missing_index=np.flatnonzero(missing).astype(np.int32)))
+
+            self._index['surveys'].append(entry)
+            self._write_atomic(POSITIONS_FILE, lambda f: np.save(f, self._positions, allow_pickle=False))
+            self._write_atomic(INDEX_FILE, lambda f: f.write(json.dumps(self._index, ensure_ascii=False,
+                                                                        indent=1).encode('utf-8')))
+            metrics.count('history.surveys')
+            return entry
+
+    def _base_entry(self, ssid):
+        for entry in self._index['surveys']:
+            if entry['kind'] == 'base' and entry['ssid'] == ssid:
+                return entry
+        return None
+
+    def _base_values(self, base, size):
+        with np.load(os.path.join(self.directory, base['file']), allow_pickle=False) as data:
+            stored = data['values']
+        # A base conhece só as posições que existiam quando foi gravada
+        values = np.full(size, np.nan, dtype=np.float32)
+        values[:len(stored)] = stored
+        return values
+
+    def values(self, entry, bases=None):
+        # dBm de um levantamento em todas as posições conhecidas (NaN = não medido)
+        if entry['kind'] == 'base':
+            return self._base_values(entry, len(self._positions))
+        if bases is not None and entry['base'] in bases:
+            values = bases[entry['base']].copy()
+        else:
+            values = self._base_values(self._index['surveys'][entry['base']], len(self._positions))
+            if bases is not None:
+                bases[entry['base']] = values.copy()
+        with np.load(os.path.join(self.directory, entry['file']), allow_pickle=False) as data:
+            values[data['missing_index']] = np.nan
+            values[data['changed_index']] = data['changed_dbm']
+        return values
+
+    def measurements(self, entry):
+        values = self.values(entry)
+        points = {}
+        for i in np.flatnonzero(~np.isnan(values)).tolist():
+            x, y = self._positions[i]
+            points[self.names[i]] = {'dbm': round(float(values[i]), 1), 'timestamp': entry['timestamp'],
+                                     'coordinates': (float(x), float(y))}
+        return points
+
+    @metrics.timed('history.point_means')
+    def point_means(self, start=None, end=None, ssid=None):
+        # Um levantamento por vez somado em acumuladores do tamanho do número de posições
+        total = np.zeros(len(self._positions), dtype=np.float64)
+        count = np.zeros(len(self._positions), dtype=np.int64)
+        bases = {}
+        for entry in self.surveys(start, end, ssid):
+            values = self.values(entry, bases)
+            measured = ~np.isnan(values)
+            total[measured] += values[measured]
+            count += measured
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+        return mean, count
+
+    def cell_means(self, start=None, end=None, ssid=None, cell_size=HISTORY_CELL_SIZE):
+        # Média por célula quadrada da planta: (colunas, linhas, média, leituras) das células com dados
+        mean, count = self.point_means(start, end, ssid)
+        measured = count > 0
+        if not measured.any():
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty.astype(np.int64), empty, empty.astype(np.int64)
+        cells = np.floor(self._positions[measured] / cell_size).astype(np.int64)
+        unique, inverse = np.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        weights = count[measured]
+        sums = np.bincount(inverse, weights=mean[measured] * weights, minlength=len(unique))
+        readings = np.bincount(inverse, weights=weights, minlength=len(unique)).astype(np.int64)
+        return unique[:, 0], unique[:, 1], sums / readings, readings
+
+
+def months_ago(months, now=None):
+    return (now or datetime.now()) - timedelta(days=round(30.44 * months))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Histórico de levantamentos de uma planta (base + deltas)")
+    parser.add_argument('floorplan', help="imagem da planta que identifica o histórico")
+    parser.add_argument('--root', help=f"diretório dos históricos (padrão: {default_history_dir()})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add = subparsers.add_parser('add', help="adiciona uma sessão salva ao histórico")
+    add.add_argument('session', help="sessão (.npz, .json ou .jsonl)")
+    add.add_argument('--timestamp', help="instante do levantamento (ISO 8601; padrão: última medição)")
+
+    subparsers.add_parser('list', help="lista os levantamentos")
+
+    mean = subparsers.add_parser('mean', help="RSSI médio por célula no período")
+    mean.add_argument('--months', type=float, default=6)
+    mean.add_argument('--ssid')
+    mean.add_argument('--cell-size', type=float, default=HISTORY_CELL_SIZE)
+
+    args = parser.parse_args(argv)
+    history = SurveyHistory.for_floorplan(args.floorplan, args.root)
+
+    if args.command == 'add':
+        from core.session import load_session
+        entry = history.add_survey(load_session(args.session), args.timestamp)
+        print(json.dumps(entry, ensure_ascii=False))
+    elif args.command == 'list':
+        for entry in history.surveys():
+            print(json.dumps(entry, ensure_ascii=False))
+    else:
+        columns, rows, means, readings = history.cell_means(months_ago(args.months), ssid=args.ssid,
+                                                            cell_size=args.cell_size)
+        print("celula_x,celula_y,dbm_medio,leituras")
+        for col, row, value, n in zip(columns.tolist(), rows.tolist(), means.tolist(), readings.tolist()):
+            print(f"{col * args.cell_size:g},{row * args.cell_size:g},{value:.1f},{n}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
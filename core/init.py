@@ -1,9 +1,15 @@
 from .wifi_scanner import WifiScanner
-from .utils import signal_dbm_to_percent, signal_to_color, dbm_to_color
+from .utils import signal_dbm_to_percent, signal_to_color, dbm_to_color, dbm_to_status, \
+    signal_dbm_to_percent_array, dbm_to_color_array, dbm_to_status_array, freq_to_channel
 
 __all__ = [
     'WifiScanner',
     'signal_dbm_to_percent', 
     'signal_to_color',
-    'dbm_to_color'
+    'dbm_to_color',
+    'dbm_to_status',
+    'signal_dbm_to_percent_array',
+    'dbm_to_color_array',
+    'dbm_to_status_array',
+    'freq_to_channel'
 ]
\ No newline at end of file
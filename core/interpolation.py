@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Mesmos parâmetros do IDW original de HeatmapGenerator._interpolate_data
+SNAP_DISTANCE = 0.1
+WEIGHT_OFFSET = 0.1
+
+# Limite de elementos da matriz distância por bloco de linhas
+MAX_BLOCK_ELEMENTS = 4_000_000
+# Threads que avaliam blocos de linhas em paralelo (o NumPy libera o GIL nas contas);
+# cada thread usa um único rascunho do tamanho de um bloco
+INTERPOLATION_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def idw_grid(x_coords, y_coords, values, xi, yi, workers=None):
+    vs = np.asarray(values, dtype=np.float64)
+    return idw_grid_multi(x_coords, y_coords, vs[:, None], xi, yi, workers)[0]
+
+
+def _idw_rows(Zi, xs, ys, vs, yi, dx2, tiles, rows_per_block):
+    # Rascunho alocado uma vez e reaproveitado em todos os blocos desta thread
+    distances = np.empty((rows_per_block, dx2.shape[0], len(xs)), dtype=np.float64)
+    surfaces = np.empty((rows_per_block, dx2.shape[0], vs.shape[1]), dtype=np.float64)
+
+    for start, stop in tiles:
+        block = distances[:stop - start]
+        dy2 = (yi[start:stop, None] - ys[None, :]) ** 2
+        np.add(dy2[:, None, :], dx2[None, :, :], out=block)
+        np.sqrt(block, out=block)
+
+        # Célula praticamente sobre um ponto medido recebe o valor exato
+        nearest = block.argmin(axis=2)
+        snapped = np.take_along_axis(block, nearest[..., None], axis=2)[..., 0] < SNAP_DISTANCE
+
+        # A matriz distância vira a de pesos no mesmo buffer
+        block += WEIGHT_OFFSET
+        np.reciprocal(block, out=block)
+        block /= block.sum(axis=2, keepdims=True)
+        rows, cols = np.nonzero(snapped)
+        block[rows, cols] = 0.0
+        block[rows, cols, nearest[rows, cols]] = 1.0
+
+        result = surfaces[:stop - start]
+        np.matmul(block, vs, out=result)
+        Zi[:, start:stop] = np.moveaxis(result, 2, 0)
+
+
+def idw_grid_multi(x_coords, y_coords, values, xi, yi, workers=None):
+    # values tem uma coluna por superfície (ex.: um AP); os pesos são calculados uma vez para todas
+    xs = np.asarray(x_coords, dtype=np.float64)
+    ys = np.asarray(y_coords, dtype=np.float64)
+    vs = np.asarray(values, dtype=np.float64).reshape(len(xs), -1)
+    xi = np.asarray(xi, dtype=np.float64)
+    yi = np.asarray(yi, dtype=np.float64)
+
+    Zi = np.empty((vs.shape[1], len(yi), len(xi)), dtype=np.float64)
+    if len(xs) == 0:
+        Zi.fill(np.nan)
+        return Zi
+
+    rows_per_block = max(1, min(len(yi), MAX_BLOCK_ELEMENTS // max(1, len(xi) * len(xs))))
+    dx2 = (xi[:, None] - xs[None, :]) ** 2
+    tiles = [(start, min(start + rows_per_block, len(yi))) for start in range(0, len(yi), rows_per_block)]
+
+    workers = min(INTERPOLATION_WORKERS if workers is None else max(1, workers), len(tiles))
+    if workers <= 1:
+        _idw_rows(Zi, xs, ys, vs, yi, dx2, tiles, rows_per_block)
+        return Zi
+
+    # Blocos intercalados entre as threads; cada uma escreve só nas suas linhas de Zi
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_idw_rows, Zi, xs, ys, vs, yi, dx2, tiles[i::workers], rows_per_block)
+                   for i in range(workers)]
+        for future in futures:
+            future.result()
+    return Zi
+
+
+def rank_surfaces(stack, count=2):
+    # Para cada célula, índices e valores das `count` maiores superfícies (melhor servidor primeiro)
+    stack = np.asarray(stack, dtype=np.float64)
+    count = min(count, stack.shape[0])
+    if count < stack.shape[0]:
+        top = np.argpartition(-stack, count - 1, axis=0)[:count]
+    else:
+        top = np.broadcast_to(
+            np.arange(stack.shape[0]).reshape(-1, *([1] * (stack.ndim - 1))), stack.shape).copy()
+    top_values = np.take_along_axis(stack, top, axis=0)
+    order = np.argsort(-top_values, axis=0, kind='stable')
+    return np.take_along_axis(top, order, axis=0), np.take_along_axis(top_values, order, axis=0)
@@ -0,0 +1,183 @@
+import json
+import os
+import queue
+import threading
+import time
+
+
+def default_journal_dir():
+    return os.path.join(os.path.expanduser('~'), '.wifi_mapa', 'sessoes')
+
+
+def new_journal_path(directory=None):
+    directory = directory or default_journal_dir()
+    return os.path.join(directory, time.strftime("sessao_%Y%m%d_%H%M%S.jsonl"))
+
+
+def base_path(journal_path):
+    # Sessão aberta de um arquivo: os pontos carregados ficam num .npz ao lado do diário,
+    # que registra só uma referência a ele e as medições seguintes
+    return os.path.splitext(journal_path)[0] + '.base.npz'
+
+
+def _truncate_partial_line(path):
+    # Ao retomar um diário interrompido, descarta a última linha incompleta
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos = end
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            chunk = f.read(step)
+            newline = chunk.rfind(b'\n')
+            if newline != -1:
+                pos = pos - step + newline + 1
+                break
+            pos -= step
+        if pos != end:
+            f.truncate(pos)
+
+
+class SurveyJournal:
+    def __init__(self, path, batch_size=32, sync_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _truncate_partial_line(path)
+
+        self._file = open(path, 'a', encoding='utf-8')
+        self._queue = queue.Queue()
+        self._closed = False
+        self.records_written = 0
+        self.syncs = 0
+
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def append(self, record):
+        if self._closed:
+            return
+        self._queue.put(record)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.syncs += 1
+
+    def _writer(self):
+        pending = 0
+        last_sync = time.monotonic()
+        while True:
+            try:
+                record = self._queue.get(timeout=self.sync_interval)
+            except queue.Empty:
+                record = False
+
+            if record is None:
+                if pending:
+                    self._sync()
+                return
+
+            if record is not False:
+                self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+                self._file.write('\n')
+                self.records_written += 1
+                pending += 1
+
+            # fsync em lote: por quantidade de registros ou por tempo decorrido
+            now = time.monotonic()
+            if pending and (pending >= self.batch_size or now - last_sync >= self.sync_interval):
+                try:
+                    self._sync()
+                except OSError as e:
+                    print(f"Aviso: falha ao sincronizar diário da sessão: {e}")
+                pending = 0
+                last_sync = now
+
+
+def read_journal(path):
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Última linha pode ter ficado incompleta em caso de queda
+                break
+    return records
+
+
+def replay_journal(records):
+    session = {
+        'ssid': None,
+        'floorplan': None,
+        'points': {},
+        'grid': {},
+        'filter': None,
+        'base': None,
+    }
+
+    def with_aps(measurement, record):
+        if record.get('aps'):
+            measurement['aps'] = record['aps']
+        if record.get('dbm_raw') is not None:
+            measurement['dbm_raw'] = record['dbm_raw']
+        return measurement
+
+    for record in records:
+        kind = record.get('type')
+        if kind == 'session':
+            session['ssid'] = record.get('ssid')
+            session['floorplan'] = record.get('floorplan')
+            session['filter'] = record.get('filter')
+        elif kind == 'filter':
+            session['filter'] = record.get('filter')
+        elif kind == 'base':
+            session['base'] = record.get('path')
+        elif kind == 'floorplan':
+            session['floorplan'] = record.get('path')
+        elif kind == 'point':
+            session['points'][record['name']] = with_aps({
+                'dbm': record['dbm'],
+                'percent': record.get('percent', 0),
+                'timestamp': record.get('timestamp'),
+                'coordinates': tuple(record['coordinates']),
+            }, record)
+        elif kind == 'grid_point':
+            session['grid'].setdefault(record['local'], {})[record['name']] = with_aps({
+                'dbm': record['dbm'],
+                'percent': record.get('percent', 0),
+                'timestamp': record.get('timestamp'),
+            }, record)
+        elif kind == 'clear':
+            session['points'].clear()
+            session['grid'].clear()
+            session['base'] = None
+            if record.get('floorplan'):
+                session['floorplan'] = None
+    return session
+
+
+def load_journal(path):
+    session = replay_journal(read_journal(path))
+    if session['base'] and not os.path.isabs(session['base']):
+        session['base'] = os.path.join(os.path.dirname(path), session['base'])
+    return session
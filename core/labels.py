@@ -0,0 +1,51 @@
+import math
+
+
+class CollisionGrid:
+    # Caixas já ocupadas indexadas por célula: testar uma caixa nova só olha as células que ela cobre
+    def __init__(self, cell_size):
+        self.cell_size = max(float(cell_size), 1.0)
+        self._cells = {}
+
+    def _cells_for(self, box):
+        x0, y0, x1, y1 = box
+        size = self.cell_size
+        for cx in range(math.floor(x0 / size), math.floor(x1 / size) + 1):
+            for cy in range(math.floor(y0 / size), math.floor(y1 / size) + 1):
+                yield cx, cy
+
+    def fits(self, box):
+        x0, y0, x1, y1 = box
+        for cell in self._cells_for(box):
+            for ox0, oy0, ox1, oy1 in self._cells.get(cell, ()):
+                if x0 < ox1 and ox0 < x1 and y0 < oy1 and oy0 < y1:
+                    return False
+        return True
+
+    def add(self, box):
+        for cell in self._cells_for(box):
+            self._cells.setdefault(cell, []).append(box)
+
+
+def place_labels(boxes, priority=None, max_labels=None):
+    # boxes: (x0, y0, x1, y1) em pixels; devolve os índices dos rótulos que cabem sem sobreposição,
+    # escolhidos por prioridade (maior primeiro) até max_labels
+    if not boxes:
+        return []
+    order = range(len(boxes))
+    if priority is not None:
+        order = sorted(order, key=lambda i: priority[i], reverse=True)
+
+    # Células do tamanho médio de um rótulo: cada teste olha poucas células e poucas caixas
+    width = sum(box[2] - box[0] for box in boxes) / len(boxes)
+    height = sum(box[3] - box[1] for box in boxes) / len(boxes)
+    grid = CollisionGrid(max(width, height))
+
+    chosen = []
+    for i in order:
+        if max_labels is not None and len(chosen) >= max_labels:
+            break
+        if grid.fits(boxes[i]):
+            grid.add(boxes[i])
+            chosen.append(i)
+    return chosen
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Limites dos baldes do histograma (ms para tempos)
+BUCKET_BOUNDS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.buckets[bisect_left(BUCKET_BOUNDS, value)] += 1
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return BUCKET_BOUNDS[i] if i < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'buckets': dict(zip([str(b) for b in BUCKET_BOUNDS] + ['inf'], self.buckets)),
+        }
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('_metrics', '_name', '_start')
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._name, (time.perf_counter() - self._start) * 1000)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get('WIFI_MAPA_METRICS', '') not in ('', '0')
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def timer(self, name):
+        # Desligado, devolve sempre o mesmo objeto vazio: custo de uma chamada
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        def decorator(func):
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, name):
+                    return func(*args, **kwargs)
+            wrapper.__name__ = func.__name__
+            wrapper.__doc__ = func.__doc__
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+                'counters': dict(self._counters),
+                'histograms': {name: h.to_dict() for name, h in sorted(self._histograms.items())},
+            }
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+
+metrics = Metrics()
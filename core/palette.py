@@ -0,0 +1,81 @@
+from functools import lru_cache
+
+from core.utils import DBM_COLOR_STOPS, hex_to_rgb
+
+
+class GradientPalette:
+    def __init__(self, stops, size=256):
+        self.stops = tuple(stops)
+        self.size = size
+        self.vmin = self.stops[0][0]
+        self.vmax = self.stops[-1][0]
+        self._scale = (size - 1) / (self.vmax - self.vmin)
+
+        # Tabela RGB calculada uma única vez; cada cor do gradiente é um índice nela
+        values = [v for v, _ in self.stops]
+        colors = [hex_to_rgb(c) for _, c in self.stops]
+        table = []
+        for i in range(size):
+            value = self.vmin + i / self._scale
+            segment = 0
+            while segment < len(values) - 2 and value > values[segment + 1]:
+                segment += 1
+            v0, v1 = values[segment], values[segment + 1]
+            t = (value - v0) / (v1 - v0)
+            c0, c1 = colors[segment], colors[segment + 1]
+            table.append(tuple(int(round(c0[k] + (c1[k] - c0[k]) * t)) for k in range(3)))
+
+        self.rgb_list = table
+        self.hex = ['#{:02x}{:02x}{:02x}'.format(*rgb) for rgb in table]
+        self._rgb_array = None
+        self._hex_array = None
+        self._colormap = None
+
+    @property
+    def rgb(self):
+        if self._rgb_array is None:
+            import numpy as np
+            self._rgb_array = np.array(self.rgb_list, dtype=np.uint8)
+        return self._rgb_array
+
+    def index_of(self, value):
+        if value != value:
+            return 0
+        value = min(max(value, self.vmin), self.vmax)
+        return int(round((value - self.vmin) * self._scale))
+
+    def color_for(self, value):
+        return self.hex[self.index_of(float(value))]
+
+    def indices(self, values):
+        import numpy as np
+        arr = np.asarray(values, dtype=np.float64)
+        index = np.rint((np.clip(arr, self.vmin, self.vmax) - self.vmin) * self._scale)
+        return np.nan_to_num(index, nan=0).astype(np.intp)
+
+    def colors_for(self, values):
+        if self._hex_array is None:
+            import numpy as np
+            self._hex_array = np.array(self.hex)
+        return self._hex_array[self.indices(values)]
+
+    def rgb_for(self, values):
+        return self.rgb[self.indices(values)]
+
+    def to_colormap(self, name="custom_dbm_gradient"):
+        if self._colormap is None:
+            import matplotlib.colors as mcolors
+            self._colormap = mcolors.ListedColormap(self.rgb / 255.0, name=name)
+        return self._colormap
+
+
+@lru_cache(maxsize=8)
+def _palette_for(stops, size):
+    return GradientPalette(stops, size)
+
+
+def get_palette(stops=None, size=256):
+    return _palette_for(tuple(tuple(stop) for stop in (stops or DBM_COLOR_STOPS)), size)
+
+
+DBM_PALETTE = get_palette()
@@ -0,0 +1,92 @@
+import numpy as np
+
+from core.interpolation import MAX_BLOCK_ELEMENTS
+
+# Modelo log-distância: RSSI(d) = P0 - 10 n log10(d + d0), com d na unidade das coordenadas
+REFERENCE_DISTANCE = 1.0
+MIN_EXPONENT = 1.5
+MAX_EXPONENT = 6.0
+
+# Busca da posição do AP: grade de candidatos refinada algumas vezes ao redor do melhor
+CANDIDATES_PER_AXIS = 32
+REFINE_STEPS = 3
+SEARCH_MARGIN = 0.5
+# Acima disso o ajuste usa uma amostra uniforme dos pontos; o modelo tem só 4 parâmetros
+MAX_FIT_POINTS = 2000
+
+
+class PathLossModel:
+    __slots__ = ('ap_x', 'ap_y', 'p0', 'exponent', 'rmse')
+
+    def __init__(self, ap_x, ap_y, p0, exponent, rmse):
+        self.ap_x = ap_x
+        self.ap_y = ap_y
+        self.p0 = p0
+        self.exponent = exponent
+        self.rmse = rmse
+
+    def predict(self, x, y):
+        distance = np.hypot(np.asarray(x, dtype=np.float64) - self.ap_x, np.asarray(y, dtype=np.float64) - self.ap_y)
+        return self.p0 - 10.0 * self.exponent * np.log10(distance + REFERENCE_DISTANCE)
+
+    def grid(self, xi, yi):
+        # Avaliação fechada em qualquer resolução: linhas = yi, colunas = xi
+        xi = np.asarray(xi, dtype=np.float64)
+        yi = np.asarray(yi, dtype=np.float64)
+        return self.predict(xi[None, :], yi[:, None])
+
+    def to_dict(self):
+        return {'ap_x': self.ap_x, 'ap_y': self.ap_y, 'p0': self.p0, 'exponent': self.exponent, 'rmse': self.rmse}
+
+
+def _solve(log_distance, values):
+    # Mínimos quadrados de (P0, n) para cada posição candidata de uma vez; log_distance: (candidatos, pontos)
+    mean_log = log_distance.mean(axis=1)
+    mean_value = values.mean()
+    centered = log_distance - mean_log[:, None]
+    variance = (centered ** 2).sum(axis=1)
+    slope = (centered @ (values - mean_value)) / np.where(variance > 0, variance, np.inf)
+
+    exponent = np.clip(-slope / 10.0, MIN_EXPONENT, MAX_EXPONENT)
+    p0 = mean_value + 10.0 * exponent * mean_log
+    residual = values[None, :] - (p0[:, None] - 10.0 * exponent[:, None] * log_distance)
+    return p0, exponent, (residual ** 2).mean(axis=1)
+
+
+def fit_path_loss(x_coords, y_coords, values, candidates=CANDIDATES_PER_AXIS, refine_steps=REFINE_STEPS):
+    xs = np.asarray(x_coords, dtype=np.float64)
+    ys = np.asarray(y_coords, dtype=np.float64)
+    vs = np.asarray(values, dtype=np.float64)
+    if len(vs) > MAX_FIT_POINTS:
+        sample = np.linspace(0, len(vs) - 1, MAX_FIT_POINTS).astype(np.intp)
+        xs, ys, vs = xs[sample], ys[sample], vs[sample]
+
+    span = max(xs.max() - xs.min(), ys.max() - ys.min(), 1.0)
+    # O AP pode estar fora da área medida: a busca começa numa região maior que a dos pontos
+    x_low, x_high = xs.min() - span * SEARCH_MARGIN, xs.max() + span * SEARCH_MARGIN
+    y_low, y_high = ys.min() - span * SEARCH_MARGIN, ys.max() + span * SEARCH_MARGIN
+
+    for _ in range(refine_steps + 1):
+        cx = np.linspace(x_low, x_high, candidates)
+        cy = np.linspace(y_low, y_high, candidates)
+        CX, CY = (grid.ravel() for grid in np.meshgrid(cx, cy))
+
+        # Candidatos em blocos para a matriz (candidatos x pontos) caber em memória
+        block = max(1, MAX_BLOCK_ELEMENTS // len(xs))
+        best = None
+        for start in range(0, len(CX), block):
+            bx, by = CX[start:start + block], CY[start:start + block]
+            distance = np.hypot(bx[:, None] - xs[None, :], by[:, None] - ys[None, :])
+            p0, exponent, mse = _solve(np.log10(distance + REFERENCE_DISTANCE), vs)
+            i = int(np.argmin(mse))
+            if best is None or mse[i] < best[4]:
+                best = (bx[i], by[i], p0[i], exponent[i], mse[i])
+
+        # Próxima rodada: duas células ao redor do melhor candidato
+        step_x = (x_high - x_low) / (candidates - 1)
+        step_y = (y_high - y_low) / (candidates - 1)
+        x_low, x_high = best[0] - 2 * step_x, best[0] + 2 * step_x
+        y_low, y_high = best[1] - 2 * step_y, best[1] + 2 * step_y
+
+    ap_x, ap_y, p0, exponent, mse = best
+    return PathLossModel(float(ap_x), float(ap_y), float(p0), float(exponent), float(np.sqrt(mse)))
@@ -0,0 +1,126 @@
+import json
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+from core.exporter import _remove_partial
+from core.metrics import metrics
+
+RASTER_ALPHA = 0.8
+BACKGROUND_ALPHA = 0.3
+# Largura padrão quando não há planta para definir o tamanho da imagem
+DEFAULT_RASTER_WIDTH = 2000
+# Linhas coloridas por vez: limita os temporários de índice/RGB em saídas grandes
+RASTER_BAND_ROWS = 512
+# Compressão PNG rápida: no nível padrão (6) a codificação leva mais tempo que gerar a imagem
+PNG_COMPRESS_LEVEL = 1
+
+
+def grid_bounds(xi, yi, flip_y=None):
+    # Bordas da grade (esquerda, topo, direita, base) com meia célula além dos centros.
+    # flip_y: y da planta = flip_y - y da grade (mapas sobre imagem); None = eixo y para cima
+    dx = (xi[-1] - xi[0]) / max(len(xi) - 1, 1)
+    dy = (yi[-1] - yi[0]) / max(len(yi) - 1, 1)
+    left, right = xi[0] - dx / 2, xi[-1] + dx / 2
+    if flip_y is None:
+        return left, yi[-1] + dy / 2, right, yi[0] - dy / 2
+    return left, flip_y - yi[-1] - dy / 2, right, flip_y - yi[0] + dy / 2
+
+
+def grid_to_rgba(grid, palette, size=None, alpha=RASTER_ALPHA):
+    # grid com a linha 0 em cima; células NaN ficam transparentes
+    values = np.asarray(grid, dtype=np.float32)
+    if size is not None and size != (values.shape[1], values.shape[0]):
+        values = np.asarray(Image.fromarray(values).resize(size, Image.BILINEAR))
+
+    rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+    opaque = int(round(alpha * 255))
+    for start in range(0, values.shape[0], RASTER_BAND_ROWS):
+        band = values[start:start + RASTER_BAND_ROWS]
+        rgba[start:start + RASTER_BAND_ROWS, :, :3] = palette.rgb_for(band)
+        rgba[start:start + RASTER_BAND_ROWS, :, 3] = np.where(np.isnan(band), 0, opaque)
+    return Image.fromarray(rgba)
+
+
+@metrics.timed('export.raster')
+def render_raster(xi, yi, grid, palette, background=None, flip_y=None, width=None, alpha=RASTER_ALPHA):
+    # Grade já interpolada -> paleta -> PIL, sem passar pelo matplotlib
+    left, top, right, bottom = grid_bounds(xi, yi, flip_y)
+    rows = np.flipud(np.asarray(grid))
+
+    if background is None:
+        width = width or DEFAULT_RASTER_WIDTH
+        height = max(1, int(round(width * abs(bottom - top) / (right - left))))
+        return grid_to_rgba(rows, palette, (width, height), alpha)
+
+    # Planta esmaecida como no mapa da tela, na escala pedida
+    width = width or background.width
+    scale = width / background.width
+    height = max(1, int(round(background.height * scale)))
+    base = Image.new('RGBA', (width, height), (255, 255, 255, 255))
+    floorplan = background.convert('RGBA').resize((width, height), Image.BILINEAR)
+    floorplan.putalpha(int(round(BACKGROUND_ALPHA * 255)))
+    base.alpha_composite(floorplan)
+
+    box = [int(round(edge * scale)) for edge in (left, top, right, bottom)]
+    overlay = grid_to_rgba(rows, palette, (max(1, box[2] - box[0]), max(1, box[3] - box[1])), alpha)
+    # paste aceita deslocamentos negativos: a grade pode passar da borda da planta
+    layer = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    layer.paste(overlay, (box[0], box[1]))
+    return Image.alpha_composite(base, layer)
+
+
+def save_raster(job, image, path):
+    if job is not None:
+        job.report(0.5, "Gravando imagem")
+    try:
+        if path.lower().endswith(('.jpg', '.jpeg')):
+            flat = Image.new('RGB', image.size, (255, 255, 255))
+            flat.paste(image, mask=image.getchannel('A'))
+            flat.save(path, quality=95)
+        elif path.lower().endswith('.png'):
+            image.save(path, compress_level=PNG_COMPRESS_LEVEL)
+        else:
+            image.save(path)
+    except BaseException:
+        _remove_partial(path)
+        raise
+    return path
+
+
+@metrics.timed('export.grid_tiff')
+def write_grid_tiff(job, path, xi, yi, grid, flip_y=None, metadata=None):
+    # Grade bruta em dBm (float32, NaN = sem dado) + metadados em JSON, no TIFF e num arquivo ao lado
+    xi = np.asarray(xi, dtype=np.float64)
+    yi = np.asarray(yi, dtype=np.float64)
+    rows = np.ascontiguousarray(np.flipud(np.asarray(grid, dtype=np.float32)))
+    left, top, right, bottom = grid_bounds(xi, yi, flip_y)
+    height, width = rows.shape
+
+    info = {
+        'units': 'dBm',
+        'width': width,
+        'height': height,
+        'nodata': 'NaN',
+        'bounds': [left, top, right, bottom],
+        # Mesma convenção do GDAL: x = t0 + col*t1 + row*t2, y = t3 + col*t4 + row*t5 (cantos dos pixels)
+        'geotransform': [left, (right - left) / width, 0.0, top, 0.0, (bottom - top) / height],
+        'y_axis': 'down' if flip_y is not None else 'up',
+        'created': datetime.now().isoformat(),
+        **(metadata or {}),
+    }
+    description = json.dumps(info, ensure_ascii=False)
+
+    if job is not None:
+        job.report(0.2, "Gravando grade")
+    json_path = f"{path}.json"
+    try:
+        Image.fromarray(rows).save(path, format='TIFF', tiffinfo={270: description})
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write(description)
+    except BaseException:
+        _remove_partial(path)
+        _remove_partial(json_path)
+        raise
+    return path
@@ -0,0 +1,555 @@
+import argparse
+import asyncio
+import json
+import math
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import deque
+
+from core.metrics import metrics
+from core.utils import freq_to_channel, signal_dbm_to_percent
+
+DEFAULT_PORT = 8765
+
+# Quadro: tipo (1 byte) + tamanho do conteúdo (4 bytes)
+FRAME_HEADER = struct.Struct('!BI')
+FRAME_HELLO = 1
+FRAME_BATCH = 2
+FRAME_CREDIT = 3
+FRAME_BYE = 4
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+CREDIT = struct.Struct('!I')
+SSID_COUNT = struct.Struct('!H')
+RECORD_COUNT = struct.Struct('!H')
+# Amostra: instante, x, y (NaN = sem posição), dBm x10 (NO_SIGNAL = N/A), quantidade de APs
+RECORD = struct.Struct('!dffhB')
+# AP: BSSID (6 bytes), dBm x10, frequência em MHz (0 = desconhecida), índice do SSID no lote
+AP_RECORD = struct.Struct('!6shHB')
+NO_SIGNAL = -32768
+MAX_APS_PER_RECORD = 255
+
+
+def _pack_dbm(dbm):
+    return NO_SIGNAL if dbm is None else int(round(float(dbm) * 10))
+
+
+def _unpack_dbm(value):
+    if value == NO_SIGNAL:
+        return None
+    return value // 10 if value % 10 == 0 else value / 10
+
+
+def encode_batch(samples):
+    # samples: (instante, x, y, dBm, leituras por AP)
+    ssids = {}
+    body = bytearray()
+    for t, x, y, sig, aps in samples:
+        encoded_aps = []
+        for bssid, reading in (aps or {}).items():
+            try:
+                mac = bytes.fromhex(bssid.replace(':', '').replace('-', ''))
+            except ValueError:
+                continue
+            if len(mac) != 6 or len(encoded_aps) == MAX_APS_PER_RECORD:
+                continue
+            ssid = reading.get('ssid') or ''
+            if ssid not in ssids:
+                ssids[ssid] = len(ssids)
+            encoded_aps.append(AP_RECORD.pack(mac, _pack_dbm(reading['dbm']), reading.get('freq') or 0, ssids[ssid]))
+        body += RECORD.pack(t, x, y, _pack_dbm(sig), len(encoded_aps))
+        for encoded in encoded_aps:
+            body += encoded
+
+    header = bytearray(SSID_COUNT.pack(len(ssids)))
+    for ssid in ssids:
+        raw = ssid.encode('utf-8')[:255]
+        header += bytes((len(raw),)) + raw
+    header += RECORD_COUNT.pack(len(samples))
+    return bytes(header + body)
+
+
+def decode_batch(payload):
+    offset = 0
+    (ssid_count,) = SSID_COUNT.unpack_from(payload, offset)
+    offset += SSID_COUNT.size
+    ssids = []
+    for _ in range(ssid_count):
+        length = payload[offset]
+        ssids.append(payload[offset + 1:offset + 1 + length].decode('utf-8', errors='replace'))
+        offset += 1 + length
+
+    (record_count,) = RECORD_COUNT.unpack_from(payload, offset)
+    offset += RECORD_COUNT.size
+    samples = []
+    for _ in range(record_count):
+        t, x, y, sig, ap_count = RECORD.unpack_from(payload, offset)
+        offset += RECORD.size
+        aps = {}
+        for _ in range(ap_count):
+            mac, dbm, freq, ssid_index = AP_RECORD.unpack_from(payload, offset)
+            offset += AP_RECORD.size
+            reading = {'ssid': ssids[ssid_index], 'dbm': _unpack_dbm(dbm)}
+            if freq:
+                reading['freq'] = freq
+                reading['channel'] = freq_to_channel(freq)
+            aps[mac.hex(':')] = reading
+        samples.append((t, x, y, _unpack_dbm(sig), aps))
+    return samples
+
+
+def write_frame(writer, kind, payload=b''):
+    writer.write(FRAME_HEADER.pack(kind, len(payload)) + payload)
+
+
+async def read_frame(reader):
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None, b''
+    kind, length = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"Quadro grande demais: {length} bytes")
+    try:
+        payload = await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None, b''
+    return kind, payload
+
+
+class AgentStats:
+    __slots__ = ('name', 'ssid', 'connected_at', 'last_seen', 'batches', 'samples', 'bytes', 'unplaced',
+                 'failed_batches', 'last_error', 'connected')
+
+    def __init__(self, name, ssid):
+        self.name = name
+        self.ssid = ssid
+        self.connected_at = time.monotonic()
+        self.last_seen = self.connected_at
+        self.batches = 0
+        self.samples = 0
+        self.bytes = 0
+        self.unplaced = 0
+        self.failed_batches = 0
+        self.last_error = None
+        self.connected = True
+
+    def snapshot(self):
+        elapsed = max(self.last_seen - self.connected_at, 1e-9)
+        return {
+            'ssid': self.ssid,
+            'connected': self.connected,
+            'batches': self.batches,
+            'samples': self.samples,
+            'bytes': self.bytes,
+            'unplaced': self.unplaced,
+            'failed_batches': self.failed_batches,
+            'last_error': self.last_error,
+            'samples_per_s': self.samples / elapsed if self.samples else 0.0,
+            'bytes_per_s': self.bytes / elapsed if self.bytes else 0.0,
+        }
+
+
+class SurveyCollector:
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, window=4, queue_size=64, journal=None,
+                 on_samples=None):
+        self.host = host
+        self.port = port
+        # Lotes que cada agente pode ter em trânsito antes de receber novo crédito
+        self.window = window
+        self.queue_size = queue_size
+        self.journal = journal
+        self.on_samples = on_samples
+
+        self.measurements = {}
+        self.agents = {}
+        self._writers = {}
+        self._counters = {}
+        # Conexões recusadas (HELLO inválido) e lotes que chegaram mas não foram incorporados
+        self.rejected = 0
+        self.failed_batches = 0
+        self._queue = None
+        self._server = None
+        self._consumer = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(self.queue_size)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._consumer = asyncio.create_task(self._consume())
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        # Tudo que já chegou é incorporado antes de encerrar
+        await self._queue.join()
+        self._consumer.cancel()
+
+    def _register(self, name, ssid):
+        unique = name
+        suffix = 2
+        while unique in self.agents and self.agents[unique].connected:
+            unique = f"{name}#{suffix}"
+            suffix += 1
+        self.agents[unique] = AgentStats(unique, ssid)
+        self._counters.setdefault(unique, 0)
+        return unique
+
+    def _parse_hello(self, kind, payload):
+        if kind != FRAME_HELLO:
+            raise ValueError("a conexão não começou com HELLO")
+        hello = json.loads(payload.decode('utf-8'))
+        if not isinstance(hello, dict):
+            raise ValueError("HELLO não é um objeto JSON")
+        agent, ssid = hello.get('agent'), hello.get('ssid')
+        if not isinstance(agent, (str, type(None))) or not isinstance(ssid, (str, type(None))):
+            raise ValueError("campos 'agent' e 'ssid' do HELLO devem ser texto")
+        return agent or 'agente', ssid
+
+    async def _handle(self, reader, writer):
+        name = None
+        try:
+            try:
+                kind, payload = await read_frame(reader)
+                agent, ssid = self._parse_hello(kind, payload)
+            except ValueError as e:
+                # UnicodeDecodeError e JSONDecodeError também são ValueError
+                self.rejected += 1
+                metrics.count('remote.rejected')
+                print(f"Aviso: conexão recusada de {writer.get_extra_info('peername')}: {e}")
+                return
+
+            name = self._register(agent, ssid)
+            stats = self.agents[name]
+            self._writers[name] = writer
+            write_frame(writer, FRAME_CREDIT, CREDIT.pack(self.window))
+            await writer.drain()
+
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind is None or kind == FRAME_BYE:
+                    break
+                if kind != FRAME_BATCH:
+                    continue
+                stats.last_seen = time.monotonic()
+                stats.batches += 1
+                stats.bytes += FRAME_HEADER.size + len(payload)
+                metrics.count('remote.bytes', FRAME_HEADER.size + len(payload))
+                # Fila cheia segura a leitura deste agente até o consumidor alcançar
+                await self._queue.put((name, payload))
+        except (ValueError, ConnectionError) as e:
+            print(f"Aviso: conexão com {name or writer.get_extra_info('peername')} encerrada: {e}")
+        finally:
+            if name is not None:
+                self.agents[name].connected = False
+                self._writers.pop(name, None)
+            writer.close()
+
+    async def _consume(self):
+        while True:
+            name, payload = await self._queue.get()
+            try:
+                with metrics.timer('remote.merge_batch'):
+                    samples = decode_batch(payload)
+                    merged = self._merge(name, samples)
+                self.agents[name].samples += len(samples)
+                metrics.count('remote.samples', len(samples))
+                if self.on_samples:
+                    self.on_samples(merged)
+            except Exception as e:
+                # O lote se perde, mas fica contado nas estatísticas do coletor e do agente
+                self.failed_batches += 1
+                self.agents[name].failed_batches += 1
+                self.agents[name].last_error = str(e)
+                metrics.count('remote.failed_batches')
+                print(f"Erro ao incorporar lote de {name}: {e}")
+            finally:
+                self._queue.task_done()
+
+            # Crédito devolvido só depois de o lote ser incorporado
+            writer = self._writers.get(name)
+            if writer is not None and not writer.is_closing():
+                write_frame(writer, FRAME_CREDIT, CREDIT.pack(1))
+
+    def _merge(self, agent, samples):
+        merged = {}
+        for t, x, y, sig, aps in samples:
+            # Amostra sem posição não tem lugar no mapa; fica só contada
+            if not (math.isfinite(x) and math.isfinite(y)):
+                self.agents[agent].unplaced += 1
+                metrics.count('remote.unplaced')
+                continue
+            self._counters[agent] += 1
+            point_name = f"{agent} {self._counters[agent]}"
+            measurement = {
+                'dbm': "N/A" if sig is None else sig,
+                'percent': 0 if sig is None else signal_dbm_to_percent(sig),
+                'timestamp': time.strftime("%H:%M:%S", time.localtime(t)),
+                'coordinates': (int(round(x)), int(round(y))),
+            }
+            if aps:
+                measurement['aps'] = aps
+            self.measurements[point_name] = measurement
+            merged[point_name] = measurement
+            if self.journal:
+                self.journal.append({'type': 'point', 'name': point_name, 'dbm': measurement['dbm'],
+                                     'percent': measurement['percent'], 'timestamp': measurement['timestamp'],
+                                     'coordinates': list(measurement['coordinates']), 'aps': aps or {}})
+        return merged
+
+    def stats(self):
+        return {
+            'queue_length': self._queue.qsize() if self._queue else 0,
+            'measurements': len(self.measurements),
+            'rejected': self.rejected,
+            'failed_batches': self.failed_batches,
+            'agents': {name: agent.snapshot() for name, agent in self.agents.items()},
+        }
+
+
+class ScanAgent:
+    # A posição de cada amostra vem de position() (None = desconhecida) ou, com walk, do trajeto
+    # marcado numa WalkSession; amostras sem posição não são enviadas
+    def __init__(self, scanner, ssid, name, host='127.0.0.1', port=DEFAULT_PORT, batch_size=32,
+                 flush_interval=0.5, max_pending=10000, position=None, walk=None):
+        self.scanner = scanner
+        self.ssid = ssid
+        self.name = name
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Sem crédito do coletor as amostras esperam aqui; acima do limite as mais antigas são descartadas
+        self.max_pending = max_pending
+        self.position = position or (lambda: getattr(scanner, 'last_position', None))
+        self.walk = walk
+
+        self.sent_batches = 0
+        self.sent_samples = 0
+        self.sent_bytes = 0
+        self.dropped = 0
+        self.unplaced = 0
+        self.credit_wait = 0.0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        write_frame(writer, FRAME_HELLO, json.dumps({'agent': self.name, 'ssid': self.ssid}).encode('utf-8'))
+        await writer.drain()
+
+        pending = deque()
+        produced = asyncio.Event()
+        credits = asyncio.Semaphore(0)
+        state = {'done': False, 'closed': False}
+        stop_event = threading.Event()
+
+        def push(sample):
+            if len(pending) >= self.max_pending:
+                pending.popleft()
+                self.dropped += 1
+            pending.append(sample)
+            if len(pending) >= self.batch_size:
+                produced.set()
+
+        def push_walk(samples):
+            for sample in samples:
+                push(sample)
+
+        def finish():
+            if self.walk is not None:
+                push_walk(self.walk.finish())
+                self.unplaced += self.walk.dropped
+            state['done'] = True
+            produced.set()
+
+        def produce():
+            try:
+                for t, sig, aps in self.scanner.stream(self.ssid, stop_event):
+                    if self.walk is not None:
+                        self.walk.add_sample(t, sig, aps)
+                        samples = self.walk.drain()
+                        if samples:
+                            loop.call_soon_threadsafe(push_walk, samples)
+                        continue
+                    position = self.position()
+                    if position is None:
+                        self.unplaced += 1
+                        continue
+                    loop.call_soon_threadsafe(push, (t, position[0], position[1], sig, aps))
+            finally:
+                loop.call_soon_threadsafe(finish)
+
+        async def read_credits():
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind is None:
+                    state['closed'] = True
+                    credits.release()
+                    return
+                if kind == FRAME_CREDIT:
+                    for _ in range(CREDIT.unpack(payload)[0]):
+                        credits.release()
+
+        credit_task = asyncio.create_task(read_credits())
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                if not state['done'] and len(pending) < self.batch_size:
+                    produced.clear()
+                    try:
+                        await asyncio.wait_for(produced.wait(), self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                if not pending:
+                    if state['done']:
+                        break
+                    continue
+
+                started = loop.time()
+                await credits.acquire()
+                self.credit_wait += loop.time() - started
+                if state['closed']:
+                    raise ConnectionError("O coletor encerrou a conexão")
+
+                batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+                payload = encode_batch(batch)
+                write_frame(writer, FRAME_BATCH, payload)
+                await writer.drain()
+                self.sent_batches += 1
+                self.sent_samples += len(batch)
+                self.sent_bytes += FRAME_HEADER.size + len(payload)
+
+            write_frame(writer, FRAME_BYE)
+            await writer.drain()
+            await producer
+        finally:
+            stop_event.set()
+            credit_task.cancel()
+            writer.close()
+
+    def stats(self):
+        return {
+            'batches': self.sent_batches,
+            'samples': self.sent_samples,
+            'bytes': self.sent_bytes,
+            'dropped': self.dropped,
+            'unplaced': self.unplaced,
+            'credit_wait_s': self.credit_wait,
+        }
+
+
+def _replay_scanner(path, interval):
+    from core.session import load_session
+    from core.wifi_scanner import ReplayScanner
+    return ReplayScanner.from_measurements(load_session(path).to_measurements(), interval=interval)
+
+
+async def _run_collector(args):
+    from core.journal import SurveyJournal
+
+    journal = SurveyJournal(args.output) if args.output and args.output.endswith('.jsonl') else None
+    if journal:
+        journal.append({'type': 'session', 'ssid': args.ssid, 'floorplan': args.floorplan})
+    collector = await SurveyCollector(args.host, args.port, window=args.window, journal=journal).start()
+    print(f"Coletor ouvindo em {args.host}:{collector.port}", file=sys.stderr)
+    try:
+        if args.duration:
+            await asyncio.sleep(args.duration)
+        else:
+            await asyncio.Event().wait()
+    finally:
+        await collector.stop()
+        if journal:
+            journal.close()
+        elif args.output:
+            from core.session import SurveyArrays, save_session
+            save_session(args.output, SurveyArrays.from_measurements(collector.measurements, ssid=args.ssid,
+                                                                     floorplan=args.floorplan))
+        json.dump(collector.stats(), sys.stdout, indent=2)
+        print()
+
+
+def _parse_position(text):
+    try:
+        x, y = (float(value) for value in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"posição inválida: {text!r} (use X,Y)")
+    return x, y
+
+
+def _read_waypoints(walk, stream):
+    # Cada linha "X,Y" marca onde o usuário está agora, como um clique no trajeto do app
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            walk.add_waypoint(*_parse_position(line))
+        except argparse.ArgumentTypeError as e:
+            print(f"Aviso: {e}", file=sys.stderr)
+
+
+async def _run_agent(args):
+    if args.replay:
+        scanner = _replay_scanner(args.replay, args.interval)
+    else:
+        from core.wifi_scanner import WifiScanner
+        scanner = WifiScanner()
+
+    position, walk = None, None
+    if args.position:
+        position = lambda: args.position
+    elif args.waypoints:
+        from core.walk import WalkSession
+        walk = WalkSession()
+        threading.Thread(target=_read_waypoints, args=(walk, sys.stdin), daemon=True).start()
+    agent = ScanAgent(scanner, args.ssid, args.name or socket.gethostname(), args.host, args.port,
+                      batch_size=args.batch_size, position=position, walk=walk)
+    await agent.run()
+    json.dump(agent.stats(), sys.stdout, indent=2)
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agentes de varredura remotos e coletor central da sessão")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    collector = subparsers.add_parser('collector', help="recebe medições dos agentes e monta uma sessão")
+    collector.add_argument('--host', default='127.0.0.1')
+    collector.add_argument('--port', type=int, default=DEFAULT_PORT)
+    collector.add_argument('--window', type=int, default=4, help="lotes em trânsito por agente")
+    collector.add_argument('--output', help="sessão de saída (.jsonl gravado continuamente, .npz ou .json ao final)")
+    collector.add_argument('--ssid')
+    collector.add_argument('--floorplan')
+    collector.add_argument('--duration', type=float, help="segundos até encerrar (padrão: até Ctrl+C)")
+
+    agent = subparsers.add_parser('agent', help="varre e envia medições ao coletor")
+    agent.add_argument('--host', default='127.0.0.1')
+    agent.add_argument('--port', type=int, default=DEFAULT_PORT)
+    agent.add_argument('--ssid', required=True)
+    agent.add_argument('--name')
+    agent.add_argument('--batch-size', type=int, default=32)
+    agent.add_argument('--replay', help="sessão gravada usada no lugar do scanner real")
+    agent.add_argument('--interval', type=float, default=0.0, help="intervalo entre amostras no modo replay")
+    placement = agent.add_mutually_exclusive_group()
+    placement.add_argument('--position', type=_parse_position, metavar='X,Y',
+                           help="agente parado: todas as amostras nesta posição da planta")
+    placement.add_argument('--waypoints', action='store_true',
+                           help="caminhada: lê linhas X,Y da entrada padrão ao passar por cada ponto")
+
+    args = parser.parse_args(argv)
+    if args.command == 'agent' and not (args.replay or args.position or args.waypoints):
+        parser.error("o agente precisa de --position ou --waypoints para posicionar as amostras")
+    try:
+        asyncio.run(_run_collector(args) if args.command == 'collector' else _run_agent(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
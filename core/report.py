@@ -0,0 +1,73 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from core.exporter import _remove_partial
+from core.metrics import metrics
+
+# A4 paisagem, em polegadas
+PAGE_SIZE = (11.69, 8.27)
+REPORT_DPI = 150
+# Páginas calculadas em paralelo com a gravação; 0 calcula tudo na thread do relatório.
+# Cada página calculada à frente mantém suas grades na memória até ser gravada; páginas já
+# gravadas só deixam no PdfPages o que ele retém até fechar o arquivo (ver report_pages)
+REPORT_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class ReportPage:
+    # compute() prepara os dados (grades, estatísticas) e pode rodar em outra thread;
+    # render(fig, dados) desenha numa Figure nova, sempre na thread que grava o PDF
+    __slots__ = ('title', 'compute', 'render')
+
+    def __init__(self, title, compute, render):
+        self.title = title
+        self.compute = compute
+        self.render = render
+
+
+def _computed_pages(pages, workers):
+    # Entrega (página, dados) na ordem do relatório; com workers > 0 calcula no máximo
+    # `workers` páginas à frente da que está sendo gravada, então ficam vivos os dados de
+    # até workers + 1 páginas. Os compute() rodam ao mesmo tempo e não podem gravar estado
+    # compartilhado no gerador
+    if workers <= 0:
+        for page in pages:
+            yield page, page.compute()
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for page in pages:
+            pending.append((page, pool.submit(page.compute)))
+            if len(pending) > workers:
+                page, future = pending.popleft()
+                yield page, future.result()
+        while pending:
+            page, future = pending.popleft()
+            yield page, future.result()
+
+
+@metrics.timed('export.report')
+def write_report(job, path, pages, total, workers=0, metadata=None):
+    # Importado aqui para não pesar na abertura do app
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    try:
+        with PdfPages(path, metadata=metadata) as pdf:
+            for i, (page, data) in enumerate(_computed_pages(pages, workers)):
+                if job is not None:
+                    job.report(i / total if total else 0.0, f"Página {i + 1}/{total}: {page.title}")
+                # Figure solta, fora do pyplot: sem referência global, é liberada ao sair do laço
+                fig = Figure(figsize=PAGE_SIZE)
+                with metrics.timer('report.page'):
+                    page.render(fig, data)
+                    pdf.savefig(fig, dpi=REPORT_DPI)
+                del fig, data
+    except BaseException:
+        _remove_partial(path)
+        raise
+    if job is not None:
+        job.progress = 1.0
+        job.message = "Concluído"
+    return path
@@ -0,0 +1,358 @@
+import json
+import os
+from collections.abc import MutableMapping
+
+import numpy as np
+
+# Valor atribuído a um AP que não apareceu na varredura de um ponto
+AP_FLOOR_DBM = -100.0
+
+
+def ap_frequencies(readings, bssids):
+    # Frequência (MHz) de cada BSSID; NaN quando o scanner não informou
+    freqs = {}
+    for aps in readings:
+        for bssid, reading in (aps or {}).items():
+            if reading.get('freq') and bssid not in freqs:
+                freqs[bssid] = reading['freq']
+    return np.array([freqs.get(bssid, np.nan) for bssid in bssids], dtype=np.float64)
+
+
+def ap_matrix(readings, ssid=None, fill_dbm=AP_FLOOR_DBM):
+    # readings: um dicionário {bssid: {'ssid', 'dbm'}} por ponto, na ordem das coordenadas
+    bssids = {}
+    for aps in readings:
+        for bssid, reading in (aps or {}).items():
+            if ssid is None or reading.get('ssid') == ssid:
+                bssids.setdefault(bssid, reading.get('ssid'))
+
+    columns = {bssid: k for k, bssid in enumerate(bssids)}
+    matrix = np.full((len(readings), len(columns)), fill_dbm, dtype=np.float64)
+    for i, aps in enumerate(readings):
+        for bssid, reading in (aps or {}).items():
+            k = columns.get(bssid)
+            if k is not None:
+                matrix[i, k] = reading['dbm']
+    return list(bssids), list(bssids.values()), matrix
+
+
+def ssid_measurements(measurements, ssid):
+    # Medições vistas pela rede indicada: em cada ponto, o AP mais forte dessa rede
+    points = {}
+    for name, measurement in measurements.items():
+        if 'coordinates' not in measurement:
+            continue
+        dbm = [reading['dbm'] for reading in (measurement.get('aps') or {}).values() if reading.get('ssid') == ssid]
+        if dbm:
+            points[name] = {'coordinates': measurement['coordinates'], 'dbm': max(dbm)}
+    return points
+
+
+def _dbm_value(dbm):
+    # float32 guarda -55.3 como -55.29999...; leituras têm no máximo uma casa decimal
+    return int(dbm) if dbm.is_integer() else round(dbm, 1)
+
+
+def _coordinate(value):
+    return int(value) if value.is_integer() else value
+
+
+class SurveyArrays:
+    def __init__(self, names, x, y, dbm, timestamps=None, ssid=None, floorplan=None, grid=None,
+                 ap_point=None, ap_index=None, ap_dbm=None, bssids=None, bssid_ssids=None, bssid_freqs=None,
+                 dbm_raw=None, ap_dbm_raw=None):
+        self.names = np.asarray(names, dtype=str)
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        # N/A é representado como NaN
+        self.dbm = np.asarray(dbm, dtype=np.float32)
+        # Leitura antes do filtro de suavização; NaN quando não houve filtro
+        self.dbm_raw = np.asarray(dbm_raw if dbm_raw is not None else np.full(len(self.dbm), np.nan),
+                                  dtype=np.float32)
+        if timestamps is None:
+            timestamps = np.full(len(self.names), '', dtype=str)
+        self.timestamps = np.asarray(timestamps, dtype=str)
+        self.ssid = ssid
+        self.floorplan = floorplan
+        self.grid = grid or {}
+
+        # Leituras por BSSID em formato longo: (ponto, AP, dBm)
+        self.ap_point = np.asarray(ap_point if ap_point is not None else [], dtype=np.int32)
+        self.ap_index = np.asarray(ap_index if ap_index is not None else [], dtype=np.int32)
+        self.ap_dbm = np.asarray(ap_dbm if ap_dbm is not None else [], dtype=np.float32)
+        self.ap_dbm_raw = np.asarray(ap_dbm_raw if ap_dbm_raw is not None else np.full(len(self.ap_dbm), np.nan),
+                                     dtype=np.float32)
+        self.bssids = np.asarray(bssids if bssids is not None else [], dtype=str)
+        self.bssid_ssids = np.asarray(bssid_ssids if bssid_ssids is not None else [], dtype=str)
+        # 0 = frequência desconhecida
+        self.bssid_freqs = np.asarray(bssid_freqs if bssid_freqs is not None else np.zeros(len(self.bssids)),
+                                      dtype=np.int32)
+        self._ap_order = None
+        self._ap_bounds = None
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def valid_mask(self):
+        return ~np.isnan(self.dbm)
+
+    def valid(self):
+        mask = self.valid_mask
+        return self.x[mask], self.y[mask], self.dbm[mask].astype(np.float64)
+
+    def _ap_reading(self, index, dbm, raw):
+        from core.utils import freq_to_channel
+        reading = {
+            'ssid': str(self.bssid_ssids[index]),
+            'dbm': _dbm_value(dbm),
+        }
+        if raw == raw:
+            reading['dbm_raw'] = _dbm_value(raw)
+        freq = int(self.bssid_freqs[index])
+        if freq:
+            reading['freq'] = freq
+            reading['channel'] = freq_to_channel(freq)
+        return reading
+
+    def ap_readings(self):
+        readings = [{} for _ in range(len(self.names))]
+        for point, index, dbm, raw in zip(self.ap_point.tolist(), self.ap_index.tolist(), self.ap_dbm.tolist(),
+                                          self.ap_dbm_raw.tolist()):
+            readings[point][str(self.bssids[index])] = self._ap_reading(index, dbm, raw)
+        return readings
+
+    def point_aps(self, i):
+        # Leituras por AP de um único ponto; o índice por ponto é montado no primeiro uso
+        if self._ap_bounds is None:
+            self._ap_order = np.argsort(self.ap_point, kind='stable')
+            self._ap_bounds = np.searchsorted(self.ap_point[self._ap_order], np.arange(len(self.names) + 1))
+        rows = self._ap_order[self._ap_bounds[i]:self._ap_bounds[i + 1]]
+        return {str(self.bssids[index]): self._ap_reading(index, dbm, raw)
+                for index, dbm, raw in zip(self.ap_index[rows].tolist(), self.ap_dbm[rows].tolist(),
+                                           self.ap_dbm_raw[rows].tolist())}
+
+    @classmethod
+    def from_measurements(cls, measurements, ssid=None, floorplan=None):
+        names, xs, ys, dbms, timestamps, raws = [], [], [], [], [], []
+        ap_point, ap_index, ap_dbm, ap_raw = [], [], [], []
+        bssid_columns, bssid_ssids, bssid_freqs = {}, [], []
+        grid = {}
+        for name, measurement in measurements.items():
+            if 'dbm' not in measurement:
+                # Modo grade: local -> ponto -> medição
+                grid[name] = dict(measurement)
+                continue
+            coords = measurement.get('coordinates', (0, 0))
+            dbm = measurement['dbm']
+            names.append(name)
+            xs.append(coords[0])
+            ys.append(coords[1])
+            dbms.append(np.nan if dbm in ('N/A', None) else float(dbm))
+            timestamps.append(measurement.get('timestamp') or '')
+            raw = measurement.get('dbm_raw')
+            raws.append(np.nan if raw in ('N/A', None) else float(raw))
+            for bssid, reading in measurement.get('aps', {}).items():
+                if bssid not in bssid_columns:
+                    bssid_columns[bssid] = len(bssid_ssids)
+                    bssid_ssids.append(reading.get('ssid') or '')
+                    bssid_freqs.append(reading.get('freq') or 0)
+                ap_point.append(len(names) - 1)
+                ap_index.append(bssid_columns[bssid])
+                ap_dbm.append(reading['dbm'])
+                ap_raw.append(reading.get('dbm_raw', np.nan))
+        return cls(names, xs, ys, dbms, timestamps, ssid=ssid, floorplan=floorplan, grid=grid,
+                   ap_point=ap_point, ap_index=ap_index, ap_dbm=ap_dbm,
+                   bssids=list(bssid_columns), bssid_ssids=bssid_ssids, bssid_freqs=bssid_freqs,
+                   dbm_raw=raws, ap_dbm_raw=ap_raw)
+
+    def measurement(self, i, aps=None):
+        from core.utils import signal_dbm_to_percent
+        dbm = float(self.dbm[i])
+        if np.isnan(dbm):
+            dbm_value = 'N/A'
+            percent = 0
+        else:
+            dbm_value = _dbm_value(dbm)
+            percent = signal_dbm_to_percent(dbm_value)
+        measurement = {
+            'dbm': dbm_value,
+            'percent': percent,
+            'timestamp': str(self.timestamps[i]),
+            'coordinates': (_coordinate(float(self.x[i])), _coordinate(float(self.y[i]))),
+        }
+        if aps is None and len(self.ap_point):
+            aps = self.point_aps(i)
+        if aps:
+            measurement['aps'] = aps
+        raw = float(self.dbm_raw[i])
+        if not np.isnan(raw):
+            measurement['dbm_raw'] = _dbm_value(raw)
+        return measurement
+
+    def iter_measurements(self):
+        readings = self.ap_readings() if len(self.ap_point) else None
+        for i in range(len(self.names)):
+            yield str(self.names[i]), self.measurement(i, readings[i] if readings else {})
+
+    def to_measurements(self):
+        return dict(self.iter_measurements())
+
+
+class SurveyMeasurements(MutableMapping):
+    # SurveyArrays vista como o dicionário de medições do app (nome -> medição). O dicionário de
+    # cada ponto só é montado no primeiro acesso; pontos novos e locais do modo grade entram direto
+    def __init__(self, survey):
+        self.survey = survey
+        # Ponto ainda não acessado guarda só a linha nas colunas
+        self._data = dict(zip(survey.names.tolist(), range(len(survey))))
+        for local, points in survey.grid.items():
+            self._data[local] = dict(points)
+
+    def __getitem__(self, name):
+        value = self._data[name]
+        if type(value) is int:
+            value = self._data[name] = self.survey.measurement(value)
+        return value
+
+    def __setitem__(self, name, measurement):
+        self._data[name] = measurement
+
+    def __delitem__(self, name):
+        del self._data[name]
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+
+    def rows(self):
+        # (nome, coordenadas, dBm) de cada medição direto das colunas, sem montar dicionários
+        survey = self.survey
+        xs, ys, dbms = survey.x.tolist(), survey.y.tolist(), survey.dbm.tolist()
+        for name, value in self._data.items():
+            if type(value) is int:
+                dbm = dbms[value]
+                yield name, (_coordinate(xs[value]), _coordinate(ys[value])), 'N/A' if dbm != dbm else _dbm_value(dbm)
+            else:
+                yield name, value.get('coordinates', (0, 0)), value.get('dbm', 'N/A')
+
+
+def point_rows(measurements):
+    # (nome, coordenadas, dBm) de cada medição, para listas e tabelas
+    if isinstance(measurements, SurveyMeasurements):
+        return measurements.rows()
+    return ((name, m.get('coordinates', (0, 0)), m.get('dbm', 'N/A')) for name, m in measurements.items())
+
+
+def merge_surveys(base, update):
+    # Pontos de update substituem os de mesmo nome em base; os restantes de base vêm antes, na ordem original
+    keep = np.flatnonzero(~np.isin(base.names, update.names))
+    position = np.full(len(base), -1, dtype=np.int64)
+    position[keep] = np.arange(len(keep))
+    ap_keep = position[base.ap_point] >= 0
+
+    columns = {bssid: k for k, bssid in enumerate(base.bssids.tolist())}
+    ssids, freqs = base.bssid_ssids.tolist(), base.bssid_freqs.tolist()
+    remap = []
+    for bssid, ssid, freq in zip(update.bssids.tolist(), update.bssid_ssids.tolist(), update.bssid_freqs.tolist()):
+        if bssid not in columns:
+            columns[bssid] = len(ssids)
+            ssids.append(ssid)
+            freqs.append(freq)
+        remap.append(columns[bssid])
+    remap = np.asarray(remap, dtype=np.int32)
+
+    grid = {local: dict(points) for local, points in base.grid.items()}
+    for local, points in update.grid.items():
+        grid.setdefault(local, {}).update(points)
+    return SurveyArrays(
+        np.concatenate([base.names[keep], update.names]), np.concatenate([base.x[keep], update.x]),
+        np.concatenate([base.y[keep], update.y]), np.concatenate([base.dbm[keep], update.dbm]),
+        np.concatenate([base.timestamps[keep], update.timestamps]),
+        ssid=update.ssid or base.ssid, floorplan=update.floorplan or base.floorplan, grid=grid,
+        ap_point=np.concatenate([position[base.ap_point[ap_keep]], update.ap_point + len(keep)]),
+        ap_index=np.concatenate([base.ap_index[ap_keep], remap[update.ap_index]]),
+        ap_dbm=np.concatenate([base.ap_dbm[ap_keep], update.ap_dbm]),
+        ap_dbm_raw=np.concatenate([base.ap_dbm_raw[ap_keep], update.ap_dbm_raw]),
+        bssids=list(columns), bssid_ssids=ssids, bssid_freqs=freqs,
+        dbm_raw=np.concatenate([base.dbm_raw[keep], update.dbm_raw]))
+
+
+def journal_survey(session):
+    # Sessão de um diário já lido: a base em .npz (se houver) mais as medições gravadas depois dela
+    survey = SurveyArrays.from_measurements({**session['points'], **session['grid']},
+                                            ssid=session['ssid'], floorplan=session['floorplan'])
+    if not session.get('base'):
+        return survey
+    try:
+        base = load_session_npz(session['base'])
+    except OSError as e:
+        print(f"Aviso: base da sessão indisponível ({e}); restaurando só o diário")
+        return survey
+    return merge_surveys(base, survey)
+
+
+def load_session_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    # Aceita o formato do botão "Salvar" e o da janela do mapa de calor
+    metadata = data.get('metadata', {})
+    ssid = data.get('ssid', metadata.get('ssid'))
+    floorplan = data.get('floorplan', metadata.get('floorplan'))
+    return SurveyArrays.from_measurements(data.get('measurements', {}), ssid=ssid, floorplan=floorplan)
+
+
+OPTIONAL_COLUMNS = ('ap_point', 'ap_index', 'ap_dbm', 'ap_dbm_raw', 'bssids', 'bssid_ssids', 'bssid_freqs', 'dbm_raw')
+
+
+def save_session_npz(path, survey):
+    meta = json.dumps({
+        'ssid': survey.ssid,
+        'floorplan': survey.floorplan,
+        'grid': survey.grid,
+    }, ensure_ascii=False)
+    # Sem compressão para que a leitura seja apenas uma cópia de memória
+    np.savez(path, names=survey.names, x=survey.x, y=survey.y, dbm=survey.dbm,
+             timestamps=survey.timestamps, meta=np.array(meta),
+             **{key: getattr(survey, key) for key in OPTIONAL_COLUMNS})
+
+
+def load_session_npz(path):
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data['meta']))
+        # Arquivos mais antigos não têm as colunas opcionais
+        optional = {key: data[key] for key in OPTIONAL_COLUMNS if key in data.files}
+        return SurveyArrays(data['names'], data['x'], data['y'], data['dbm'], data['timestamps'],
+                            ssid=meta.get('ssid'), floorplan=meta.get('floorplan'), grid=meta.get('grid'),
+                            **optional)
+
+
+def load_session(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npz':
+        return load_session_npz(path)
+    if extension == '.jsonl':
+        from core.journal import load_journal
+        return journal_survey(load_journal(path))
+    return load_session_json(path)
+
+
+def save_session(path, survey):
+    if path.lower().endswith('.npz'):
+        save_session_npz(path, survey)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'ssid': survey.ssid,
+            'floorplan': survey.floorplan,
+            'measurements': {**survey.to_measurements(), **survey.grid},
+        }, f, ensure_ascii=False)
@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get('WIFI_MAPA_STARTUP_REPORT', '') not in ('', '0')
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.phases = []
+        self._printed = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        modules_before = set(sys.modules)
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - phase_start
+            # Agrupa por pacote raiz os módulos carregados durante a fase
+            new_modules = Counter(module.split('.')[0] for module in set(sys.modules) - modules_before)
+            with self._lock:
+                self.phases.append({
+                    'name': name,
+                    'thread': threading.current_thread().name,
+                    'offset_ms': (phase_start - self.start) * 1000,
+                    'elapsed_ms': elapsed * 1000,
+                    'modules': dict(new_modules.most_common()),
+                })
+
+    def mark(self, name):
+        with self._lock:
+            self.phases.append({
+                'name': name,
+                'thread': threading.current_thread().name,
+                'offset_ms': (time.perf_counter() - self.start) * 1000,
+                'elapsed_ms': 0.0,
+                'modules': {},
+            })
+
+    def report(self, start=0):
+        lines = ["Relatório de inicialização", "=" * 26] if start == 0 else []
+        with self._lock:
+            phases = self.phases[start:]
+        for phase in phases:
+            lines.append(f"{phase['offset_ms']:9.1f} ms  +{phase['elapsed_ms']:8.1f} ms  "
+                         f"{phase['name']} [{phase['thread']}]")
+            for package, count in list(phase['modules'].items())[:8]:
+                lines.append(f"{'':32}{package}: {count} módulos")
+        return "\n".join(lines)
+
+    def print_report(self):
+        # Cada chamada imprime só as fases registradas desde a anterior: o pré-aquecimento
+        # em segundo plano termina depois do primeiro quadro e acrescenta apenas a sua linha
+        if not self.enabled:
+            return
+        with self._lock:
+            start, self._printed = self._printed, len(self.phases)
+        if start < self._printed:
+            print(self.report(start))
+
+
+profiler = StartupProfiler()
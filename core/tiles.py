@@ -0,0 +1,101 @@
+from collections import OrderedDict
+
+from PIL import Image
+
+
+class TilePyramid:
+    def __init__(self, image, tile_size=256, cache_size=256):
+        self.tile_size = tile_size
+        self.width, self.height = image.size
+
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        # Nível 0 = resolução original, cada nível seguinte tem metade do tamanho
+        self.levels = [image]
+        while max(self.levels[-1].size) > tile_size:
+            self.levels.append(self.levels[-1].reduce(2))
+
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def level_count(self):
+        return len(self.levels)
+
+    def level_factor(self, level):
+        return self.width / self.levels[level].size[0]
+
+    def level_for_scale(self, scale):
+        # Escolhe o nível mais reduzido que ainda tem pelo menos 1 pixel por pixel de tela
+        level = 0
+        for i in range(1, len(self.levels)):
+            if self.level_factor(i) * scale <= 1.0:
+                level = i
+            else:
+                break
+        return level
+
+    def tile_grid(self, level):
+        level_width, level_height = self.levels[level].size
+        cols = (level_width + self.tile_size - 1) // self.tile_size
+        rows = (level_height + self.tile_size - 1) // self.tile_size
+        return cols, rows
+
+    def tile_bounds(self, level, col, row):
+        # Limites do tile em coordenadas da imagem original
+        factor = self.level_factor(level)
+        level_width, level_height = self.levels[level].size
+        left = col * self.tile_size
+        top = row * self.tile_size
+        right = min(left + self.tile_size, level_width)
+        bottom = min(top + self.tile_size, level_height)
+        return left * factor, top * factor, right * factor, bottom * factor
+
+    def visible_tiles(self, level, x0, y0, x1, y1):
+        factor = self.level_factor(level)
+        cols, rows = self.tile_grid(level)
+        span = self.tile_size * factor
+
+        col_start = max(0, int(x0 // span))
+        col_end = min(cols - 1, int(x1 // span))
+        row_start = max(0, int(y0 // span))
+        row_end = min(rows - 1, int(y1 // span))
+
+        for row in range(row_start, row_end + 1):
+            for col in range(col_start, col_end + 1):
+                yield col, row
+
+    def tile(self, level, col, row):
+        key = (level, col, row)
+        tile = self._cache.get(key)
+        if tile is not None:
+            self._cache.move_to_end(key)
+            return tile
+
+        level_width, level_height = self.levels[level].size
+        left = col * self.tile_size
+        top = row * self.tile_size
+        box = (left, top,
+               min(left + self.tile_size, level_width),
+               min(top + self.tile_size, level_height))
+        tile = self.levels[level].crop(box)
+        tile.load()
+
+        self._cache[key] = tile
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return tile
+
+    def render_tile(self, level, col, row, scale):
+        # Redimensiona apenas o tile visível para a escala atual
+        tile = self.tile(level, col, row)
+        left, top, right, bottom = self.tile_bounds(level, col, row)
+        width = max(1, int(round(right * scale)) - int(round(left * scale)))
+        height = max(1, int(round(bottom * scale)) - int(round(top * scale)))
+        if (width, height) == tile.size:
+            return tile
+        return tile.resize((width, height), Image.Resampling.BILINEAR)
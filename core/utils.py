@@ -1,13 +1,53 @@
+from bisect import bisect_right
+from functools import lru_cache
+
+# Paleta de referência do README: (dBm, cor), do sinal mais fraco ao mais forte
+DBM_COLOR_STOPS = [
+    (-80, '#FF0000'),
+    (-70, '#FF4500'),
+    (-60, '#FFA500'),
+    (-50, '#ADFF2F'),
+    (-40, '#90EE90'),
+    (-30, '#00FFFF'),
+]
+DBM_COLORS = [color for _, color in DBM_COLOR_STOPS]
+DBM_STATUS_LEVELS = ["Muito Ruim", "Ruim", "Regular", "Bom", "Muito Bom", "Excelente"]
+# Limite inferior (>=) de cada classe acima de "Muito Ruim"
+DBM_THRESHOLDS = [dbm for dbm, _ in DBM_COLOR_STOPS[1:]]
+
+# Tabelas para valores inteiros na faixa realista de RSSI
+LUT_MIN_DBM = -120
+LUT_MAX_DBM = 0
+
+
+def _percent_formula(val):
+    if val != val or val <= -100:
+        return 0
+    if val >= -50:
+        return 100
+    return max(0, min(100, int(round(2 * (val + 100)))))
+
+
+_PERCENT_LUT = [_percent_formula(dbm) for dbm in range(LUT_MIN_DBM, LUT_MAX_DBM + 1)]
+_CLASS_LUT = [bisect_right(DBM_THRESHOLDS, dbm) for dbm in range(LUT_MIN_DBM, LUT_MAX_DBM + 1)]
+
+
+def dbm_class(dbm_val):
+    if type(dbm_val) is int and LUT_MIN_DBM <= dbm_val <= LUT_MAX_DBM:
+        return _CLASS_LUT[dbm_val - LUT_MIN_DBM]
+    if dbm_val != dbm_val:
+        return 0
+    return bisect_right(DBM_THRESHOLDS, dbm_val)
+
+
 def signal_dbm_to_percent(dbm):
+    if type(dbm) is int and LUT_MIN_DBM <= dbm <= LUT_MAX_DBM:
+        return _PERCENT_LUT[dbm - LUT_MIN_DBM]
     try:
         val = float(dbm)
     except Exception:
         return 0
-    if val <= -100:
-        return 0
-    if val >= -50:
-        return 100
-    return max(0, min(100, int(round(2 * (val + 100)))))
+    return _percent_formula(val)
 
 def signal_to_color(pct):
     if pct <= 33:
@@ -22,21 +62,7 @@ def dbm_to_color(dbm):
         return "gray"
 
     try:
-        dbm_val = float(dbm)
-
-        # Tabela baseada no README
-        if dbm_val >= -30:
-            return "#00FFFF"  # Ciano - Excelente
-        elif dbm_val >= -40:
-            return "#90EE90"  # Verde claro - Muito Bom
-        elif dbm_val >= -50:
-            return "#ADFF2F"  # Amarelo esverdeado - Bom
-        elif dbm_val >= -60:
-            return "#FFA500"  # Laranja - Regular
-        elif dbm_val >= -70:
-            return "#FF4500"  # Laranja avermelhado - Ruim
-        else:
-            return "#FF0000"  # Vermelho - Muito Ruim
+        return DBM_COLORS[dbm_class(dbm if type(dbm) is int else float(dbm))]
     except:
         return "gray"
 
@@ -45,31 +71,19 @@ def dbm_to_status(dbm):
         return "Sem sinal"
 
     try:
-        dbm_val = float(dbm)
-
-        if dbm_val >= -30:
-            return "Excelente"
-        elif dbm_val >= -40:
-            return "Muito Bom"
-        elif dbm_val >= -50:
-            return "Bom"
-        elif dbm_val >= -60:
-            return "Regular"
-        elif dbm_val >= -70:
-            return "Ruim"
-        else:
-            return "Muito Ruim"
+        return DBM_STATUS_LEVELS[dbm_class(dbm if type(dbm) is int else float(dbm))]
     except:
         return "Sem sinal"
 
-def interpolate_color(color1, color2, factor):
-    def hex_to_rgb(hex_color):
-        hex_color = hex_color.lstrip('#')
-        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+@lru_cache(maxsize=256)
+def hex_to_rgb(hex_color):
+    hex_color = hex_color.lstrip('#')
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
-    def rgb_to_hex(rgb):
-        return '#{:02x}{:02x}{:02x}'.format(*rgb)
+def rgb_to_hex(rgb):
+    return '#{:02x}{:02x}{:02x}'.format(*rgb)
 
+def interpolate_color(color1, color2, factor):
     rgb1 = hex_to_rgb(color1)
     rgb2 = hex_to_rgb(color2)
 
@@ -78,4 +92,98 @@ def interpolate_color(color1, color2, factor):
         for i in range(3)
     )
 
-    return rgb_to_hex(interpolated_rgb)
\ No newline at end of file
+    return rgb_to_hex(interpolated_rgb)
+
+# Canais de 20 MHz: APs cujas frequências centrais diferem menos que isso se sobrepõem
+CHANNEL_WIDTH_MHZ = 20
+# Sinal a partir do qual outro AP no mesmo canal disputa o meio
+CCI_THRESHOLD_DBM = -82
+NOISE_FLOOR_DBM = -95
+
+def normalize_freq(freq):
+    # pywifi informa MHz no Linux e kHz no Windows
+    if freq is None or freq <= 0:
+        return None
+    return freq // 1000 if freq > 100000 else freq
+
+def freq_to_channel(freq):
+    freq = normalize_freq(freq)
+    if freq is None:
+        return None
+    if freq == 2484:
+        return 14
+    if 2412 <= freq <= 2472:
+        return (freq - 2407) // 5
+    if 5955 <= freq <= 7115:
+        return (freq - 5950) // 5
+    if 5160 <= freq <= 5885:
+        return (freq - 5000) // 5
+    return None
+
+
+# Versões vetorizadas: recebem arrays de dBm (NaN = sem medição) e mapeiam tudo de uma vez
+_array_tables = None
+
+
+def _tables():
+    global _array_tables
+    if _array_tables is None:
+        import numpy as np
+        # Índice 0 reservado para "sem sinal"
+        _array_tables = {
+            'percent': np.array(_PERCENT_LUT, dtype=np.int16),
+            'class': np.array(_CLASS_LUT, dtype=np.int8) + 1,
+            'thresholds': np.array(DBM_THRESHOLDS, dtype=np.float64),
+            'colors': np.array(["gray"] + DBM_COLORS),
+            'status': np.array(["Sem sinal"] + DBM_STATUS_LEVELS),
+        }
+    return _array_tables
+
+
+def _as_lut_index(np, arr):
+    if np.issubdtype(arr.dtype, np.integer) and arr.size and \
+            arr.min() >= LUT_MIN_DBM and arr.max() <= LUT_MAX_DBM:
+        return arr - LUT_MIN_DBM
+    return None
+
+
+def to_dbm_array(values):
+    import numpy as np
+    if isinstance(values, np.ndarray):
+        return values
+    # Converte listas com "N/A"/None vindas das medições
+    return np.array([np.nan if v in ("N/A", None) else float(v) for v in values], dtype=np.float64)
+
+
+def dbm_class_array(dbm):
+    import numpy as np
+    tables = _tables()
+    arr = np.asarray(dbm)
+    index = _as_lut_index(np, arr)
+    if index is not None:
+        return tables['class'][index]
+    arr = arr.astype(np.float64, copy=False)
+    classes = np.searchsorted(tables['thresholds'], arr, side='right').astype(np.int8) + 1
+    classes[np.isnan(arr)] = 0
+    return classes
+
+
+def signal_dbm_to_percent_array(dbm):
+    import numpy as np
+    tables = _tables()
+    arr = np.asarray(dbm)
+    index = _as_lut_index(np, arr)
+    if index is not None:
+        return tables['percent'][index]
+    arr = arr.astype(np.float64, copy=False)
+    percent = np.clip(np.rint(2 * (arr + 100)), 0, 100)
+    percent[np.isnan(arr)] = 0
+    return percent.astype(np.int16)
+
+
+def dbm_to_color_array(dbm):
+    return _tables()['colors'][dbm_class_array(dbm)]
+
+
+def dbm_to_status_array(dbm):
+    return _tables()['status'][dbm_class_array(dbm)]
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import numpy as np
+
+from core.metrics import metrics
+
+
+class WalkSession:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Pontos do trajeto marcados pelo usuário: (instante, x, y) em coordenadas da imagem
+        self.waypoints = []
+        # Amostras do scanner que ainda não têm posição: (instante, dBm, leituras por AP)
+        self._pending = []
+        self.positioned = 0
+        self.dropped = 0
+
+    def add_waypoint(self, x, y, t=None):
+        t = time.time() if t is None else t
+        with self._lock:
+            # np.interp exige instantes crescentes
+            if self.waypoints and t <= self.waypoints[-1][0]:
+                t = self.waypoints[-1][0] + 1e-6
+            self.waypoints.append((t, x, y))
+
+    def add_sample(self, t, sig, aps=None):
+        with self._lock:
+            self._pending.append((t, sig, aps or {}))
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def drain(self):
+        # Devolve as amostras cujo instante já está coberto pelo trajeto, com a posição interpolada no tempo
+        with self._lock:
+            if not self.waypoints:
+                return []
+            last_t = self.waypoints[-1][0]
+            ready = [sample for sample in self._pending if sample[0] <= last_t]
+            if not ready:
+                return []
+            self._pending = [sample for sample in self._pending if sample[0] > last_t]
+            times, xs, ys = (np.array(column, dtype=np.float64) for column in zip(*self.waypoints))
+
+        sample_times = np.array([sample[0] for sample in ready])
+        # Antes do primeiro ponto do trajeto não há como saber onde o usuário estava
+        inside = sample_times >= times[0]
+        px = np.interp(sample_times, times, xs)
+        py = np.interp(sample_times, times, ys)
+
+        samples = [(t, x, y, sig, aps)
+                   for (t, sig, aps), x, y, keep in zip(ready, px.tolist(), py.tolist(), inside.tolist()) if keep]
+        with self._lock:
+            self.positioned += len(samples)
+            self.dropped += len(ready) - len(samples)
+        metrics.count('walk.samples_positioned', len(samples))
+        return samples
+
+    def finish(self):
+        samples = self.drain()
+        with self._lock:
+            # Amostras depois do último ponto do trajeto ficam sem posição
+            self.dropped += len(self._pending)
+            self._pending = []
+        return samples
+
+
+class WalkRecorder:
+    def __init__(self, scanner, ssid, session, on_sample=None):
+        self.scanner = scanner
+        self.ssid = ssid
+        self.session = session
+        self.on_sample = on_sample
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # A varredura em andamento termina sozinha; a thread é daemon
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def _run(self):
+        for t, sig, aps in self.scanner.stream(self.ssid, self._stop):
+            self.session.add_sample(t, sig, aps)
+            self.samples += 1
+            metrics.count('walk.samples')
+            if self.on_sample:
+                self.on_sample()
@@ -1,22 +1,40 @@
 import time
-import pywifi
-from pywifi import PyWiFi
+
+from core.metrics import metrics
+from core.utils import freq_to_channel, normalize_freq
 
 class WifiScanner:
     def __init__(self):
-        self.wifi = PyWiFi()
-        self.iface = self.wifi.interfaces()[0] if self.wifi.interfaces() else None
+        # pywifi só é carregado no primeiro uso da interface
+        self.wifi = None
+        self._iface = None
+        self._initialized = False
 
-    def scan_once(self, target_ssid):
+    @property
+    def iface(self):
+        if not self._initialized:
+            self._initialized = True
+            from pywifi import PyWiFi
+            self.wifi = PyWiFi()
+            interfaces = self.wifi.interfaces()
+            self._iface = interfaces[0] if interfaces else None
+        return self._iface
+
+    def _scan_raw(self):
         if self.iface is None:
             return None
         try:
             self.iface.scan()
-            time.sleep(1.0)
-            raw = self.iface.scan_results()
+            with metrics.timer('scanner.scan_wait'):
+                time.sleep(1.0)
+            with metrics.timer('scanner.scan_results'):
+                return self.iface.scan_results()
         except Exception:
+            metrics.count('scanner.scan_failures')
             return None
 
+    @staticmethod
+    def _best_signal(raw, target_ssid):
         best_signal = None
         for r in raw:
             if r.ssid == target_ssid:
@@ -25,6 +43,38 @@ class WifiScanner:
                     best_signal = sig
         return best_signal
 
+    @metrics.timed('scanner.scan_once')
+    def scan_once(self, target_ssid):
+        raw = self._scan_raw()
+        if raw is None:
+            return None
+        return self._best_signal(raw, target_ssid)
+
+    @metrics.timed('scanner.scan_once')
+    def scan_detailed(self, target_ssid):
+        # Melhor sinal da rede alvo + leitura de cada BSSID visível na mesma varredura
+        raw = self._scan_raw()
+        if raw is None:
+            return None, {}
+
+        readings = {}
+        for r in raw:
+            sig = getattr(r, 'signal', None)
+            bssid = getattr(r, 'bssid', None)
+            if sig is None or not bssid:
+                continue
+            bssid = bssid.lower().rstrip(':')
+            previous = readings.get(bssid)
+            if previous is None or sig > previous['dbm']:
+                reading = {'ssid': r.ssid, 'dbm': sig}
+                freq = normalize_freq(getattr(r, 'freq', None))
+                if freq is not None:
+                    reading['freq'] = freq
+                    reading['channel'] = freq_to_channel(freq)
+                readings[bssid] = reading
+        return self._best_signal(raw, target_ssid), readings
+
+    @metrics.timed('scanner.scan_networks')
     def scan_networks(self):
         if self.iface is None:
             return []
@@ -41,4 +91,83 @@ class WifiScanner:
             
             return lista_ssids
         except Exception:
-            return []
\ No newline at end of file
+            return []
+
+    def stream(self, target_ssid, stop_event, retry_interval=1.0):
+        # Varreduras contínuas com o instante de cada uma (meio da varredura, em time.time())
+        while not stop_event.is_set():
+            start = time.time()
+            sig, aps = self.scan_detailed(target_ssid)
+            if stop_event.is_set():
+                break
+            if sig is None and not aps:
+                # Interface indisponível ou falha: evita girar em vazio
+                stop_event.wait(retry_interval)
+                continue
+            yield (start + time.time()) / 2, sig, aps
+
+
+class ReplayScanner:
+    # Reproduz amostras gravadas com a mesma interface do WifiScanner, sem pywifi nem rádio
+    def __init__(self, samples, interval=0.0, repeat=False):
+        # samples: sequência de (dBm da rede gravada, leituras por AP, coordenadas ou None)
+        self.samples = list(samples)
+        self.interval = interval
+        self.repeat = repeat
+        self.last_position = None
+        self._index = 0
+
+    @classmethod
+    def from_measurements(cls, measurements, **kwargs):
+        samples = []
+        for measurement in measurements.values():
+            if 'dbm' not in measurement:
+                continue
+            dbm = measurement.get('dbm_raw', measurement['dbm'])
+            samples.append((None if dbm == 'N/A' else dbm, measurement.get('aps') or {},
+                            measurement.get('coordinates')))
+        return cls(samples, **kwargs)
+
+    def _next_sample(self):
+        if self._index >= len(self.samples):
+            if not self.repeat or not self.samples:
+                return None
+            self._index = 0
+        sample = self.samples[self._index]
+        self._index += 1
+        self.last_position = sample[2]
+        return sample
+
+    @staticmethod
+    def _signal_for(target_ssid, sig, aps):
+        signals = [r['dbm'] for r in aps.values() if r.get('ssid') == target_ssid]
+        return max(signals) if signals else sig
+
+    def scan_networks(self):
+        ssids = []
+        for _, aps, _ in self.samples:
+            for reading in aps.values():
+                if reading.get('ssid') and reading['ssid'] not in ssids:
+                    ssids.append(reading['ssid'])
+        return ssids
+
+    def scan_detailed(self, target_ssid):
+        sample = self._next_sample()
+        if sample is None:
+            return None, {}
+        sig, aps, _ = sample
+        return self._signal_for(target_ssid, sig, aps), dict(aps)
+
+    def scan_once(self, target_ssid):
+        return self.scan_detailed(target_ssid)[0]
+
+    def stream(self, target_ssid, stop_event, retry_interval=1.0):
+        # Termina quando as amostras acabam (a menos que repeat=True)
+        while not stop_event.is_set():
+            sample = self._next_sample()
+            if sample is None:
+                return
+            if self.interval:
+                stop_event.wait(self.interval)
+            sig, aps, _ = sample
+            yield time.time(), self._signal_for(target_ssid, sig, aps), dict(aps)
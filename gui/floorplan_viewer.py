@@ -0,0 +1,160 @@
+from PIL import ImageTk
+
+from core.metrics import metrics
+from core.tiles import TilePyramid
+
+
+class FloorplanViewer:
+    def __init__(self, canvas, on_view_changed=None, min_scale=0.05, max_scale=8.0):
+        self.canvas = canvas
+        self.on_view_changed = on_view_changed
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+
+        self.pyramid = None
+        self.scale = 1.0
+        self.base_scale = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+
+        self._photos = {}
+        self._render_pending = False
+        self._pan_start = None
+
+        self.canvas.bind('<MouseWheel>', self._on_mousewheel)
+        self.canvas.bind('<Button-4>', lambda e: self.zoom_at(e.x, e.y, 1.25))
+        self.canvas.bind('<Button-5>', lambda e: self.zoom_at(e.x, e.y, 0.8))
+        for button in (2, 3):
+            self.canvas.bind(f'<ButtonPress-{button}>', self._on_pan_start)
+            self.canvas.bind(f'<B{button}-Motion>', self._on_pan_move)
+            self.canvas.bind(f'<ButtonRelease-{button}>', self._on_pan_end)
+        self.canvas.bind('<Configure>', lambda e: self.schedule_render())
+
+    @property
+    def has_image(self):
+        return self.pyramid is not None
+
+    @property
+    def image_size(self):
+        return self.pyramid.size if self.pyramid else (0, 0)
+
+    def set_image(self, image):
+        self.pyramid = TilePyramid(image)
+        self._photos.clear()
+        self.fit()
+
+    def clear(self):
+        self.pyramid = None
+        self._photos.clear()
+        self.canvas.delete('tile')
+
+    def _viewport_size(self):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        # Antes do primeiro desenho o canvas ainda não tem tamanho real
+        if width <= 1 or height <= 1:
+            width, height = 600, 400
+        return width, height
+
+    def fit(self):
+        if not self.pyramid:
+            return
+        view_width, view_height = self._viewport_size()
+        img_width, img_height = self.pyramid.size
+        self.scale = min(view_width / img_width, view_height / img_height, 1.0)
+        self.base_scale = self.scale
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+        self.render()
+
+    def image_to_canvas(self, x, y):
+        return self.offset_x + x * self.scale, self.offset_y + y * self.scale
+
+    def canvas_to_image(self, x, y):
+        return (x - self.offset_x) / self.scale, (y - self.offset_y) / self.scale
+
+    def contains(self, x, y):
+        if not self.pyramid:
+            return False
+        img_width, img_height = self.pyramid.size
+        return 0 <= x <= img_width and 0 <= y <= img_height
+
+    def zoom_at(self, canvas_x, canvas_y, factor):
+        if not self.pyramid:
+            return
+        new_scale = max(self.min_scale, min(self.max_scale, self.scale * factor))
+        if new_scale == self.scale:
+            return
+        # Mantém fixo o ponto da imagem que está sob o cursor
+        img_x, img_y = self.canvas_to_image(canvas_x, canvas_y)
+        self.scale = new_scale
+        self.offset_x = canvas_x - img_x * new_scale
+        self.offset_y = canvas_y - img_y * new_scale
+        self.schedule_render()
+
+    def pan(self, dx, dy):
+        if not self.pyramid:
+            return
+        self.offset_x += dx
+        self.offset_y += dy
+        self.schedule_render()
+
+    def _on_mousewheel(self, event):
+        factor = 1.25 if event.delta > 0 else 0.8
+        self.zoom_at(event.x, event.y, factor)
+
+    def _on_pan_start(self, event):
+        self._pan_start = (event.x, event.y)
+        self.canvas.config(cursor='fleur')
+
+    def _on_pan_move(self, event):
+        if self._pan_start is None:
+            return
+        start_x, start_y = self._pan_start
+        self._pan_start = (event.x, event.y)
+        self.pan(event.x - start_x, event.y - start_y)
+
+    def _on_pan_end(self, event):
+        self._pan_start = None
+        self.canvas.config(cursor='')
+
+    def schedule_render(self):
+        # Agrupa vários eventos de zoom/arraste em um único redesenho
+        if self._render_pending:
+            return
+        self._render_pending = True
+        self.canvas.after_idle(self.render)
+
+    @metrics.timed('viewer.render')
+    def render(self):
+        self._render_pending = False
+        self.canvas.delete('tile')
+        if not self.pyramid:
+            return
+
+        view_width, view_height = self._viewport_size()
+        x0, y0 = self.canvas_to_image(0, 0)
+        x1, y1 = self.canvas_to_image(view_width, view_height)
+
+        level = self.pyramid.level_for_scale(self.scale)
+        photos = {}
+        for col, row in self.pyramid.visible_tiles(level, x0, y0, x1, y1):
+            key = (level, col, row, self.scale)
+            photo = self._photos.get(key)
+            if photo is None:
+                photo = ImageTk.PhotoImage(self.pyramid.render_tile(level, col, row, self.scale))
+            photos[key] = photo
+
+            # Arredonda origem e borda separadamente para não abrir frestas entre tiles
+            left, top, _, _ = self.pyramid.tile_bounds(level, col, row)
+            canvas_x = round(self.offset_x) + round(left * self.scale)
+            canvas_y = round(self.offset_y) + round(top * self.scale)
+            self.canvas.create_image(canvas_x, canvas_y, anchor='nw',
+                                     image=photo, tags=('tile',))
+
+        # Só os PhotoImage visíveis ficam em memória
+        self._photos = photos
+        self.canvas.tag_lower('tile')
+
+        if self.on_view_changed:
+            self.on_view_changed()
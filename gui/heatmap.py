@@ -3,20 +3,84 @@ from tkinter import ttk, messagebox, filedialog
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.colors as mcolors
+from matplotlib.artist import Artist
+from matplotlib.text import Annotation
 import numpy as np
 
+from core.grid_cache import grid_cache, grid_key
+from core.labels import place_labels
+from core.interpolation import (INTERPOLATION_WORKERS, SNAP_DISTANCE, WEIGHT_OFFSET, idw_grid, idw_grid_multi,
+                                rank_surfaces)
+from core.coverage import CHANGE_THRESHOLD_DB, DEAD_ZONE_DBM, compare_grids, coverage_by_threshold, dead_zones
+from core.exporter import ExportJob, save_figure, snapshot_figure, write_csv_stream, write_json_stream
+from core.metrics import metrics
+from core.pathloss import fit_path_loss
+from core.raster import render_raster, save_raster, write_grid_tiff
+from core.report import ReportPage
+from core.palette import get_palette
+from core.session import AP_FLOOR_DBM, ap_frequencies, ap_matrix, ssid_measurements
+from core.utils import CCI_THRESHOLD_DBM, CHANNEL_WIDTH_MHZ, DBM_COLOR_STOPS, NOISE_FLOOR_DBM
+
+# Maior lado da planta de fundo nas páginas do relatório PDF
+REPORT_BACKGROUND_PIXELS = 800
+
+LABEL_FONT_SIZE = 9
+# Deslocamento do rótulo em relação ao ponto, em pontos tipográficos
+LABEL_OFFSET = 8
+
+
+class LabelLayer(Artist):
+    # Rótulos com nível de detalhe: a cada desenho (inclusive zoom e pan da barra de ferramentas)
+    # escolhe até max_labels rótulos visíveis que não se sobrepõem e desenha só esses
+    def __init__(self, x_coords, y_coords, texts, priority, max_labels):
+        super().__init__()
+        self.points = np.column_stack([np.asarray(x_coords, dtype=np.float64),
+                                       np.asarray(y_coords, dtype=np.float64)])
+        self.texts = texts
+        self.priority = np.asarray(priority, dtype=np.float64)
+        self.max_labels = max_labels
+        lines = [text.split('\n') for text in texts]
+        # Caixa estimada em pontos (texto em negrito + pad 0.4 + folga entre rótulos): medir cada
+        # texto no renderer custaria mais que o próprio desenho
+        self._size = np.array([(max(len(line) for line in parts) * 0.7 + 1.2, len(parts) * 1.2 + 1.2)
+                               for parts in lines]) * LABEL_FONT_SIZE
+        self._origin = (LABEL_OFFSET - 0.4 * LABEL_FONT_SIZE, LABEL_OFFSET - 0.75 * LABEL_FONT_SIZE)
+        self.drawn = 0
+        self.set_zorder(12)
+
+    def draw(self, renderer):
+        if not self.get_visible() or not len(self.texts):
+            return
+        ax = self.axes
+        with metrics.timer('heatmap.labels'):
+            display = ax.transData.transform(self.points)
+            bbox = ax.bbox
+            visible = np.flatnonzero((display[:, 0] >= bbox.x0) & (display[:, 0] <= bbox.x1) &
+                                     (display[:, 1] >= bbox.y0) & (display[:, 1] <= bbox.y1))
+            scale = renderer.points_to_pixels(1.0)
+            x0 = display[visible, 0] + self._origin[0] * scale
+            y0 = display[visible, 1] + self._origin[1] * scale
+            sizes = self._size[visible] * scale
+            boxes = list(zip(x0.tolist(), y0.tolist(), (x0 + sizes[:, 0]).tolist(), (y0 + sizes[:, 1]).tolist()))
+            chosen = place_labels(boxes, self.priority[visible].tolist(), self.max_labels)
+
+            for i in visible[chosen]:
+                annotation = Annotation(self.texts[i], tuple(self.points[i]), xytext=(LABEL_OFFSET, LABEL_OFFSET),
+                                        textcoords='offset points', fontsize=LABEL_FONT_SIZE, fontweight='bold',
+                                        ha='left', bbox=dict(boxstyle='round,pad=0.4', facecolor='white',
+                                                             alpha=0.9, edgecolor='black'))
+                annotation.axes = ax
+                annotation.set_figure(self.figure)
+                annotation.draw(renderer)
+        self.drawn = len(chosen)
+        self.stale = False
+
+
 class HeatmapGenerator:
     def __init__(self, parent_window):
         self.parent = parent_window
         
-        self.dbm_colors = [
-            (-80, '#FF0000'),
-            (-70, '#FF4500'),
-            (-60, '#FFA500'),
-            (-50, '#ADFF2F'),
-            (-40, '#90EE90'),
-            (-30, '#00FFFF')
-        ]
+        self.dbm_colors = list(DBM_COLOR_STOPS)
         
         self.custom_cmap = self._create_custom_colormap()
         
@@ -31,18 +95,36 @@ class HeatmapGenerator:
                 x_pos = (col - (grid_size-1)/2) * spacing
                 y_pos = ((grid_size-1)/2 - row) * spacing
                 self.point_positions[point_name] = (x_pos, y_pos)
+
+        # Modo grade: posição de cada local (centro da grade 4x4) em coordenadas do prédio
+        self.location_positions = {}
+        self.location_spacing = 5.0
+        self.location_columns = 4
+        self.location_resolution = 25
+        self._location_surfaces = {}
+
+        # Abaixo deste sinal uma região contínua do mapa é tratada como zona morta
+        self.dead_zone_dbm = DEAD_ZONE_DBM
+        # Máximo de rótulos desenhados de uma vez; o resto aparece ao aproximar o zoom
+        self.max_labels = 40
+        self._last_grid = None
+        # Interpolação que realmente gerou _last_grid (o pathloss cai para IDW com poucos pontos)
+        self._last_grid_mode = None
+
+        # 'idw' ou 'pathloss' (modelo log-distância ajustado às medições)
+        self.interpolation_mode = 'idw'
+        # Threads da interpolação IDW em grades grandes; 1 avalia tudo na thread que chamou
+        self.interpolation_workers = INTERPOLATION_WORKERS
+        self.min_path_loss_points = 4
+        self._path_loss_fit = None
+        self.path_loss_model = None
         
         self._current_fig = None
 
     def _create_custom_colormap(self):
-        dbm_values = [-80, -70, -60, -50, -40, -30]
-        colors = ['#FF0000', '#FF4500', '#FFA500', '#ADFF2F', '#90EE90', '#00FFFF']
-        extended_colors = []
-        extended_positions = []
-        for i, color in enumerate(colors):
-            extended_colors.append(color)
-            extended_positions.append(i / (len(colors) - 1))
-        cmap = mcolors.LinearSegmentedColormap.from_list("custom_dbm_gradient", extended_colors, N=256)
+        # Mesma paleta pré-calculada usada para colorir os pontos no canvas
+        self.palette = get_palette(self.dbm_colors)
+        cmap = self.palette.to_colormap()
         boundaries = [-85, -75, -65, -55, -45, -35, -25]
         norm = mcolors.BoundaryNorm(boundaries, cmap.N)
         self.dbm_norm = norm
@@ -63,19 +145,36 @@ class HeatmapGenerator:
         heatmap_window.title(f"Mapa de Calor Wi-Fi - {ssid}")
         heatmap_window.geometry("1000x800")
 
-        x_coords, y_coords, dbm_values, point_labels = self._process_image_data(measurements)
+        with metrics.timer('heatmap.process_data'):
+            x_coords, y_coords, dbm_values, point_labels = self._process_image_data(measurements)
 
         if len(x_coords) < 3:
             messagebox.showwarning("Aviso", "Dados insuficientes para gerar o mapa")
             return
 
-        fig, ax = self._create_plot_with_image(x_coords, y_coords, dbm_values, point_labels, ssid, image_path)
+        with metrics.timer('heatmap.create_plot'):
+            fig, ax = self._create_plot_with_image(x_coords, y_coords, dbm_values, point_labels, ssid, image_path)
         self._current_fig = fig
         
         canvas = FigureCanvasTkAgg(fig, heatmap_window)
         canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self._instrument_draws(canvas)
+
+        # Mesma inversão de _process_image_data: y da grade = max_y - y da planta
+        flip_y = max(m.get('coordinates', (0, 0))[1] for m in valid_measurements.values())
+        self._add_statistics_and_buttons(heatmap_window, dbm_values, ssid, len(valid_measurements), fig, load_example_callback,
+                                         measurements, image_path=image_path, grid=self._last_grid,
+                                         grid_mode=self._last_grid_mode, flip_y=flip_y)
+
+    def _instrument_draws(self, canvas):
+        # Mede cada redesenho completo da figura (contornos, rótulos e colorbar)
+        draw = canvas.draw
 
-        self._add_statistics_and_buttons(heatmap_window, dbm_values, ssid, len(valid_measurements), fig, load_example_callback, measurements)
+        def timed_draw(*args, **kwargs):
+            with metrics.timer('heatmap.figure_draw'):
+                return draw(*args, **kwargs)
+
+        canvas.draw = timed_draw
 
     def _process_data(self, measurements, complete_locations):
         x_coords = []
@@ -136,64 +235,661 @@ class HeatmapGenerator:
             except Exception as e:
                 print(f"Aviso: Não foi possível carregar imagem de fundo: {e}")
 
-        x_min, x_max = min(x_coords) - 10, max(x_coords) + 10
-        y_min, y_max = min(y_coords) - 10, max(y_coords) + 10
-
-        xi = np.linspace(x_min, x_max, 100)
-        yi = np.linspace(y_min, y_max, 100)
+        xi, yi = self._grid_axes(x_coords, y_coords)
         Xi, Yi = np.meshgrid(xi, yi)
 
-        Zi = self._interpolate_data(xi, yi, Xi, Yi, x_coords, y_coords, dbm_values)
+        with metrics.timer('heatmap.interpolate'):
+            Zi, model = self._interpolate_data(xi, yi, Xi, Yi, x_coords, y_coords, dbm_values)
+        self._last_grid = (xi, yi, Zi)
+        self._last_grid_mode = 'idw' if model is None else 'pathloss'
+        self.path_loss_model = model
 
-        contour = ax.contourf(Xi, Yi, Zi, levels=50, cmap=self.custom_cmap, norm=self.dbm_norm, alpha=0.8)
+        with metrics.timer('heatmap.contourf'):
+            contour = ax.contourf(Xi, Yi, Zi, levels=50, cmap=self.custom_cmap, norm=self.dbm_norm, alpha=0.8)
 
         scatter = ax.scatter(x_coords, y_coords, c=dbm_values, cmap=self.custom_cmap, norm=self.dbm_norm,
                            s=120, edgecolors='white', linewidth=1, zorder=10)
 
         self._add_labels(ax, x_coords, y_coords, dbm_values, point_labels)
 
+        title = f'Mapa de Calor Wi-Fi - {ssid}'
+        if model is not None:
+            ax.scatter([model.ap_x], [model.ap_y], marker='x', s=200, c='black', linewidths=3, zorder=11)
+            ax.annotate('AP estimado', (model.ap_x, model.ap_y), xytext=(8, 8), textcoords='offset points',
+                        fontsize=10, fontweight='bold')
+            title += f'\nModelo de propagação: n = {model.exponent:.2f}, erro RMS = {model.rmse:.1f} dB'
+
         ax.set_xlabel('', fontsize=12)
         ax.set_ylabel('', fontsize=12)
-        ax.set_title(f'Mapa de Calor Wi-Fi - {ssid}', fontsize=14, fontweight='bold')
+        ax.set_title(title, fontsize=14, fontweight='bold')
         ax.grid(True, alpha=0.3)
         ax.set_aspect('equal')
         ax.set_xticks([])
         ax.set_yticks([])
 
+        self._add_colorbar(ax)
+
+        return fig, ax
+
+    def _add_colorbar(self, ax):
         import matplotlib as mpl
         sm = mpl.cm.ScalarMappable(cmap=self.custom_cmap, norm=self.dbm_norm)
         sm.set_array([])
-        cbar = plt.colorbar(sm, ax=ax, shrink=0.8, orientation='vertical')
+        cbar = ax.figure.colorbar(sm, ax=ax, shrink=0.8, orientation='vertical')
         cbar.set_label('RSSI (dBm)', fontsize=12)
         all_dbm_values = [-30, -40, -50, -60, -70, -80]
         cbar.set_ticks(all_dbm_values)
         cbar.set_ticklabels([f'{val}' for val in all_dbm_values])
         cbar.mappable.set_clim(-85, -25)
+        return cbar
 
-        return fig, ax
+    def _grid_axes(self, x_coords, y_coords, resolution=100):
+        # Grade do mapa de calor: 10 unidades de margem em volta dos pontos
+        return (np.linspace(min(x_coords) - 10, max(x_coords) + 10, resolution),
+                np.linspace(min(y_coords) - 10, max(y_coords) + 10, resolution))
 
     def _interpolate_data(self, xi, yi, Xi, Yi, x_coords, y_coords, dbm_values):
-        Zi = np.zeros_like(Xi)
-        for i in range(len(xi)):
-            for j in range(len(yi)):
-                distances = np.sqrt((np.array(x_coords) - xi[i])**2 + (np.array(y_coords) - yi[j])**2)
-                if np.min(distances) < 0.1:
-                    closest_idx = np.argmin(distances)
-                    Zi[j, i] = dbm_values[closest_idx]
-                else:
-                    weights = 1 / (distances + 0.1)
-                    Zi[j, i] = np.sum(weights * np.array(dbm_values)) / np.sum(weights)
+        # Devolve (grade, modelo ajustado ou None) sem gravar nada no gerador: as páginas do
+        # relatório chamam isto em paralelo
+        if self.interpolation_mode == 'pathloss' and len(dbm_values) >= self.min_path_loss_points:
+            model = self._fit_path_loss(x_coords, y_coords, dbm_values)
+            key = grid_key(x_coords, y_coords, dbm_values, xi, yi, ('pathloss', model.to_dict()))
+            return grid_cache.get_or_compute(key, lambda: model.grid(xi, yi)), model
+
+        key = grid_key(x_coords, y_coords, dbm_values, xi, yi, ('idw', SNAP_DISTANCE, WEIGHT_OFFSET))
+        return grid_cache.get_or_compute(key, lambda: idw_grid(x_coords, y_coords, dbm_values, xi, yi,
+                                                                         self.interpolation_workers)), None
+
+    def _fit_path_loss(self, x_coords, y_coords, dbm_values):
+        # O ajuste só depende dos pontos; a grade sai do modelo em qualquer resolução
+        key = grid_key(x_coords, y_coords, dbm_values, (), (), ('pathloss_fit',))
+        # Lê e troca a entrada inteira de uma vez; o modelo devolvido é sempre o desta chamada,
+        # mesmo que outra thread substitua a entrada no meio
+        cached = self._path_loss_fit
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with metrics.timer('heatmap.pathloss_fit'):
+            model = fit_path_loss(x_coords, y_coords, dbm_values)
+        self._path_loss_fit = (key, model)
+        return model
+
+    def _process_ap_data(self, measurements, ssid=None):
+        # Mesma transformação de coordenadas de _process_image_data, só para pontos com leituras por AP
+        points = [(name, m) for name, m in measurements.items() if m.get('aps') and 'coordinates' in m]
+        if not points:
+            return [], [], [], [], [], np.empty(0), np.empty((0, 0))
+
+        max_y = max(m['coordinates'][1] for _, m in points)
+        x_coords = [m['coordinates'][0] for _, m in points]
+        y_coords = [max_y - m['coordinates'][1] for _, m in points]
+        labels = [name for name, _ in points]
+        readings = [m['aps'] for _, m in points]
+        bssids, ssids, values = ap_matrix(readings, ssid=ssid)
+        return x_coords, y_coords, labels, bssids, ssids, ap_frequencies(readings, bssids), values
+
+    def compute_ap_surfaces(self, x_coords, y_coords, values, resolution=100):
+        xi = np.linspace(min(x_coords) - 10, max(x_coords) + 10, resolution)
+        yi = np.linspace(min(y_coords) - 10, max(y_coords) + 10, resolution)
+        # Uma única passada de pesos IDW para todos os APs
+        key = grid_key(x_coords, y_coords, values, xi, yi, ('idw_multi', SNAP_DISTANCE, WEIGHT_OFFSET))
+        with metrics.timer('heatmap.ap_interpolate'):
+            stack = grid_cache.get_or_compute(key, lambda: idw_grid_multi(x_coords, y_coords, values, xi, yi,
+                                                                          self.interpolation_workers))
+        return xi, yi, stack
+
+    def best_server_maps(self, stack):
+        indices, values = rank_surfaces(stack, 2)
+        best_dbm = values[0]
+        if len(values) > 1:
+            second_index, second_dbm = indices[1], values[1]
+        else:
+            second_index = np.full(best_dbm.shape, -1)
+            second_dbm = np.full(best_dbm.shape, np.nan)
+        return {
+            'best_index': indices[0],
+            'best_dbm': best_dbm,
+            'second_index': second_index,
+            'second_dbm': second_dbm,
+            'margin': best_dbm - second_dbm,
+        }
+
+    def generate_best_server_map(self, measurements, ssid=None, image_path=None):
+        with metrics.timer('heatmap.ap_process_data'):
+            x_coords, y_coords, labels, bssids, ssids, _, values = self._process_ap_data(measurements, ssid)
+
+        if len(x_coords) < 3 or not bssids:
+            messagebox.showwarning("Aviso", "É necessário pelo menos 3 pontos com leituras por AP para gerar o mapa")
+            return
+
+        xi, yi, stack = self.compute_ap_surfaces(x_coords, y_coords, values)
+        maps = self.best_server_maps(stack)
+
+        window = tk.Toplevel(self.parent)
+        window.title(f"Mapa por AP - {ssid or 'todas as redes'}")
+        window.geometry("1200x700")
+
+        fig, (ax_best, ax_margin) = plt.subplots(1, 2, figsize=(16, 8))
+        extent = (xi[0], xi[-1], yi[0], yi[-1])
+        self._draw_background((ax_best, ax_margin), image_path, extent)
+
+        # Melhor servidor: uma cor por BSSID; células onde nenhum AP foi ouvido ficam transparentes.
+        # Acima das 20 cores do tab20 a paleta é reamostrada de um mapa contínuo, para o mapa e a
+        # legenda usarem a mesma cor k para o BSSID k
+        if len(bssids) <= 20:
+            ap_colors = plt.get_cmap('tab20').colors[:max(1, len(bssids))]
+        else:
+            ap_colors = plt.get_cmap('turbo')(np.linspace(0, 1, len(bssids)))
+        ap_cmap = mcolors.ListedColormap(ap_colors)
+        best = np.ma.masked_where(maps['best_dbm'] <= AP_FLOOR_DBM, maps['best_index'])
+        ax_best.imshow(best, extent=extent, origin='lower', cmap=ap_cmap, vmin=-0.5,
+                       vmax=ap_cmap.N - 0.5, alpha=0.6, interpolation='nearest', aspect='auto')
+        serving = values.argmax(axis=1)
+        ax_best.scatter(x_coords, y_coords, c=serving, cmap=ap_cmap, vmin=-0.5, vmax=ap_cmap.N - 0.5,
+                        s=120, edgecolors='black', linewidth=1, zorder=10)
+        from matplotlib.patches import Patch
+        ax_best.legend(handles=[Patch(color=ap_cmap(k), label=f"{bssid} ({name})")
+                                for k, (bssid, name) in enumerate(zip(bssids, ssids))],
+                       loc='upper right', fontsize=8, framealpha=0.9)
+        ax_best.set_title('Melhor servidor (BSSID)', fontsize=13, fontweight='bold')
+
+        # Margem entre o melhor e o segundo melhor AP: valores baixos indicam fronteiras de roaming
+        if len(bssids) > 1:
+            margin = ax_margin.imshow(maps['margin'], extent=extent, origin='lower', cmap='viridis',
+                                      vmin=0, vmax=20, alpha=0.8, aspect='auto')
+            ax_margin.contour(xi, yi, maps['margin'], levels=[5], colors='red', linewidths=1.5)
+            fig.colorbar(margin, ax=ax_margin, shrink=0.8).set_label('Melhor - segundo (dB)', fontsize=11)
+            ax_margin.set_title('Margem para o segundo melhor AP', fontsize=13, fontweight='bold')
+        else:
+            ax_margin.text(0.5, 0.5, "Apenas um AP detectado", ha='center', va='center',
+                           transform=ax_margin.transAxes, fontsize=12)
+        ax_margin.scatter(x_coords, y_coords, c='white', s=60, edgecolors='black', linewidth=1, zorder=10)
+
+        self._show_analysis_figure(window, fig, (ax_best, ax_margin),
+                                   f"Pontos: {len(x_coords)} | APs: {len(bssids)}")
+
+    def _draw_background(self, axes, image_path, extent, image=None):
+        if image is None and not image_path:
+            return
+        try:
+            if image is None:
+                from PIL import Image
+                image = Image.open(image_path)
+            for ax in axes:
+                # cmap só vale para a cópia em tons de cinza do relatório
+                ax.imshow(image, extent=extent, aspect='auto', alpha=0.3, origin='upper', cmap='gray')
+        except Exception as e:
+            print(f"Aviso: Não foi possível carregar imagem de fundo: {e}")
+
+    def _show_analysis_figure(self, window, fig, axes, summary):
+        for ax in axes:
+            ax.set_aspect('equal')
+            ax.set_xticks([])
+            ax.set_yticks([])
+        fig.tight_layout()
+
+        canvas = FigureCanvasTkAgg(fig, window)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self._instrument_draws(canvas)
+
+        ttk.Label(window, text=summary, font=('Arial', 10)).pack(pady=5)
+
+    def co_channel_analysis(self, stack, freqs, serving=None, threshold=CCI_THRESHOLD_DBM,
+                            noise_floor=NOISE_FLOOR_DBM):
+        # stack: (APs, linhas, colunas) em dBm; freqs: MHz por AP (NaN = desconhecida, sem sobreposição)
+        freqs = np.asarray(freqs, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            overlap = np.abs(freqs[:, None] - freqs[None, :]) < CHANNEL_WIDTH_MHZ
+        np.fill_diagonal(overlap, False)
+
+        # Servidor de cada célula: o AP mais forte entre os candidatos (ex.: da rede selecionada)
+        candidates = stack if serving is None else np.where(np.asarray(serving)[:, None, None], stack, -np.inf)
+        serving_index = candidates.argmax(axis=0)
+        serving_dbm = np.take_along_axis(stack, serving_index[None], axis=0)[0]
+
+        # Para cada célula, quais APs compartilham o canal do servidor
+        interferers = np.moveaxis(overlap[serving_index], -1, 0)
+        count = (interferers & (stack >= threshold)).sum(axis=0)
+
+        interference_mw = (np.power(10.0, stack / 10.0) * interferers).sum(axis=0)
+        margin = serving_dbm - 10.0 * np.log10(interference_mw + 10.0 ** (noise_floor / 10.0))
+        return {
+            'serving_index': serving_index,
+            'serving_dbm': serving_dbm,
+            'count': count,
+            'margin': margin,
+        }
+
+    def generate_interference_map(self, measurements, ssid=None, image_path=None):
+        with metrics.timer('heatmap.ap_process_data'):
+            x_coords, y_coords, labels, bssids, ssids, freqs, values = self._process_ap_data(measurements)
+
+        if len(x_coords) < 3 or not bssids:
+            messagebox.showwarning("Aviso", "É necessário pelo menos 3 pontos com leituras por AP para gerar o mapa")
+            return
+        if np.isnan(freqs).all():
+            messagebox.showwarning("Aviso", "As leituras não informam a frequência dos APs")
+            return
+
+        # Interferência considera todas as redes; o servidor é da rede selecionada quando ela foi vista
+        serving = np.array([name == ssid for name in ssids])
+        xi, yi, stack = self.compute_ap_surfaces(x_coords, y_coords, values)
+        with metrics.timer('heatmap.co_channel'):
+            analysis = self.co_channel_analysis(stack, freqs, serving if serving.any() else None)
+
+        window = tk.Toplevel(self.parent)
+        window.title(f"Interferência Co-canal - {ssid or 'todas as redes'}")
+        window.geometry("1200x700")
+
+        fig, (ax_count, ax_margin) = plt.subplots(1, 2, figsize=(16, 8))
+        extent = (xi[0], xi[-1], yi[0], yi[-1])
+        self._draw_background((ax_count, ax_margin), image_path, extent)
+
+        max_count = max(1, int(analysis['count'].max()))
+        count_cmap = plt.get_cmap('YlOrRd', max_count + 1)
+        count_image = ax_count.imshow(analysis['count'], extent=extent, origin='lower', cmap=count_cmap,
+                                      vmin=-0.5, vmax=max_count + 0.5, alpha=0.7, interpolation='nearest',
+                                      aspect='auto')
+        cbar = fig.colorbar(count_image, ax=ax_count, shrink=0.8, ticks=range(max_count + 1))
+        cbar.set_label(f'APs co-canal ≥ {CCI_THRESHOLD_DBM} dBm', fontsize=11)
+        ax_count.set_title('APs no mesmo canal audíveis', fontsize=13, fontweight='bold')
+
+        margin_image = ax_margin.imshow(analysis['margin'], extent=extent, origin='lower', cmap='RdYlGn',
+                                        vmin=-5, vmax=35, alpha=0.8, aspect='auto')
+        fig.colorbar(margin_image, ax=ax_margin, shrink=0.8).set_label('Sinal / (interferência + ruído) (dB)',
+                                                                       fontsize=11)
+        ax_margin.set_title('Margem sinal-interferência', fontsize=13, fontweight='bold')
+
+        for ax in (ax_count, ax_margin):
+            ax.scatter(x_coords, y_coords, c='white', s=60, edgecolors='black', linewidth=1, zorder=10)
+
+        channels = sorted({int(f) for f in freqs[~np.isnan(freqs)]})
+        self._show_analysis_figure(window, fig, (ax_count, ax_margin),
+                                   f"Pontos: {len(x_coords)} | APs: {len(bssids)} | "
+                                   f"Frequências (MHz): {', '.join(str(f) for f in channels)}")
+
+    def _survey_points(self, measurements, max_y):
+        points = [m for m in measurements.values() if m.get('dbm', 'N/A') != 'N/A' and 'coordinates' in m]
+        return ([m['coordinates'][0] for m in points], [max_y - m['coordinates'][1] for m in points],
+                [float(m['dbm']) for m in points])
+
+    def compare_surveys(self, before, after, resolution=100):
+        # As duas medições vão para uma grade comum, com uma só inversão do eixo y da planta.
+        # A grade e a inversão vêm da medição cuja extensão contém a da outra, quando existe:
+        # é exatamente a grade que generate_heatmap usa para ela, e essa grade sai do cache.
+        # Com extensões só sobrepostas a grade cobre as duas e é calculada do zero
+        coords = [[m['coordinates'] for m in survey.values() if m.get('dbm', 'N/A') != 'N/A' and 'coordinates' in m]
+                  for survey in (before, after)]
+        bounds = [(min(c[0] for c in points), min(c[1] for c in points),
+                   max(c[0] for c in points), max(c[1] for c in points)) for points in coords]
+        outer = next((i for i in (0, 1) if bounds[i][0] <= bounds[1 - i][0] and bounds[i][1] <= bounds[1 - i][1]
+                      and bounds[i][2] >= bounds[1 - i][2] and bounds[i][3] >= bounds[1 - i][3]), None)
+        max_y = max(b[3] for b in bounds)
+        before_points = self._survey_points(before, max_y)
+        after_points = self._survey_points(after, max_y)
+
+        if outer is None:
+            xi, yi = self._grid_axes(before_points[0] + after_points[0], before_points[1] + after_points[1],
+                                     resolution)
+        else:
+            xi, yi = self._grid_axes(*(before_points, after_points)[outer][:2], resolution)
+        Xi, Yi = np.meshgrid(xi, yi)
+        with metrics.timer('heatmap.compare_interpolate'):
+            grids = [self._interpolate_data(xi, yi, Xi, Yi, *points)[0] for points in (before_points, after_points)]
+        diff, summary = compare_grids(*grids, dead_zone=self.dead_zone_dbm)
+        return {
+            'xi': xi,
+            'yi': yi,
+            'before': grids[0],
+            'after': grids[1],
+            'diff': diff,
+            'summary': summary,
+            'before_points': before_points,
+            'after_points': after_points,
+        }
+
+    def generate_comparison_map(self, before, after, before_label, after_label, image_path=None):
+        valid = [sum(1 for m in survey.values() if m.get('dbm', 'N/A') != 'N/A' and 'coordinates' in m)
+                 for survey in (before, after)]
+        if min(valid) < 3:
+            messagebox.showwarning("Aviso", "Cada medição precisa de pelo menos 3 pontos para a comparação")
+            return
+
+        result = self.compare_surveys(before, after)
+        summary = result['summary']
+
+        window = tk.Toplevel(self.parent)
+        window.title(f"Comparação - {before_label} x {after_label}")
+        window.geometry("1500x650")
+
+        fig, axes = plt.subplots(1, 3, figsize=(21, 7))
+        self._draw_comparison(fig, axes, result, before_label, after_label, image_path)
+
+        self._show_analysis_figure(
+            window, fig, axes,
+            f"Melhorou (≥ {CHANGE_THRESHOLD_DB:g} dB): {summary['improved_percent']:.1f}% | "
+            f"Piorou: {summary['regressed_percent']:.1f}% | "
+            f"Sem mudança: {summary['unchanged_percent']:.1f}% | "
+            f"Variação média: {summary['mean_delta']:+.1f} dB\n"
+            f"Área ≥ {self.dead_zone_dbm} dBm: {summary['covered_before_percent']:.1f}% → "
+            f"{summary['covered_after_percent']:.1f}%")
+
+    def _draw_comparison(self, fig, axes, result, before_label, after_label, image_path=None, background=None):
+        xi, yi = result['xi'], result['yi']
+        extent = (xi[0], xi[-1], yi[0], yi[-1])
+        self._draw_background(axes, image_path, extent, background)
+
+        for ax, grid, points, label in ((axes[0], result['before'], result['before_points'], before_label),
+                                        (axes[1], result['after'], result['after_points'], after_label)):
+            ax.imshow(grid, extent=extent, origin='lower', cmap=self.custom_cmap, norm=self.dbm_norm,
+                      alpha=0.8, aspect='auto')
+            ax.scatter(points[0], points[1], c=points[2], cmap=self.custom_cmap, norm=self.dbm_norm,
+                       s=60, edgecolors='white', linewidth=1, zorder=10)
+            ax.set_title(label, fontsize=13, fontweight='bold')
+            self._add_colorbar(ax)
+
+        # Escala simétrica: azul = melhorou, vermelho = piorou
+        limit = max(CHANGE_THRESHOLD_DB, float(np.nanmax(np.abs(result['diff']))))
+        diff_image = axes[2].imshow(result['diff'], extent=extent, origin='lower', cmap='RdBu',
+                                    vmin=-limit, vmax=limit, alpha=0.8, aspect='auto')
+        axes[2].contour(xi, yi, result['diff'], levels=[-CHANGE_THRESHOLD_DB, CHANGE_THRESHOLD_DB],
+                        colors=['darkred', 'darkblue'], linewidths=1)
+        fig.colorbar(diff_image, ax=axes[2], shrink=0.8).set_label('Depois - antes (dB)', fontsize=11)
+        axes[2].set_title('Diferença', fontsize=13, fontweight='bold')
+
+    def report_pages(self, measurements, ssid, image_path=None, comparison=None, floorplan=False):
+        # Páginas do relatório PDF; só a descrição de cada página fica em memória até ela ser gerada.
+        # A planta ao fundo é opcional: o PdfPages retém toda imagem raster até o arquivo ser fechado.
+        # Sem ela a memória para de crescer depois das primeiras páginas; com ela cresce ~1,5 MB por página
+        pages = []
+        background = self._report_background(image_path) if floorplan else None
+        locations = {local: points for local, points in measurements.items() if 'dbm' not in points}
+        if locations and len(locations) == len(measurements):
+            valid = [local for local, points in locations.items()
+                     if any(m.get('dbm', 'N/A') != 'N/A' for m in points.values())]
+            if valid:
+                pages.append(ReportPage(f"{ssid} - prédio",
+                                        lambda: self._building_page_data(locations, valid, ssid),
+                                        self._render_grid_page))
+            for local in valid:
+                pages.append(ReportPage(f"{ssid} - {local}",
+                                        lambda local=local: self._location_page_data(local, locations[local], ssid),
+                                        self._render_grid_page))
+            return pages
+
+        surveys = [(ssid, measurements)]
+        heard = sorted({reading.get('ssid') for m in measurements.values()
+                        for reading in (m.get('aps') or {}).values() if reading.get('ssid')} - {ssid, None})
+        surveys += [(name, ssid_measurements(measurements, name)) for name in heard]
+        for name, survey in surveys:
+            valid = sum(1 for m in survey.values() if m.get('dbm', 'N/A') != 'N/A' and 'coordinates' in m)
+            if valid >= 3:
+                pages.append(ReportPage(name, lambda name=name, survey=survey: self._survey_page_data(
+                    survey, name, background), self._render_grid_page))
+
+        if comparison is not None:
+            before, before_label = comparison
+            pages.append(ReportPage(f"Comparação {before_label} x {ssid}",
+                                    lambda: dict(self.compare_surveys(before, measurements), background=background,
+                                                 labels=(before_label, ssid)),
+                                    self._render_comparison_page))
+        return pages
+
+    def _report_background(self, image_path, max_size=REPORT_BACKGROUND_PIXELS):
+        # Uma cópia reduzida e em tons de cinza da planta, compartilhada pelas páginas
+        if not image_path:
+            return None
+        try:
+            from PIL import Image
+            with Image.open(image_path) as img:
+                background = img.convert('L')
+            background.thumbnail((max_size, max_size))
+            return background
+        except Exception as e:
+            print(f"Aviso: Não foi possível carregar imagem de fundo: {e}")
+            return None
+
+    def _report_rows(self, dbm_values, grid):
+        coverage, zones = self.coverage_summary(grid)
+        rows = [
+            ("Pontos", f"{len(dbm_values)}"),
+            ("Mínimo", f"{min(dbm_values):.1f} dBm"),
+            ("Máximo", f"{max(dbm_values):.1f} dBm"),
+            ("Média", f"{sum(dbm_values) / len(dbm_values):.1f} dBm"),
+        ]
+        rows += [(f"Área ≥ {dbm} dBm", f"{percent:.0f}%") for dbm, percent in coverage]
+        rows.append((f"Zonas mortas (< {self.dead_zone_dbm} dBm)", f"{len(zones)}"))
+        if zones:
+            rows.append(("Maior zona morta", f"{zones[0]['area_percent']:.1f}% da área"))
+        return rows
+
+    def _survey_page_data(self, measurements, ssid, background):
+        x_coords, y_coords, dbm_values, labels = self._process_image_data(measurements)
+        xi, yi = self._grid_axes(x_coords, y_coords)
+        Xi, Yi = np.meshgrid(xi, yi)
+        Zi, _ = self._interpolate_data(xi, yi, Xi, Yi, x_coords, y_coords, dbm_values)
+        return {
+            'title': f'Mapa de Calor Wi-Fi - {ssid}',
+            'grid': (xi, yi, Zi),
+            'points': (x_coords, y_coords, dbm_values, labels),
+            'rows': self._report_rows(dbm_values, (xi, yi, Zi)),
+            'background': background,
+        }
+
+    def _building_page_data(self, measurements, locations, ssid):
+        x_coords, y_coords, dbm_values, labels = self._process_data(measurements, locations)
+        grid, extent = self.compose_building_grid(measurements, locations)
+        height, width = grid.shape
+        xi = np.linspace(extent[0], extent[1], width, endpoint=False) + (extent[1] - extent[0]) / width / 2
+        yi = np.linspace(extent[2], extent[3], height, endpoint=False) + (extent[3] - extent[2]) / height / 2
+        return {
+            'title': f'Mapa de Calor Wi-Fi - {ssid} ({len(locations)} locais)',
+            'grid': (xi, yi, grid),
+            'points': (x_coords, y_coords, dbm_values, labels),
+            'rows': self._report_rows(dbm_values, (xi, yi, grid)),
+            'background': None,
+        }
+
+    def _location_page_data(self, local, points, ssid):
+        Zi = self._location_surface(local, points)
+        half = self.location_spacing / 2
+        centers = -half + (np.arange(self.location_resolution) + 0.5) * (self.location_spacing / self.location_resolution)
+        measured = [(point, float(m['dbm'])) for point, m in points.items()
+                    if m.get('dbm', 'N/A') != 'N/A' and point in self.point_positions]
+        dbm_values = [dbm for _, dbm in measured]
+        return {
+            'title': f'{local} - {ssid}',
+            'grid': (centers, centers, Zi),
+            'points': ([self.point_positions[point][0] for point, _ in measured],
+                       [self.point_positions[point][1] for point, _ in measured],
+                       dbm_values, [point for point, _ in measured]),
+            'rows': self._report_rows(dbm_values, (centers, centers, Zi)),
+            'background': None,
+        }
+
+    def _render_report_table(self, ax, rows):
+        ax.axis('off')
+        table = ax.table(cellText=[list(row) for row in rows], cellLoc='left', loc='upper center')
+        table.auto_set_font_size(False)
+        table.set_fontsize(9)
+        table.auto_set_column_width([0, 1])
+        table.scale(1, 1.4)
+
+    def _render_grid_page(self, fig, data):
+        spec = fig.add_gridspec(1, 2, width_ratios=[5, 2])
+        ax = fig.add_subplot(spec[0])
+        xi, yi, Zi = data['grid']
+        self._draw_background((ax,), None, (xi[0], xi[-1], yi[0], yi[-1]), data['background'])
+
+        # Contornos vetoriais: imagens rasterizadas ficam retidas pelo PdfPages até o arquivo ser fechado
+        ax.contourf(xi, yi, Zi, levels=50, cmap=self.custom_cmap, norm=self.dbm_norm, alpha=0.8)
+        x_coords, y_coords, dbm_values, labels = data['points']
+        ax.scatter(x_coords, y_coords, c=dbm_values, cmap=self.custom_cmap, norm=self.dbm_norm,
+                   s=60, edgecolors='white', linewidth=1, zorder=10)
+        self._add_labels(ax, x_coords, y_coords, dbm_values, labels)
+        ax.set_title(data['title'], fontsize=13, fontweight='bold')
+        ax.set_aspect('equal')
+        ax.set_xticks([])
+        ax.set_yticks([])
+        self._add_colorbar(ax)
+
+        self._render_report_table(fig.add_subplot(spec[1]), data['rows'])
+
+    def _render_comparison_page(self, fig, data):
+        spec = fig.add_gridspec(2, 3, height_ratios=[3, 1])
+        axes = [fig.add_subplot(spec[0, column]) for column in range(3)]
+        before_label, after_label = data['labels']
+        self._draw_comparison(fig, axes, data, before_label, after_label, background=data['background'])
+        for ax in axes:
+            ax.set_aspect('equal')
+            ax.set_xticks([])
+            ax.set_yticks([])
+
+        summary = data['summary']
+        self._render_report_table(fig.add_subplot(spec[1, :]), [
+            (f"Melhorou (≥ {CHANGE_THRESHOLD_DB:g} dB)", f"{summary['improved_percent']:.1f}%"),
+            ("Piorou", f"{summary['regressed_percent']:.1f}%"),
+            ("Sem mudança", f"{summary['unchanged_percent']:.1f}%"),
+            ("Variação média", f"{summary['mean_delta']:+.1f} dB"),
+            (f"Área ≥ {self.dead_zone_dbm} dBm (antes → depois)",
+             f"{summary['covered_before_percent']:.1f}% → {summary['covered_after_percent']:.1f}%"),
+        ])
+
+    def set_location_layout(self, positions):
+        # As superfícies ficam em coordenadas locais; mover um local não exige reinterpolar
+        self.location_positions = dict(positions)
+
+    def _ensure_location_positions(self, locations):
+        for local in locations:
+            if local not in self.location_positions:
+                row, col = divmod(len(self.location_positions), self.location_columns)
+                self.location_positions[local] = (col * self.location_spacing, -row * self.location_spacing)
+
+    def _location_surface(self, local, points):
+        samples = tuple(sorted(
+            (point, float(measurement['dbm']))
+            for point, measurement in points.items()
+            if measurement.get('dbm', 'N/A') != 'N/A' and point in self.point_positions
+        ))
+        key = (samples, self.location_spacing, self.location_resolution)
+
+        cached = self._location_surfaces.get(local)
+        if cached is not None and cached[0] == key:
+            metrics.count('heatmap.location_cache_hits')
+            return cached[1]
+        if not samples:
+            return None
+
+        half = self.location_spacing / 2
+        centers = -half + (np.arange(self.location_resolution) + 0.5) * (self.location_spacing / self.location_resolution)
+        xs = [self.point_positions[point][0] for point, _ in samples]
+        ys = [self.point_positions[point][1] for point, _ in samples]
+        with metrics.timer('heatmap.location_interpolate'):
+            Zi = idw_grid(xs, ys, [dbm for _, dbm in samples], centers, centers)
+
+        self._location_surfaces[local] = (key, Zi)
         return Zi
 
+    def compose_building_grid(self, measurements, locations):
+        self._ensure_location_positions(locations)
+
+        resolution = self.location_resolution
+        cell = self.location_spacing / resolution
+        half = self.location_spacing / 2
+        bases = [self.location_positions[local] for local in locations]
+        x0 = min(x for x, _ in bases) - half
+        y0 = min(y for _, y in bases) - half
+        width = int(round((max(x for x, _ in bases) - min(x for x, _ in bases)) / cell)) + resolution
+        height = int(round((max(y for _, y in bases) - min(y for _, y in bases)) / cell)) + resolution
+
+        grid = np.full((height, width), np.nan)
+        for local, (base_x, base_y) in zip(locations, bases):
+            surface = self._location_surface(local, measurements[local])
+            if surface is None:
+                continue
+            col = int(round((base_x - half - x0) / cell))
+            row = int(round((base_y - half - y0) / cell))
+            region = grid[row:row + resolution, col:col + resolution]
+            # Locais sobrepostos ficam com o sinal mais forte
+            np.fmax(region, surface, out=region)
+
+        extent = (x0, x0 + width * cell, y0, y0 + height * cell)
+        return grid, extent
+
+    def generate_building_heatmap(self, measurements, ssid, load_example_callback=None):
+        if not ssid:
+            messagebox.showerror("Erro", "Selecione uma rede Wi-Fi")
+            return
+
+        locations = [
+            local for local, points in measurements.items()
+            if any(m.get('dbm', 'N/A') != 'N/A' for m in points.values())
+        ]
+        x_coords, y_coords, dbm_values, labels = self._process_data(measurements, locations)
+        if len(dbm_values) < 3:
+            messagebox.showwarning("Aviso", "É necessário pelo menos 3 pontos medidos para gerar o mapa")
+            return
+
+        with metrics.timer('heatmap.building_compose'):
+            grid, extent = self.compose_building_grid(measurements, locations)
+
+        window = tk.Toplevel(self.parent)
+        window.title(f"Mapa de Calor do Prédio - {ssid}")
+        window.geometry("1000x800")
+
+        fig, ax = plt.subplots(figsize=(14, 10))
+        ax.imshow(np.ma.masked_invalid(grid), extent=extent, origin='lower', cmap=self.custom_cmap,
+                  norm=self.dbm_norm, alpha=0.8, interpolation='bilinear')
+        ax.scatter(x_coords, y_coords, c=dbm_values, cmap=self.custom_cmap, norm=self.dbm_norm,
+                   s=120, edgecolors='white', linewidth=1, zorder=10)
+        self._add_labels(ax, x_coords, y_coords, dbm_values, labels)
+
+        for local in locations:
+            base_x, base_y = self.location_positions[local]
+            ax.text(base_x, base_y + self.location_spacing / 2, local, ha='center', va='top',
+                    fontsize=11, fontweight='bold', zorder=11)
+
+        ax.set_title(f'Mapa de Calor Wi-Fi - {ssid} ({len(locations)} locais)', fontsize=14, fontweight='bold')
+        ax.set_aspect('equal')
+        ax.set_xticks([])
+        ax.set_yticks([])
+        self._add_colorbar(ax)
+        self._current_fig = fig
+
+        canvas = FigureCanvasTkAgg(fig, window)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self._instrument_draws(canvas)
+
+        flat_measurements = {}
+        for local in locations:
+            base_x, base_y = self.location_positions[local]
+            for point, measurement in measurements[local].items():
+                if point in self.point_positions:
+                    point_x, point_y = self.point_positions[point]
+                    flat_measurements[f"{local} - {point}"] = dict(measurement, coordinates=(base_x + point_x,
+                                                                                             base_y + point_y))
+
+        height, width = grid.shape
+        xi = np.linspace(extent[0], extent[1], width, endpoint=False) + (extent[1] - extent[0]) / width / 2
+        yi = np.linspace(extent[2], extent[3], height, endpoint=False) + (extent[3] - extent[2]) / height / 2
+        self._last_grid = (xi, yi, grid)
+        # As superfícies por local são sempre IDW
+        self._last_grid_mode = 'idw'
+
+        self._add_statistics_and_buttons(window, dbm_values, ssid, len(dbm_values), fig,
+                                         load_example_callback, flat_measurements, grid=self._last_grid,
+                                         grid_mode=self._last_grid_mode)
+
     def _add_labels(self, ax, x_coords, y_coords, dbm_values, location_labels):
-        for x, y, dbm, label in zip(x_coords, y_coords, dbm_values, location_labels):
+        texts = []
+        for dbm, label in zip(dbm_values, location_labels):
             parts = label.split('\n')
             local_name = parts[0]
             point_name = parts[1] if len(parts) > 1 else ""
-            clean_label = f"{local_name}\n{point_name}\n{dbm:.0f} dBm"
-            ax.annotate(clean_label, (x, y), xytext=(8, 8), textcoords='offset points',
-                       bbox=dict(boxstyle='round,pad=0.4', facecolor='white', alpha=0.9, edgecolor='black'),
-                       fontsize=9, fontweight='bold', ha='left')
+            texts.append(f"{local_name}\n{point_name}\n{dbm:.0f} dBm")
+        # Com pouco espaço ficam os pontos mais distantes da média (os mais fortes e os mais fracos)
+        values = np.asarray(dbm_values, dtype=np.float64)
+        priority = np.abs(values - values.mean()) if len(values) else values
+        return ax.add_artist(LabelLayer(x_coords, y_coords, texts, priority, self.max_labels))
 
     def _configure_plot(self, ax, ssid):
         ax.set_xlabel('Posição X (metros)', fontsize=12)
@@ -204,7 +900,15 @@ class HeatmapGenerator:
         ax.grid(True, alpha=0.3)
         ax.set_aspect('equal')
 
-    def _add_statistics_and_buttons(self, window, dbm_values, ssid, total_points, fig, load_example_callback, measurements=None):
+    def coverage_summary(self, grid):
+        xi, yi, Zi = grid
+        with metrics.timer('heatmap.coverage'):
+            coverage = coverage_by_threshold(Zi)
+            _, zones = dead_zones(Zi, xi, yi, self.dead_zone_dbm)
+        return coverage, zones
+
+    def _add_statistics_and_buttons(self, window, dbm_values, ssid, total_points, fig, load_example_callback, measurements=None,
+                                    image_path=None, grid=None, grid_mode=None, flip_y=None):
         stats_frame = ttk.Frame(window, style='TFrame')
         stats_frame.pack(fill='x', padx=10, pady=5)
 
@@ -215,9 +919,50 @@ class HeatmapGenerator:
         stats_text = f"Rede: {ssid} | Mín: {min_dbm:.1f} dBm | Máx: {max_dbm:.1f} dBm | Média: {avg_dbm:.1f} dBm | Pontos: {len(dbm_values)} | Total: {total_points}"
         ttk.Label(stats_frame, text=stats_text, font=('Arial', 10)).pack()
 
+        if grid is not None:
+            coverage, zones = self.coverage_summary(grid)
+            coverage_text = "Área ≥ " + " | ".join(f"{dbm} dBm: {percent:.0f}%" for dbm, percent in coverage)
+            if zones:
+                coverage_text += (f"\nZonas mortas (< {self.dead_zone_dbm} dBm): {len(zones)} | "
+                                  f"Maior: {zones[0]['area_percent']:.1f}% da área, mín. {zones[0]['min_dbm']:.0f} dBm")
+            else:
+                coverage_text += f"\nSem zonas mortas abaixo de {self.dead_zone_dbm} dBm"
+            ttk.Label(stats_frame, text=coverage_text, font=('Arial', 10), justify='center').pack()
+
         button_frame = ttk.Frame(stats_frame, style='TFrame')
         button_frame.pack(pady=5)
 
+        progress_frame = ttk.Frame(stats_frame, style='TFrame')
+        progress_frame.pack(pady=(0, 5))
+        progress_var = tk.DoubleVar(value=0)
+        ttk.Progressbar(progress_frame, variable=progress_var, maximum=100, length=300).pack(side='left', padx=5)
+        progress_label = ttk.Label(progress_frame, text="", font=('Arial', 9), width=30)
+        progress_label.pack(side='left', padx=5)
+        cancel_button = ttk.Button(progress_frame, text="Cancelar", state='disabled')
+        cancel_button.pack(side='left', padx=5)
+
+        def run_export(job, success_message):
+            cancel_button.config(state='normal', command=job.cancel)
+            job.start()
+
+            def poll():
+                if not window.winfo_exists():
+                    return
+                progress_var.set(job.progress * 100)
+                progress_label.config(text=job.message)
+                if not job.done:
+                    window.after(100, poll)
+                    return
+                cancel_button.config(state='disabled')
+                if job.error is not None:
+                    messagebox.showerror("Erro", f"Erro ao exportar: {str(job.error)}")
+                elif job.cancelled:
+                    progress_label.config(text="Exportação cancelada")
+                else:
+                    messagebox.showinfo("Sucesso", success_message)
+
+            poll()
+
         def save_heatmap():
             filename = filedialog.asksaveasfilename(
                 defaultextension=".png",
@@ -229,18 +974,40 @@ class HeatmapGenerator:
                 ]
             )
             if filename:
-                try:
-                    if filename.lower().endswith('.pdf'):
-                        fig.savefig(filename, format='pdf', dpi=300, bbox_inches='tight')
-                    elif filename.lower().endswith('.svg'):
-                        fig.savefig(filename, format='svg', bbox_inches='tight')
-                    elif filename.lower().endswith(('.jpg', '.jpeg')):
-                        fig.savefig(filename, format='jpg', dpi=300, bbox_inches='tight', quality=95)
-                    else:
-                        fig.savefig(filename, format='png', dpi=300, bbox_inches='tight')
-                    messagebox.showinfo("Sucesso", f"Mapa salvo: {filename}")
-                except Exception as e:
-                    messagebox.showerror("Erro", f"Erro ao salvar mapa: {str(e)}")
+                if filename.lower().endswith('.pdf'):
+                    options = dict(format='pdf', dpi=300, bbox_inches='tight')
+                elif filename.lower().endswith('.svg'):
+                    options = dict(format='svg', bbox_inches='tight')
+                elif filename.lower().endswith(('.jpg', '.jpeg')):
+                    options = dict(format='jpg', dpi=300, bbox_inches='tight', pil_kwargs={'quality': 95})
+                else:
+                    options = dict(format='png', dpi=300, bbox_inches='tight')
+                run_export(ExportJob(metrics.timed('export.figure')(save_figure), snapshot_figure(fig), filename,
+                                     **options),
+                           f"Mapa salvo: {filename}")
+
+        def export_fast():
+            if grid is None:
+                messagebox.showerror("Erro", "Grade do mapa não disponível")
+                return
+            filename = filedialog.asksaveasfilename(
+                defaultextension=".png",
+                filetypes=[
+                    ("PNG files", "*.png"),
+                    ("JPEG files", "*.jpg"),
+                    ("Grade dBm (TIFF)", "*.tif *.tiff")
+                ]
+            )
+            if not filename:
+                return
+            if filename.lower().endswith(('.tif', '.tiff')):
+                metadata = {'ssid': ssid, 'interpolation': grid_mode, 'floorplan': image_path,
+                            'points': len(dbm_values)}
+                job = ExportJob(write_grid_tiff, filename, *grid, flip_y=flip_y, metadata=metadata)
+                run_export(job, f"Grade salva: {filename}\nMetadados: {filename}.json")
+            else:
+                run_export(ExportJob(self.export_raster, filename, grid, image_path, flip_y),
+                           f"Mapa salvo: {filename}")
 
         def save_measurements_json():
             if measurements is None:
@@ -248,38 +1015,38 @@ class HeatmapGenerator:
                 return
             filename = filedialog.asksaveasfilename(
                 defaultextension=".json",
-                filetypes=[("JSON files", "*.json")]
+                filetypes=[("JSON files", "*.json"), ("JSON comprimido", "*.json.gz")]
             )
             if filename:
-                try:
-                    import json
-                    from datetime import datetime
-                    json_data = {
-                        "metadata": {
-                            "ssid": ssid,
-                            "timestamp": datetime.now().isoformat(),
-                            "total_points": len(measurements),
-                            "statistics": {
-                                "min_dbm": min(dbm_values) if dbm_values else 0,
-                                "max_dbm": max(dbm_values) if dbm_values else 0,
-                                "avg_dbm": sum(dbm_values) / len(dbm_values) if dbm_values else 0,
-                                "points_count": len(dbm_values)
-                            }
-                        },
-                        "measurements": {}
+                from datetime import datetime
+                snapshot = list(measurements.items())
+                header = {
+                    "metadata": {
+                        "ssid": ssid,
+                        "timestamp": datetime.now().isoformat(),
+                        "total_points": len(snapshot),
+                        "statistics": {
+                            "min_dbm": min(dbm_values) if dbm_values else 0,
+                            "max_dbm": max(dbm_values) if dbm_values else 0,
+                            "avg_dbm": sum(dbm_values) / len(dbm_values) if dbm_values else 0,
+                            "points_count": len(dbm_values)
+                        }
                     }
-                    for point_name, measurement in measurements.items():
-                        if measurement.get('dbm', 'N/A') != 'N/A':
-                            json_data["measurements"][point_name] = {
-                                "dbm": float(measurement['dbm']),
-                                "coordinates": measurement.get('coordinates', (0, 0)),
-                                "timestamp": measurement.get('timestamp', datetime.now().isoformat())
-                            }
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        json.dump(json_data, f, indent=2, ensure_ascii=False)
-                    messagebox.showinfo("Sucesso", f"Dados salvos: {filename}")
-                except Exception as e:
-                    messagebox.showerror("Erro", f"Erro ao salvar arquivo: {str(e)}")
+                }
+                now = datetime.now().isoformat()
+                # O progresso conta só as linhas gravadas: pontos sem sinal ficam de fora
+                measured = [(name, m) for name, m in snapshot if m.get('dbm', 'N/A') != 'N/A']
+                items = (
+                    (point_name, {
+                        "dbm": float(measurement['dbm']),
+                        "coordinates": measurement.get('coordinates', (0, 0)),
+                        "timestamp": measurement.get('timestamp', now),
+                        **({"aps": measurement['aps']} if measurement.get('aps') else {})
+                    })
+                    for point_name, measurement in measured
+                )
+                job = ExportJob(write_json_stream, filename, header, "measurements", items, len(measured))
+                run_export(job, f"Dados salvos: {filename}")
 
         def save_measurements_csv():
             if measurements is None:
@@ -287,39 +1054,60 @@ class HeatmapGenerator:
                 return
             filename = filedialog.asksaveasfilename(
                 defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv")]
+                filetypes=[("CSV files", "*.csv"), ("CSV comprimido", "*.csv.gz")]
             )
             if filename:
-                try:
-                    import csv
-                    from datetime import datetime
-                    with open(filename, 'w', newline='', encoding='utf-8') as f:
-                        writer = csv.writer(f)
-                        writer.writerow(['Ponto', 'dBm', 'Coordenada_X', 'Coordenada_Y', 'Timestamp'])
-                        for point_name, measurement in measurements.items():
-                            if measurement.get('dbm', 'N/A') != 'N/A':
-                                coords = measurement.get('coordinates', (0, 0))
-                                timestamp = measurement.get('timestamp', datetime.now().isoformat())
-                                writer.writerow([
-                                    point_name,
-                                    measurement['dbm'],
-                                    coords[0],
-                                    coords[1],
-                                    timestamp
-                                ])
-                    messagebox.showinfo("Sucesso", f"Dados CSV salvos: {filename}")
-                except Exception as e:
-                    messagebox.showerror("Erro", f"Erro ao salvar arquivo CSV: {str(e)}")
+                from datetime import datetime
+                measured = [(name, m) for name, m in measurements.items() if m.get('dbm', 'N/A') != 'N/A']
+                now = datetime.now().isoformat()
+                rows = (
+                    [
+                        point_name,
+                        measurement['dbm'],
+                        measurement.get('coordinates', (0, 0))[0],
+                        measurement.get('coordinates', (0, 0))[1],
+                        measurement.get('timestamp', now)
+                    ]
+                    for point_name, measurement in measured
+                )
+                header = ['Ponto', 'dBm', 'Coordenada_X', 'Coordenada_Y', 'Timestamp']
+                job = ExportJob(write_csv_stream, filename, header, rows, len(measured))
+                run_export(job, f"Dados CSV salvos: {filename}")
 
         ttk.Button(button_frame, text="Salvar Mapa", command=save_heatmap).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Exportar Rápido", command=export_fast).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Salvar Dados (JSON)", command=save_measurements_json).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Salvar Dados (CSV)", command=save_measurements_csv).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Carregar Dados Exemplo", command=load_example_callback).pack(side='left', padx=5)
+        if measurements and any(m.get('aps') for m in measurements.values()):
+            ttk.Button(button_frame, text="Mapa por AP",
+                       command=lambda: self.generate_best_server_map(measurements, ssid, image_path)).pack(side='left', padx=5)
+            ttk.Button(button_frame, text="Interferência",
+                       command=lambda: self.generate_interference_map(measurements, ssid, image_path)).pack(side='left', padx=5)
+
+    def export_raster(self, job, file_path, grid, image_path=None, flip_y=None, width=None):
+        # Exportação direta: grade -> paleta -> PIL sobre a planta, em qualquer largura (padrão: a da planta)
+        xi, yi, Zi = grid
+        if job is not None:
+            job.report(0.1, "Colorindo grade")
+        background = None
+        if image_path:
+            from PIL import Image
+            with Image.open(image_path) as img:
+                img.load()
+                background = img
+        image = render_raster(xi, yi, Zi, self.palette, background, flip_y if background else None, width)
+        return save_raster(job, image, file_path)
+
+    def snapshot_heatmap(self):
+        # Na thread do Tk, antes de passar a figura para uma exportação em segundo plano
+        if self._current_fig is None:
+            raise ValueError("Nenhum mapa de calor foi gerado ainda")
+        return snapshot_figure(self._current_fig)
 
-    def save_heatmap_image(self, file_path):
+    def save_heatmap_image(self, file_path, snapshot):
         try:
-            if not hasattr(self, '_current_fig') or self._current_fig is None:
-                raise ValueError("Nenhum mapa de calor foi gerado ainda")
-            self._current_fig.savefig(file_path, format='png', dpi=300, bbox_inches='tight')
+            with metrics.timer('export.heatmap_image'):
+                save_figure(None, snapshot, file_path, format='png', dpi=300, bbox_inches='tight')
         except Exception as e:
             raise Exception(f"Erro ao salvar imagem do mapa: {str(e)}")
@@ -0,0 +1,73 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+
+from core.metrics import metrics
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def show_metrics_window(parent, extra_stats=None):
+    window = tk.Toplevel(parent)
+    window.title("Métricas de Desempenho")
+    window.geometry("760x480")
+
+    top_frame = ttk.Frame(window, style='TFrame')
+    top_frame.pack(fill='x', padx=10, pady=5)
+
+    enabled_var = tk.BooleanVar(value=metrics.enabled)
+
+    def toggle():
+        metrics.enabled = enabled_var.get()
+        refresh()
+
+    ttk.Checkbutton(top_frame, text="Coletar métricas", variable=enabled_var,
+                    command=toggle).pack(side='left')
+
+    tree = ttk.Treeview(window, columns=("metrica", "n", "media", "p50", "p95", "max"),
+                        show='headings', style='Treeview')
+    for column, title, width in (("metrica", "Métrica", 260), ("n", "N", 70), ("media", "Média (ms)", 90),
+                                 ("p50", "p50 (ms)", 80), ("p95", "p95 (ms)", 80), ("max", "Máx (ms)", 90)):
+        tree.heading(column, text=title)
+        tree.column(column, width=width, anchor='w' if column == "metrica" else 'center')
+    tree.pack(fill='both', expand=True, padx=10, pady=5)
+
+    def refresh():
+        for item in tree.get_children():
+            tree.delete(item)
+        snapshot = metrics.snapshot()
+        for name, h in snapshot['histograms'].items():
+            tree.insert('', 'end', values=(name, h['count'], _fmt(h['mean']), _fmt(h['p50']),
+                                           _fmt(h['p95']), _fmt(h['max'])))
+        for name, value in sorted(snapshot['counters'].items()):
+            tree.insert('', 'end', values=(name, value, "", "", "", ""))
+        for name, value in sorted((extra_stats() if extra_stats else {}).items()):
+            tree.insert('', 'end', values=(name, f"{value:.2f}" if isinstance(value, float) else value,
+                                           "", "", "", ""))
+
+    def export():
+        filename = filedialog.asksaveasfilename(
+            parent=window,
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")]
+        )
+        if filename:
+            try:
+                metrics.export_json(filename)
+                messagebox.showinfo("Sucesso", f"Métricas salvas: {filename}", parent=window)
+            except Exception as e:
+                messagebox.showerror("Erro", f"Erro ao salvar métricas: {str(e)}", parent=window)
+
+    def reset():
+        metrics.reset()
+        refresh()
+
+    button_frame = ttk.Frame(window, style='TFrame')
+    button_frame.pack(pady=5)
+    ttk.Button(button_frame, text="Atualizar", command=refresh).pack(side='left', padx=5)
+    ttk.Button(button_frame, text="Zerar", command=reset).pack(side='left', padx=5)
+    ttk.Button(button_frame, text="Exportar JSON", command=export).pack(side='left', padx=5)
+
+    refresh()
+    return window
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+from core.metrics import metrics
+
+
+class UiDispatcher:
+    def __init__(self, root, interval_ms=50):
+        self.root = root
+        self.interval_ms = interval_ms
+
+        self._lock = threading.Lock()
+        self._actions = deque()
+        self._renders = OrderedDict()
+        self._after_id = None
+
+        self.frames = 0
+        self.actions_applied = 0
+        self.renders_applied = 0
+        self.renders_coalesced = 0
+        self.last_frame_ms = 0.0
+        self.max_frame_ms = 0.0
+        self.total_frame_ms = 0.0
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def post(self, func, *args):
+        # Pode ser chamado de qualquer thread; executado em ordem no próximo quadro
+        with self._lock:
+            self._actions.append((func, args))
+
+    def invalidate(self, key, func):
+        # Atualizações de interface com a mesma chave são aplicadas uma vez por quadro
+        with self._lock:
+            if key in self._renders:
+                self.renders_coalesced += 1
+            self._renders[key] = func
+
+    def queue_length(self):
+        with self._lock:
+            return len(self._actions) + len(self._renders)
+
+    def stats(self):
+        frames = self.frames
+        return {
+            'queue_length': self.queue_length(),
+            'frames': frames,
+            'actions_applied': self.actions_applied,
+            'renders_applied': self.renders_applied,
+            'renders_coalesced': self.renders_coalesced,
+            'last_frame_ms': self.last_frame_ms,
+            'max_frame_ms': self.max_frame_ms,
+            'avg_frame_ms': self.total_frame_ms / frames if frames else 0.0,
+        }
+
+    def flush(self):
+        with self._lock:
+            actions = self._actions
+            self._actions = deque()
+
+        if not actions and not self._renders:
+            return
+
+        start = time.perf_counter()
+
+        for func, args in actions:
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Erro ao atualizar interface: {e}")
+        self.actions_applied += len(actions)
+
+        # As ações acima podem invalidar partes da tela; tudo é redesenhado nesta mesma passada
+        with self._lock:
+            renders = self._renders
+            self._renders = OrderedDict()
+
+        for func in renders.values():
+            try:
+                func()
+            except Exception as e:
+                print(f"Erro ao atualizar interface: {e}")
+        self.renders_applied += len(renders)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.frames += 1
+        self.last_frame_ms = elapsed_ms
+        self.max_frame_ms = max(self.max_frame_ms, elapsed_ms)
+        self.total_frame_ms += elapsed_ms
+        metrics.observe('ui.frame', elapsed_ms)
+        metrics.count('ui.actions', len(actions))
+        metrics.count('ui.renders', len(renders))
+
+    def _tick(self):
+        try:
+            self.flush()
+        finally:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
@@ -3,15 +3,28 @@ import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from collections import defaultdict
-from PIL import Image, ImageTk
+from PIL import Image
 import os
 
 from core.wifi_scanner import WifiScanner
-from core.utils import signal_dbm_to_percent, dbm_to_color, dbm_to_status, interpolate_color
-from gui.heatmap import HeatmapGenerator
+from core.journal import SurveyJournal, base_path, default_journal_dir, load_journal, new_journal_path
+from core.exporter import ExportJob, write_json_stream
+from core.filters import SignalFilterBank, raw_samples, replay
+from core.metrics import metrics
+from core.startup import profiler
+from core.palette import DBM_PALETTE
+from core.walk import WalkRecorder, WalkSession
+from core.utils import signal_dbm_to_percent, dbm_to_status, \
+    dbm_to_status_array, to_dbm_array
+from gui.floorplan_viewer import FloorplanViewer
+from gui.ui_dispatcher import UiDispatcher
+
+FILTER_OPTIONS = {"Nenhum": None, "EWMA": 'ewma', "Kalman": 'kalman'}
+INTERPOLATION_OPTIONS = {"IDW": 'idw', "Modelo de propagação": 'pathloss'}
+HISTORY_MONTHS = 6
 
 class WifiMapApp:  
-    def __init__(self, root):
+    def __init__(self, root, warm_up=True):
         self.root = root
         self.root.title("WiFi Scanner - Mapa de Calor Profissional")
         self.root.geometry("1200x900")
@@ -19,20 +32,59 @@ class WifiMapApp:
         self.setup_styles()
         
         self.scanner = WifiScanner()
-        self.heatmap_generator = HeatmapGenerator(root)
+        self._heatmap_generator = None
         
         self.measurements = defaultdict(dict)
         self.ssid_selecionado = None
+        self.signal_filter = SignalFilterBank()
         
         self.floorplan_image = None
-        self.floorplan_photo = None
         self.floorplan_path = None
+        self.viewer = None
         self.image_points = {}
         self.canvas_points = {}
+        self.suggested_point = None
+
+        # Modo caminhada: amostras contínuas posicionadas ao longo do trajeto
+        self.walk = None
+        self.walk_recorder = None
+        self.walk_id = 0
+        self.walk_markers = {}
+        self.walk_lines = []
+        # Linhas da lista de pontos: uma por ponto clicado e uma por trajeto de caminhada
+        self._tree_items = {}
+        self._walk_rows = {}
         
         self.point_labels = {}
         self.canvas = None
+        self.dispatcher = UiDispatcher(root)
+        self.journal = None
         self.create_widgets()
+        self.dispatcher.start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        if warm_up:
+            self.root.after(500, self._warm_up)
+
+    @property
+    def heatmap_generator(self):
+        if self._heatmap_generator is None:
+            from gui.heatmap import HeatmapGenerator
+            self._heatmap_generator = HeatmapGenerator(self.root)
+        return self._heatmap_generator
+
+    def _warm_up(self):
+        # Importa matplotlib/NumPy em segundo plano depois que a janela já apareceu
+        def warm_up_thread():
+            try:
+                with profiler.phase("pré-aquecimento gui.heatmap"):
+                    import gui.heatmap
+            except Exception as e:
+                print(f"Aviso: pré-aquecimento falhou: {e}")
+                return
+            profiler.print_report()
+
+        threading.Thread(target=warm_up_thread, daemon=True).start()
 
     def setup_styles(self):
         style = ttk.Style()
@@ -172,6 +224,7 @@ class WifiMapApp:
         self.canvas.pack(fill='both', expand=True)
         
         self.canvas.bind('<Button-1>', self.on_canvas_click)
+        self.viewer = FloorplanViewer(self.canvas, on_view_changed=self.redraw_points)
         
         self.canvas.create_text(300, 200, text="Clique em 'Carregar Imagem' para começar",
                                font=('Segoe UI', 12), fill='gray')
@@ -185,6 +238,34 @@ class WifiMapApp:
                                         command=self.load_floorplan_image, style='Primary.TButton')
         self.btn_load_image.pack(fill='x')
 
+        self.btn_resume = ttk.Button(image_frame, text="Abrir Sessão",
+                                    command=self.open_session, style='TButton')
+        self.btn_resume.pack(fill='x', pady=(5, 0))
+
+        self.btn_save_session = ttk.Button(image_frame, text="Salvar Sessão",
+                                          command=self.save_session_file, style='TButton')
+        self.btn_save_session.pack(fill='x', pady=(5, 0))
+
+        self.btn_suggest = ttk.Button(image_frame, text="Sugerir Ponto",
+                                     command=self.suggest_measurement_point, style='TButton')
+        self.btn_suggest.pack(fill='x', pady=(5, 0))
+
+        self.btn_walk = ttk.Button(image_frame, text="Iniciar Caminhada",
+                                  command=self.toggle_walk, style='TButton')
+        self.btn_walk.pack(fill='x', pady=(5, 0))
+
+        self.btn_compare = ttk.Button(image_frame, text="Comparar",
+                                     command=self.open_comparison, style='TButton')
+        self.btn_compare.pack(fill='x', pady=(5, 0))
+
+        self.btn_history = ttk.Button(image_frame, text="Salvar no Histórico",
+                                     command=self.save_to_history, style='TButton')
+        self.btn_history.pack(fill='x', pady=(5, 0))
+
+        self.btn_history_mean = ttk.Button(image_frame, text="Média Histórica",
+                                          command=self.show_history_mean, style='TButton')
+        self.btn_history_mean.pack(fill='x', pady=(5, 0))
+
     def _create_points_list(self, parent):
         list_frame = ttk.LabelFrame(parent, text="Pontos Medidos", 
                                    style='Card.TLabelframe', padding=10)
@@ -226,21 +307,11 @@ class WifiMapApp:
                 self.floorplan_image = Image.open(filename)
                 self.floorplan_path = filename
                 
-                canvas_width = 600
-                canvas_height = 400
-                
-                img_width, img_height = self.floorplan_image.size
-                ratio = min(canvas_width / img_width, canvas_height / img_height)
-                
-                if ratio < 1:
-                    new_width = int(img_width * ratio)
-                    new_height = int(img_height * ratio)
-                    self.floorplan_image = self.floorplan_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                self.floorplan_photo = ImageTk.PhotoImage(self.floorplan_image)
-                
                 self.canvas.delete("all")
-                self.canvas.create_image(0, 0, anchor='nw', image=self.floorplan_photo)
+                self._clear_suggestion()
+                self._clear_walk()
+                self.viewer.set_image(self.floorplan_image)
+                self._journal_append({'type': 'floorplan', 'path': filename})
                 
                 self.status_label.config(text=f"Imagem carregada: {os.path.basename(filename)}", 
                                        foreground=self.colors['success'])
@@ -254,14 +325,17 @@ class WifiMapApp:
     def clear_floorplan_image(self):
         if messagebox.askyesno("Confirmar", "Deseja remover a imagem atual e todos os pontos?"):
             self.floorplan_image = None
-            self.floorplan_photo = None
             self.floorplan_path = None
             self.image_points.clear()
+            self._clear_suggestion()
+            self._clear_walk()
             self.canvas_points.clear()
             
+            self.viewer.clear()
             self.canvas.delete("all")
             self.canvas.create_text(300, 200, text="Clique em 'Carregar Imagem' para começar",
                                    font=('Segoe UI', 12), fill='gray')
+            self._journal_append({'type': 'clear', 'floorplan': True})
             
             self.update_points_tree()
             
@@ -276,8 +350,11 @@ class WifiMapApp:
                 self.canvas.delete(text_id)
             
             self.image_points.clear()
+            self._clear_suggestion()
+            self._clear_walk()
             self.canvas_points.clear()
             self.measurements.clear()
+            self._journal_append({'type': 'clear'})
             
             self.update_points_tree()
             
@@ -288,46 +365,50 @@ class WifiMapApp:
         if not self.floorplan_image or not self.ssid_selecionado:
             return
         
-        x, y = event.x, event.y
+        # Coordenadas guardadas no espaço da imagem original, independentes do zoom
+        x, y = self.viewer.canvas_to_image(event.x, event.y)
         
-        if self.floorplan_photo:
-            img_width = self.floorplan_photo.width()
-            img_height = self.floorplan_photo.height()
-            
-            if 0 <= x <= img_width and 0 <= y <= img_height:
-                self.add_measurement_point(x, y)
+        if not self.viewer.contains(x, y):
+            return
+        if self.walk_recorder is not None:
+            self.add_walk_waypoint(int(round(x)), int(round(y)))
+        else:
+            self.add_measurement_point(int(round(x)), int(round(y)))
 
     def add_measurement_point(self, x, y):
         point_num = len(self.image_points) + 1
         point_name = f"Ponto {point_num}"
         
         self.image_points[point_name] = (x, y)
-        
-        outline_id = self.canvas.create_oval(x-8, y-8, x+8, y+8, fill='red', outline='white', width=2)
-        circle_id = self.canvas.create_oval(x-5, y-5, x+5, y+5, fill='red', outline='white', width=1)
-        text_id = self.canvas.create_text(x, y-15, text=str(point_num), 
-                                        font=('Arial', 10, 'bold'), fill='white')
-        
-        self.canvas_points[point_name] = (outline_id, circle_id, text_id)
+        self._draw_point_marker(point_name, x, y, str(point_num))
+        self._clear_suggestion()
         
         self.measure_point_at_position(point_name, x, y)
         
-        self.update_points_tree()
-        
         self.status_label.config(text=f"Ponto {point_num} adicionado em ({x}, {y}) - Medição iniciada", 
                                foreground=self.colors['primary'])
 
+    def _draw_point_marker(self, point_name, x, y, text, fill='red'):
+        cx, cy = self.viewer.image_to_canvas(x, y)
+        outline_id = self.canvas.create_oval(cx-8, cy-8, cx+8, cy+8, fill='red', outline='white', width=2)
+        circle_id = self.canvas.create_oval(cx-5, cy-5, cx+5, cy+5, fill=fill, outline='white', width=1)
+        text_id = self.canvas.create_text(cx, cy-15, text=text, 
+                                        font=('Arial', 10, 'bold'), fill='white')
+        
+        self.canvas_points[point_name] = (outline_id, circle_id, text_id)
+
     def measure_point_at_position(self, point_name, x, y):
         self.canvas.config(cursor='wait')
         
         def scan_thread():
-            sig = self.scanner.scan_once(self.ssid_selecionado)
-            self.root.after(0, lambda: self.update_measurement_result_position(point_name, x, y, sig))
+            sig, aps = self.scanner.scan_detailed(self.ssid_selecionado)
+            self.dispatcher.post(self.update_measurement_result_position, point_name, x, y, sig, aps)
 
         thread = threading.Thread(target=scan_thread, daemon=True)
         thread.start()
 
-    def update_measurement_result_position(self, point_name, x, y, sig):
+    def update_measurement_result_position(self, point_name, x, y, sig, aps=None):
+        # Ponto isolado: leitura bruta, sem passar pelo filtro do fluxo de caminhada
         timestamp = time.strftime("%H:%M:%S")
         
         if sig is None:
@@ -343,18 +424,24 @@ class WifiMapApp:
             'timestamp': timestamp,
             'coordinates': (x, y)
         }
+        if aps:
+            measurement['aps'] = aps
         self.measurements[point_name] = measurement
+        self._journal_point(point_name, measurement)
 
         self.update_point_visual(point_name, measurement)
         
         self.canvas.config(cursor='')
         
-        self.update_points_tree()
+        self._add_tree_rows([(point_name, (x, y), dbm_str)])
         
-        total_points = len([p for p in self.measurements.values() if p['dbm'] != 'N/A'])
-        self.status_label.config(text=f"{point_name}: {dbm_str} dBm - Total de pontos medidos: {total_points}", 
-                               foreground=self.colors['success'])
+        def update_status():
+            total_points = len([p for p in self.measurements.values() if p['dbm'] != 'N/A'])
+            self.status_label.config(text=f"{point_name}: {dbm_str} dBm - Total de pontos medidos: {total_points}", 
+                                   foreground=self.colors['success'])
+        self.dispatcher.invalidate('status', update_status)
 
+    @metrics.timed('app.update_point_visual')
     def update_point_visual(self, point_name, measurement):
         if point_name not in self.canvas_points:
             return
@@ -363,16 +450,299 @@ class WifiMapApp:
         outline_id, circle_id, text_id = self.canvas_points[point_name]
 
         if dbm != "N/A":
-            base_color = dbm_to_color(dbm)
+            base_color = DBM_PALETTE.color_for(dbm)
 
             final_color = self._calculate_gradient_color(point_name, base_color)
 
             self.canvas.itemconfig(circle_id, fill=final_color)
 
-            coords = self.image_points[point_name]
-            self.canvas.coords(text_id, coords[0], coords[1]-15)
+            cx, cy = self.viewer.image_to_canvas(*self.image_points[point_name])
+            self.canvas.coords(text_id, cx, cy-15)
             self.canvas.itemconfig(text_id, text=f"{dbm}")
 
+    @metrics.timed('app.redraw_points')
+    def redraw_points(self):
+        for point_name, (outline_id, circle_id, text_id) in self.canvas_points.items():
+            if point_name not in self.image_points:
+                continue
+            cx, cy = self.viewer.image_to_canvas(*self.image_points[point_name])
+            self.canvas.coords(outline_id, cx-8, cy-8, cx+8, cy+8)
+            self.canvas.coords(circle_id, cx-5, cy-5, cx+5, cy+5)
+            self.canvas.coords(text_id, cx, cy-15)
+        for item_id, x, y in self.walk_markers.values():
+            cx, cy = self.viewer.image_to_canvas(x, y)
+            self.canvas.coords(item_id, cx-4, cy-4, cx+4, cy+4)
+        for line_id, waypoints in self.walk_lines:
+            self._update_walk_line(line_id, waypoints)
+        self._draw_suggestion()
+
+    def toggle_walk(self):
+        if self.walk_recorder is not None:
+            self.stop_walk()
+        else:
+            self.start_walk()
+
+    def start_walk(self):
+        if not self.floorplan_image or not self.ssid_selecionado:
+            messagebox.showwarning("Aviso", "Carregue uma planta baixa e selecione uma rede Wi-Fi")
+            return
+
+        self.walk_id += 1
+        # Sessões retomadas podem já ter trajetos com este número
+        while any(name.startswith(f"Trajeto {self.walk_id}.") for name in self.measurements):
+            self.walk_id += 1
+        self.walk = WalkSession()
+        # Cada caminhada é um fluxo próprio: o filtro não carrega o estado do trajeto anterior
+        self.signal_filter.reset()
+        line_id = self.canvas.create_line(0, 0, 0, 0, fill=self.colors['primary'], width=2,
+                                          dash=(6, 3), state='hidden', tags='walk')
+        self.walk_lines.append((line_id, []))
+        # Cada amostra do scanner agenda uma ingestão; várias no mesmo quadro viram uma só
+        self.walk_recorder = WalkRecorder(
+            self.scanner, self.ssid_selecionado, self.walk,
+            on_sample=lambda: self.dispatcher.invalidate('walk', self._ingest_walk)
+        ).start()
+
+        self.btn_walk.config(text="Encerrar Caminhada")
+        self.status_label.config(text="Caminhada iniciada - clique na planta a cada mudança de direção do trajeto",
+                                 foreground=self.colors['primary'])
+
+    def add_walk_waypoint(self, x, y):
+        self.walk.add_waypoint(x, y)
+        line_id, waypoints = self.walk_lines[-1]
+        waypoints.append((x, y))
+        self._update_walk_line(line_id, waypoints)
+        self.dispatcher.invalidate('walk', self._ingest_walk)
+
+    def _update_walk_line(self, line_id, waypoints):
+        if len(waypoints) < 2:
+            return
+        coords = []
+        for x, y in waypoints:
+            coords.extend(self.viewer.image_to_canvas(x, y))
+        self.canvas.coords(line_id, *coords)
+        self.canvas.itemconfig(line_id, state='normal')
+
+    def stop_walk(self):
+        recorder, walk = self.walk_recorder, self.walk
+        recorder.stop()
+        self.walk_recorder = None
+        self.walk = None
+        self.btn_walk.config(text="Iniciar Caminhada")
+
+        self._ingest_walk_samples(walk.finish())
+        self.status_label.config(
+            text=f"Caminhada encerrada: {walk.positioned} amostras posicionadas, {walk.dropped} fora do trajeto",
+            foreground=self.colors['success'])
+
+    def _ingest_walk(self):
+        if self.walk is not None:
+            self._ingest_walk_samples(self.walk.drain())
+
+    @metrics.timed('app.ingest_walk')
+    def _ingest_walk_samples(self, samples):
+        if not samples:
+            return
+
+        rows = []
+        for t, x, y, sig, aps in samples:
+            sig, aps, raw = self._filter_reading(sig, aps)
+            x, y = int(round(x)), int(round(y))
+            point_name = f"Trajeto {self.walk_id}.{len(self.walk_markers) + 1}"
+            timestamp = time.strftime("%H:%M:%S", time.localtime(t))
+            dbm_str = "N/A" if sig is None else sig
+            pct = 0 if sig is None else signal_dbm_to_percent(sig)
+
+            measurement = {
+                'dbm': dbm_str,
+                'percent': pct,
+                'timestamp': timestamp,
+                'coordinates': (x, y)
+            }
+            if aps:
+                measurement['aps'] = aps
+            if raw is not None:
+                measurement['dbm_raw'] = raw
+            self.measurements[point_name] = measurement
+            self._journal_point(point_name, measurement)
+
+            cx, cy = self.viewer.image_to_canvas(x, y)
+            color = 'gray' if sig is None else DBM_PALETTE.color_for(sig)
+            item_id = self.canvas.create_oval(cx-4, cy-4, cx+4, cy+4, fill=color, outline='', tags='walk')
+            self.walk_markers[point_name] = (item_id, x, y)
+            rows.append((point_name, (x, y), dbm_str))
+
+        self._add_tree_rows(rows)
+        if self.walk_recorder is not None:
+            self.status_label.config(text=f"Caminhada: {len(self.walk_markers)} amostras no trajeto",
+                                     foreground=self.colors['primary'])
+
+    def _clear_walk(self):
+        if self.walk_recorder is not None:
+            self.walk_recorder.stop()
+            self.walk_recorder = None
+            self.walk = None
+            self.btn_walk.config(text="Iniciar Caminhada")
+        self.walk_markers.clear()
+        self.walk_lines.clear()
+        self.canvas.delete('walk')
+
+    def suggest_measurement_point(self):
+        if not self.floorplan_image:
+            messagebox.showwarning("Aviso", "Carregue uma planta baixa primeiro")
+            return
+
+        points = [m for m in self.measurements.values() if 'coordinates' in m and m.get('dbm', 'N/A') != 'N/A']
+        if not points:
+            messagebox.showwarning("Aviso", "Meça pelo menos um ponto antes de pedir uma sugestão")
+            return
+
+        import numpy as np
+        from core.coverage import suggest_next_point
+        # Grade de ~100 colunas sobre a planta, em coordenadas da imagem
+        width, height = self.floorplan_image.size
+        columns = 100
+        rows = max(1, round(columns * height / width))
+        xi = np.linspace(0, width, columns)
+        yi = np.linspace(0, height, rows)
+        with metrics.timer('app.suggest_point'):
+            x, y, _ = suggest_next_point([m['coordinates'][0] for m in points],
+                                         [m['coordinates'][1] for m in points],
+                                         [float(m['dbm']) for m in points], xi, yi)
+
+        self.suggested_point = (int(round(x)), int(round(y)))
+        self._draw_suggestion()
+        self.status_label.config(text=f"Próxima medição sugerida em {self.suggested_point} (região mais incerta do mapa)",
+                                 foreground=self.colors['primary'])
+
+    def _draw_suggestion(self):
+        self.canvas.delete('suggestion')
+        if self.suggested_point is None:
+            return
+        cx, cy = self.viewer.image_to_canvas(*self.suggested_point)
+        self.canvas.create_oval(cx-12, cy-12, cx+12, cy+12, outline=self.colors['primary'], width=3,
+                                dash=(4, 2), tags='suggestion')
+        self.canvas.create_text(cx, cy-22, text="Medir aqui", font=('Arial', 10, 'bold'),
+                                fill=self.colors['primary'], tags='suggestion')
+
+    def _clear_suggestion(self):
+        self.suggested_point = None
+        self.canvas.delete('suggestion')
+
+    def open_comparison(self):
+        # Compara as medições atuais com uma sessão salva (antes/depois) ou com outra rede vista nos mesmos pontos
+        points = {name: m for name, m in self.measurements.items() if 'coordinates' in m}
+        if not points:
+            messagebox.showwarning("Aviso", "Meça pontos na planta antes de comparar")
+            return
+
+        session_option = "Sessão salva..."
+        ssids = sorted({reading.get('ssid') for m in points.values() for reading in (m.get('aps') or {}).values()
+                        if reading.get('ssid') and reading.get('ssid') != self.ssid_selecionado})
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Comparar Medições")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        ttk.Label(dialog, text=f"Comparar {self.ssid_selecionado or 'medição atual'} com:",
+                  font=('Segoe UI', 10, 'bold')).pack(padx=15, pady=(15, 5), anchor='w')
+        combo = ttk.Combobox(dialog, state='readonly', width=30, font=('Segoe UI', 10),
+                             values=[session_option] + ssids)
+        combo.current(0)
+        combo.pack(padx=15, pady=5)
+
+        def confirm():
+            choice = combo.get()
+            dialog.destroy()
+            if choice == session_option:
+                self.compare_with_session()
+            else:
+                from core.session import ssid_measurements
+                self.heatmap_generator.generate_comparison_map(
+                    ssid_measurements(points, choice), points, choice,
+                    self.ssid_selecionado or "Medição atual", self.floorplan_path)
+
+        ttk.Button(dialog, text="Comparar", command=confirm, style='Primary.TButton').pack(padx=15, pady=(5, 15))
+
+    def compare_with_session(self):
+        filename = filedialog.askopenfilename(
+            title="Sessão para comparar",
+            filetypes=[
+                ('Sessões', '*.jsonl *.json *.npz'),
+                ('Todos os arquivos', '*.*')
+            ]
+        )
+        if not filename:
+            return
+
+        before = self._read_session_points(filename)
+        if before is None:
+            return
+
+        # A sessão salva é o "antes"; as medições atuais, o "depois"
+        after = {name: m for name, m in self.measurements.items() if 'coordinates' in m}
+        self.heatmap_generator.generate_comparison_map(before, after, os.path.basename(filename),
+                                                       "Medição atual", self.floorplan_path)
+
+    def save_to_history(self):
+        # Levantamentos da mesma planta ficam num histórico base + deltas para comparações ao longo do tempo
+        if not self.floorplan_path:
+            messagebox.showwarning("Aviso", "Carregue uma planta baixa primeiro")
+            return
+        points = {name: m for name, m in self.measurements.items() if 'coordinates' in m}
+        if not points:
+            messagebox.showwarning("Aviso", "Meça pontos na planta antes de salvar no histórico")
+            return
+
+        from core.history import SurveyHistory
+        from core.session import SurveyArrays
+        try:
+            history = SurveyHistory.for_floorplan(self.floorplan_path)
+            history.add_survey(SurveyArrays.from_measurements(points, ssid=self.ssid_selecionado,
+                                                              floorplan=self.floorplan_path))
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao salvar no histórico: {str(e)}")
+            return
+        self.status_label.config(
+            text=f"Levantamento salvo no histórico ({len(history.surveys(ssid=self.ssid_selecionado))} desta rede nesta planta)",
+            foreground=self.colors['success'])
+
+    def show_history_mean(self):
+        if not self.floorplan_path:
+            messagebox.showwarning("Aviso", "Carregue uma planta baixa primeiro")
+            return
+
+        import numpy as np
+        from core.history import SurveyHistory, months_ago
+        try:
+            history = SurveyHistory.for_floorplan(self.floorplan_path)
+            start = months_ago(HISTORY_MONTHS)
+            surveys = history.surveys(start, ssid=self.ssid_selecionado)
+            mean, count = history.point_means(start, ssid=self.ssid_selecionado)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao ler o histórico: {str(e)}")
+            return
+
+        points = {}
+        for i in np.flatnonzero(count > 0).tolist():
+            x, y = history.positions[i]
+            points[history.names[i]] = {'dbm': round(float(mean[i]), 1), 'coordinates': (float(x), float(y))}
+        if not surveys or len(points) < 3:
+            messagebox.showwarning("Aviso", f"Histórico insuficiente nos últimos {HISTORY_MONTHS} meses para esta rede")
+            return
+        self.heatmap_generator.generate_heatmap(
+            points, f"{self.ssid_selecionado} - média de {len(surveys)} levantamentos ({HISTORY_MONTHS} meses)",
+            self.floorplan_path)
+
+    def _read_session_points(self, filename):
+        try:
+            from core.session import load_session
+            return load_session(filename).to_measurements()
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao ler sessão: {str(e)}")
+            return None
+
+    @metrics.timed('app.gradient_color')
     def _calculate_gradient_color(self, point_name, base_color):
         if point_name not in self.image_points:
             return base_color
@@ -398,12 +768,14 @@ class WifiMapApp:
 
         nearby_points = []
         max_distance = 100
+        # Distâncias medidas na escala em que a planta é exibida inicialmente
+        display_scale = self.viewer.base_scale
 
         for other_point, coords in self.image_points.items():
             if other_point == point_name:
                 continue
 
-            distance = ((coords[0] - current_coords[0]) ** 2 + (coords[1] - current_coords[1]) ** 2) ** 0.5
+            distance = ((coords[0] - current_coords[0]) ** 2 + (coords[1] - current_coords[1]) ** 2) ** 0.5 * display_scale
 
             if distance <= max_distance:
                 other_dbm = None
@@ -432,27 +804,53 @@ class WifiMapApp:
         blend_factor = 0.3  
         interpolated_dbm = current_dbm_val * (1 - blend_factor) + weighted_avg * blend_factor
 
-        return dbm_to_color(interpolated_dbm)
+        return DBM_PALETTE.color_for(interpolated_dbm)
 
+    @metrics.timed('app.update_points_tree')
     def update_points_tree(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        for point_name, measurement in self.measurements.items():
-            coords = measurement.get('coordinates', (0, 0))
-            dbm = measurement.get('dbm', 'N/A')
-            
+        # Reconstrução completa (limpar, restaurar, refiltrar); medições novas entram por _add_tree_rows
+        from core.session import point_rows
+        self.tree.delete(*self.tree.get_children())
+        self._tree_items.clear()
+        self._walk_rows.clear()
+        self._add_tree_rows(point_rows(self.measurements))
+
+    @metrics.timed('app.add_tree_rows')
+    def _add_tree_rows(self, rows):
+        # (nome, coordenadas, dBm): pontos clicados ganham ou atualizam a própria linha; amostras de
+        # caminhada só somam na linha do trajeto, atualizada uma vez por lote
+        points = []
+        walks = {}
+        for point_name, coords, dbm in rows:
+            if not point_name.startswith("Trajeto "):
+                points.append((point_name, f"({coords[0]}, {coords[1]})", dbm))
+                continue
+            walk = point_name.split('.')[0]
+            stats = walks[walk] = self._walk_rows.setdefault(walk, [None, 0, 0, 0.0])
+            stats[1] += 1
             if dbm != 'N/A':
-                status = dbm_to_status(dbm)
-            else:
-                status = "Sem sinal"
+                stats[2] += 1
+                stats[3] += float(dbm)
 
-            self.tree.insert('', 'end', values=(
-                point_name, 
-                f"({coords[0]}, {coords[1]})", 
-                dbm, 
-                status
-            ))
+        for walk, (item, count, measured, total) in walks.items():
+            points.append((walk, f"{count} amostras", round(total / measured, 1) if measured else 'N/A'))
+        if not points:
+            return
+
+        # Status de todas as linhas do lote calculados de uma vez
+        statuses = dbm_to_status_array(to_dbm_array([dbm for _, _, dbm in points]))
+        for (name, coords, dbm), status in zip(points, statuses):
+            values = (name, coords, dbm, str(status))
+            if name in walks:
+                stats = walks[name]
+                if stats[0] is None:
+                    stats[0] = self.tree.insert('', 'end', values=values)
+                else:
+                    self.tree.item(stats[0], values=values)
+            elif name in self._tree_items:
+                self.tree.item(self._tree_items[name], values=values)
+            else:
+                self._tree_items[name] = self.tree.insert('', 'end', values=values)
 
     def _create_top_frame(self, parent):
         top_frame = ttk.Frame(parent, style='Card.TLabelframe')
@@ -514,6 +912,14 @@ class WifiMapApp:
                                   command=self.save_heatmap_and_data, state='disabled',
                                   style='Success.TButton')
         self.btn_save.pack(side='left')
+
+        self.btn_metrics = ttk.Button(button_container, text="Métricas",
+                                     command=self.show_metrics, style='TButton')
+        self.btn_metrics.pack(side='left', padx=(15, 0))
+
+        self.btn_report = ttk.Button(button_container, text="Relatório PDF",
+                                    command=self.export_report, style='TButton')
+        self.btn_report.pack(side='left', padx=(15, 0))
     def _create_wifi_controls(self, parent):
         ttk.Label(parent, text="Rede Wi-Fi:", font=('Segoe UI', 10, 'bold')).grid(row=0, column=0, sticky='w', padx=(0, 8), pady=5)
         self.combo_wifi = ttk.Combobox(parent, state='readonly', width=20, font=('Segoe UI', 10))
@@ -524,6 +930,19 @@ class WifiMapApp:
                                   command=self.atualizar_redes, style='Primary.TButton')
         btn_atualizar.grid(row=0, column=2, pady=5)
 
+        ttk.Label(parent, text="Filtro:", font=('Segoe UI', 10, 'bold')).grid(row=0, column=3, sticky='w', padx=(20, 8), pady=5)
+        self.combo_filter = ttk.Combobox(parent, state='readonly', width=10, font=('Segoe UI', 10),
+                                         values=list(FILTER_OPTIONS))
+        self.combo_filter.set("Nenhum")
+        self.combo_filter.grid(row=0, column=4, sticky='w', pady=5)
+        self.combo_filter.bind("<<ComboboxSelected>>", self.on_filter_changed)
+
+        ttk.Label(parent, text="Interpolação:", font=('Segoe UI', 10, 'bold')).grid(row=0, column=5, sticky='w', padx=(20, 8), pady=5)
+        self.combo_interpolation = ttk.Combobox(parent, state='readonly', width=20, font=('Segoe UI', 10),
+                                                values=list(INTERPOLATION_OPTIONS))
+        self.combo_interpolation.set("IDW")
+        self.combo_interpolation.grid(row=0, column=6, sticky='w', pady=5)
+
     def _create_progress_frame(self, parent):
         self.progress_frame = ttk.LabelFrame(parent, text="Pontos de Medição",
                                            style='Card.TLabelframe', padding=15)
@@ -562,11 +981,30 @@ class WifiMapApp:
         self.btn_heatmap.config(state='normal')
 
     def atualizar_redes(self):
-        lista_ssids = self.scanner.scan_networks()
-        
+        self.status_label.config(text="Procurando redes Wi-Fi...", foreground=self.colors['info'])
+
+        def scan_thread():
+            with profiler.phase("scan_networks"):
+                lista_ssids = self.scanner.scan_networks()
+            self.dispatcher.post(self._set_network_list, lista_ssids)
+
+        thread = threading.Thread(target=scan_thread, daemon=True)
+        thread.start()
+
+    def _set_network_list(self, lista_ssids):
+        # A varredura termina depois; se nesse meio tempo uma rede foi escolhida ou uma sessão
+        # aberta, a seleção e os controles ficam como estão
+        selected = self.ssid_selecionado
+        if selected and selected not in lista_ssids:
+            lista_ssids = lista_ssids + [selected]
         self.combo_wifi['values'] = ["Selecione uma rede..."] + lista_ssids
+        if selected:
+            self.combo_wifi.set(selected)
+            self.status_label.config(text=f"Rede selecionada: {selected}", foreground=self.colors['success'])
+            return
         self.combo_wifi.current(0)
-        self.ssid_selecionado = None
+        self.disable_controls()
+        self.status_label.config(text="Selecione uma rede Wi-Fi para começar", foreground=self.colors['info'])
 
     def on_wifi_changed(self, event):
         selected = self.combo_wifi.get()
@@ -581,6 +1019,10 @@ class WifiMapApp:
             self.update_tree()
             
             self.ssid_selecionado = selected
+            self.signal_filter.reset()
+            self._start_journal()
+            self._journal_append({'type': 'session', 'ssid': selected, 'floorplan': self.floorplan_path,
+                                  'filter': self.signal_filter.config()})
             self.enable_controls()
             self.status_label.config(text=f"Rede selecionada: {self.ssid_selecionado} - Digite o nome do local e clique nos pontos para medir",
                                    foreground=self.colors['success'])
@@ -589,6 +1031,54 @@ class WifiMapApp:
     def on_local_changed(self, event):
         pass
 
+    def on_filter_changed(self, event=None):
+        self.signal_filter = SignalFilterBank(FILTER_OPTIONS[self.combo_filter.get()])
+        self._journal_append({'type': 'filter', 'filter': self.signal_filter.config()})
+        self._refilter_measurements()
+
+    def _set_filter(self, config):
+        self.signal_filter = SignalFilterBank.from_config(config)
+        for label, kind in FILTER_OPTIONS.items():
+            if kind == self.signal_filter.kind:
+                self.combo_filter.set(label)
+
+    def _filter_reading(self, sig, aps):
+        # Estágio entre o scanner e as amostras de caminhada, que formam um fluxo contínuo no espaço;
+        # pontos isolados não passam aqui. Devolve (dBm filtrado, APs filtrados, dBm bruto ou None)
+        filtered_sig, filtered_aps = self.signal_filter.apply(sig, aps)
+        raw = sig if self.signal_filter.enabled and sig is not None else None
+        return filtered_sig, filtered_aps, raw
+
+    @metrics.timed('app.refilter')
+    def _refilter_measurements(self):
+        # Reaplica o filtro às leituras brutas das caminhadas, um trajeto por vez na ordem da coleta.
+        # Pontos clicados e do modo grade nunca são filtrados, então não há o que refazer neles
+        walks = {}
+        for name in self.measurements:
+            if name.startswith("Trajeto "):
+                walks.setdefault(name.split('.')[0], []).append(name)
+        if not walks:
+            return
+
+        samples = (sample for names in walks.values()
+                   for sample in replay(raw_samples({name: self.measurements[name] for name in names}),
+                                        self.signal_filter))
+        for point_name, sig, aps in samples:
+            measurement = self.measurements[point_name]
+            raw = measurement.pop('dbm_raw', measurement['dbm'])
+            measurement['dbm'] = "N/A" if sig is None else sig
+            measurement['percent'] = 0 if sig is None else signal_dbm_to_percent(sig)
+            if aps:
+                measurement['aps'] = aps
+            if self.signal_filter.enabled and raw != "N/A":
+                measurement['dbm_raw'] = raw
+            self._journal_point(point_name, measurement)
+
+            if point_name in self.walk_markers and sig is not None:
+                self.canvas.itemconfig(self.walk_markers[point_name][0], fill=DBM_PALETTE.color_for(sig))
+
+        self.dispatcher.invalidate('tree', self.update_points_tree)
+
     def create_point_grid(self):
         for widget in self.point_labels.values():
             widget.destroy()
@@ -674,13 +1164,13 @@ class WifiMapApp:
         self.root.update()
 
         def scan_thread():
-            sig = self.scanner.scan_once(self.ssid_selecionado)
-            self.root.after(0, lambda: self.update_measurement_result_auto(local, ponto, sig, button))
+            sig, aps = self.scanner.scan_detailed(self.ssid_selecionado)
+            self.dispatcher.post(self.update_measurement_result_auto, local, ponto, sig, button, aps)
 
         thread = threading.Thread(target=scan_thread, daemon=True)
         thread.start()
 
-    def update_measurement_result_auto(self, local, ponto, sig, button):
+    def update_measurement_result_auto(self, local, ponto, sig, button, aps=None):
         timestamp = time.strftime("%H:%M:%S")
         
         if sig is None:
@@ -695,19 +1185,25 @@ class WifiMapApp:
             'percent': pct,
             'timestamp': timestamp
         }
-        self.measurements[local][ponto] = measurement
+        if aps:
+            measurement['aps'] = aps
+        self.measurements.setdefault(local, {})[ponto] = measurement
+        self._journal_append({'type': 'grid_point', 'local': local, 'name': ponto, 'dbm': dbm_str,
+                              'percent': pct, 'timestamp': timestamp, 'aps': aps or {}})
 
         self.update_point_button(button, ponto, measurement)
         
-        self.update_tree()
+        self.dispatcher.invalidate('tree', self.update_tree)
 
-        points_measured = len(self.measurements[local])
-        if points_measured == 16:
-            self.status_label.config(text=f"{local}: Todos os 16 pontos medidos! Pronto para gerar mapa de calor", 
-                                   foreground=self.colors['success'])
-        else:
-            self.status_label.config(text=f"{local}: {points_measured}/16 pontos medidos - Continue clicando nos pontos restantes", 
-                                   foreground=self.colors['primary'])
+        def update_status():
+            points_measured = len(self.measurements[local])
+            if points_measured == 16:
+                self.status_label.config(text=f"{local}: Todos os 16 pontos medidos! Pronto para gerar mapa de calor", 
+                                       foreground=self.colors['success'])
+            else:
+                self.status_label.config(text=f"{local}: {points_measured}/16 pontos medidos - Continue clicando nos pontos restantes", 
+                                       foreground=self.colors['primary'])
+        self.dispatcher.invalidate('status', update_status)
 
     def update_point_grid_buttons(self):
         local_name = self.local_name_var.get().strip()
@@ -736,6 +1232,8 @@ class WifiMapApp:
     def update_tree(self):
         for item in self.tree.get_children():
             self.tree.delete(item)
+        self._tree_items.clear()
+        self._walk_rows.clear()
 
         local_name = self.local_name_var.get().strip() or "Local"
         if local_name in self.measurements:
@@ -748,8 +1246,8 @@ class WifiMapApp:
     def clear_all(self):
         if messagebox.askyesno("Limpar Tudo", "Tem certeza que deseja limpar TODOS os dados?\n\nIsso irá remover:\n• Todos os pontos marcados\n• A imagem carregada\n• Todas as medições\n\nEsta ação não pode ser desfeita."):
             self.floorplan_image = None
-            self.floorplan_photo = None
             self.floorplan_path = None
+            self.viewer.clear()
             
             for outline_id, circle_id, text_id in self.canvas_points.values():
                 self.canvas.delete(outline_id)
@@ -757,8 +1255,11 @@ class WifiMapApp:
                 self.canvas.delete(text_id)
             
             self.image_points.clear()
+            self._clear_suggestion()
+            self._clear_walk()
             self.canvas_points.clear()
             self.measurements.clear()
+            self._journal_append({'type': 'clear', 'floorplan': True})
             
             self.canvas.delete("all")
             self.canvas.create_text(300, 200, text="Clique em 'Carregar Imagem' para começar",
@@ -774,8 +1275,14 @@ class WifiMapApp:
                                        foreground=self.colors['warning'])
 
     def show_heatmap(self):
-        self.heatmap_generator.generate_heatmap(self.measurements, self.ssid_selecionado, 
-                                              self.floorplan_path)
+        # Modo grade: local -> ponto -> medição, um mapa do prédio com todos os locais
+        grid_locations = {local: points for local, points in self.measurements.items() if 'dbm' not in points}
+        if grid_locations and len(grid_locations) == len(self.measurements):
+            self.heatmap_generator.generate_building_heatmap(grid_locations, self.ssid_selecionado)
+        else:
+            self.heatmap_generator.interpolation_mode = INTERPOLATION_OPTIONS[self.combo_interpolation.get()]
+            self.heatmap_generator.generate_heatmap(self.measurements, self.ssid_selecionado, 
+                                                  self.floorplan_path)
         self.btn_save.config(state='normal')
 
     def save_heatmap_and_data(self):
@@ -797,29 +1304,285 @@ class WifiMapApp:
                 return
             
             png_path = file_path
-            self.heatmap_generator.save_heatmap_image(png_path)
-            
             json_path = file_path.replace('.png', '.json')
-            self.save_measurements_json(json_path)
-            
-            self.status_label.config(
-                text=f"Arquivos salvos com sucesso!\nPNG: {os.path.basename(png_path)}\nJSON: {os.path.basename(json_path)}",
-                foreground=self.colors['success']
-            )
+            header, items = self._measurements_json_parts()
+            # A figura é copiada aqui, na thread do Tk; a renderização da cópia roda na exportação
+            snapshot = self.heatmap_generator.snapshot_heatmap()
+
+            def export(job):
+                job.report(0.0, "Salvando imagem")
+                self.heatmap_generator.save_heatmap_image(png_path, snapshot)
+                job.report(0.5, "Salvando dados")
+                write_json_stream(None, json_path, header, "measurements", items, len(items))
+
+            job = ExportJob(export).start()
+            self.btn_save.config(state='disabled')
+
+            def poll():
+                if not job.done:
+                    self.status_label.config(text=f"{job.message}...", foreground=self.colors['warning'])
+                    self.root.after(100, poll)
+                    return
+                self.btn_save.config(state='normal')
+                if job.error is not None:
+                    messagebox.showerror("Erro ao Salvar", f"Ocorreu um erro ao salvar os arquivos:\n{str(job.error)}")
+                    self.status_label.config(text="Erro ao salvar arquivos", foreground=self.colors['danger'])
+                else:
+                    self.status_label.config(
+                        text=f"Arquivos salvos com sucesso!\nPNG: {os.path.basename(png_path)}\nJSON: {os.path.basename(json_path)}",
+                        foreground=self.colors['success']
+                    )
+
+            poll()
             
         except Exception as e:
             messagebox.showerror("Erro ao Salvar", f"Ocorreu um erro ao salvar os arquivos:\n{str(e)}")
             self.status_label.config(text="Erro ao salvar arquivos", foreground=self.colors['error'])
 
-    def save_measurements_json(self, file_path):
-        import json
-        
-        data_to_save = {
+    def export_report(self):
+        if not self.measurements or not self.ssid_selecionado:
+            messagebox.showwarning("Aviso", "Não há dados para o relatório.")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF files", "*.pdf")],
+            title="Salvar Relatório"
+        )
+        if not file_path:
+            return
+
+        comparison = None
+        if messagebox.askyesno("Relatório", "Incluir comparação com uma sessão salva?"):
+            filename = filedialog.askopenfilename(
+                title="Sessão para comparar",
+                filetypes=[('Sessões', '*.jsonl *.json *.npz'), ('Todos os arquivos', '*.*')]
+            )
+            if filename:
+                before = self._read_session_points(filename)
+                if before is None:
+                    return
+                comparison = (before, os.path.basename(filename))
+
+        floorplan = bool(self.floorplan_path) and messagebox.askyesno(
+            "Relatório", "Desenhar a planta ao fundo de cada página?\n"
+                         "O arquivo fica maior e a memória usada cresce com o número de páginas.")
+
+        from core.report import REPORT_WORKERS, write_report
+        pages = self.heatmap_generator.report_pages(self.measurements, self.ssid_selecionado,
+                                                    self.floorplan_path, comparison, floorplan=floorplan)
+        if not pages:
+            messagebox.showwarning("Aviso", "É necessário pelo menos 3 pontos medidos para o relatório")
+            return
+
+        job = ExportJob(write_report, file_path, pages, len(pages), workers=REPORT_WORKERS,
+                        metadata={'Title': f"Levantamento Wi-Fi - {self.ssid_selecionado}"}).start()
+        self.btn_report.config(state='disabled')
+
+        def poll():
+            if not job.done:
+                self.status_label.config(text=f"{job.message}...", foreground=self.colors['warning'])
+                self.root.after(100, poll)
+                return
+            self.btn_report.config(state='normal')
+            if job.error is not None:
+                messagebox.showerror("Erro", f"Erro ao gerar relatório: {str(job.error)}")
+                self.status_label.config(text="Erro ao gerar relatório", foreground=self.colors['danger'])
+            else:
+                self.status_label.config(text=f"Relatório salvo: {os.path.basename(file_path)} ({len(pages)} páginas)",
+                                         foreground=self.colors['success'])
+
+        poll()
+
+    def _measurements_json_parts(self):
+        header = {
             "ssid": self.ssid_selecionado,
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "measurements": self.measurements,
             "floorplan": self.floorplan_path if self.floorplan_path else None
         }
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data_to_save, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+        # Cópia rasa para a thread de exportação não iterar o dicionário enquanto ele muda
+        return header, list(self.measurements.items())
+
+    def save_measurements_json(self, file_path):
+        header, items = self._measurements_json_parts()
+        write_json_stream(None, file_path, header, "measurements", items, len(items))
+
+    def _start_journal(self, path=None):
+        self._close_journal()
+        try:
+            self.journal = SurveyJournal(path or new_journal_path())
+        except OSError as e:
+            print(f"Aviso: não foi possível criar o diário da sessão: {e}")
+            self.journal = None
+
+    def _journal_append(self, record):
+        if self.journal:
+            self.journal.append(record)
+
+    def _journal_point(self, point_name, measurement):
+        self._journal_append({'type': 'point', 'name': point_name, 'dbm': measurement['dbm'],
+                              'percent': measurement['percent'], 'timestamp': measurement['timestamp'],
+                              'coordinates': list(measurement['coordinates']), 'aps': measurement.get('aps', {}),
+                              'dbm_raw': measurement.get('dbm_raw')})
+
+    def _close_journal(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def show_metrics(self):
+        from gui.metrics_view import show_metrics_window
+        from core.grid_cache import grid_cache
+        show_metrics_window(self.root, extra_stats=lambda: {
+            **{f'ui.dispatcher.{name}': value for name, value in self.dispatcher.stats().items()},
+            **{f'grid_cache.{name}': value for name, value in grid_cache.stats().items()},
+        })
+
+    def on_close(self):
+        if self.walk_recorder is not None:
+            self.walk_recorder.stop()
+        self.dispatcher.stop()
+        self._close_journal()
+        self.root.destroy()
+
+    def open_session(self):
+        journal_dir = default_journal_dir()
+        filename = filedialog.askopenfilename(
+            title="Abrir sessão",
+            initialdir=journal_dir if os.path.isdir(journal_dir) else None,
+            filetypes=[
+                ('Sessões', '*.jsonl *.json *.npz'),
+                ('Diário de sessão', '*.jsonl'),
+                ('JSON', '*.json'),
+                ('Sessão compacta', '*.npz'),
+                ('Todos os arquivos', '*.*')
+            ]
+        )
+        if not filename:
+            return
+
+        if filename.lower().endswith('.jsonl'):
+            self.resume_session(filename)
+            return
+
+        from core.session import load_session
+        try:
+            survey = load_session(filename)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao ler sessão: {str(e)}")
+            return
+
+        self.restore_session(survey)
+
+        # Nova sessão no diário: os pontos carregados vão uma vez para a base em .npz e o
+        # diário guarda só a referência, sem regravar ponto a ponto
+        self._start_journal()
+        self._journal_append({'type': 'session', 'ssid': survey.ssid, 'floorplan': self.floorplan_path})
+        if self.journal and len(survey):
+            from core.session import save_session_npz
+            try:
+                save_session_npz(base_path(self.journal.path), survey)
+                self._journal_append({'type': 'base', 'path': os.path.basename(base_path(self.journal.path))})
+            except OSError as e:
+                print(f"Aviso: não foi possível gravar a base da sessão: {e}")
+
+        self.status_label.config(text=f"Sessão carregada: {len(survey)} pontos - {os.path.basename(filename)}",
+                               foreground=self.colors['success'])
+
+    def resume_session(self, filename):
+        try:
+            session = load_journal(filename)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao ler sessão: {str(e)}")
+            return
+
+        from core.session import journal_survey
+        survey = journal_survey(session)
+        # Reconstrói o estado sem gravar nada: os registros já estão no diário
+        self.restore_session(survey)
+        self._set_filter(session['filter'])
+        # Continua gravando no mesmo diário, a partir do fim
+        self._start_journal(filename)
+
+        self.status_label.config(text=f"Sessão retomada: {len(survey)} pontos - {os.path.basename(filename)}",
+                               foreground=self.colors['success'])
+
+    def save_session_file(self):
+        if not self.measurements:
+            messagebox.showwarning("Aviso", "Não há dados para salvar.")
+            return
+
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".npz",
+            filetypes=[("Sessão compacta", "*.npz"), ("JSON files", "*.json")],
+            title="Salvar Sessão"
+        )
+        if not filename:
+            return
+
+        from core.session import SurveyArrays, save_session
+        try:
+            survey = SurveyArrays.from_measurements(self.measurements, ssid=self.ssid_selecionado,
+                                                    floorplan=self.floorplan_path)
+            save_session(filename, survey)
+            self.status_label.config(text=f"Sessão salva: {os.path.basename(filename)}",
+                                   foreground=self.colors['success'])
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao salvar sessão: {str(e)}")
+
+    @metrics.timed('app.restore_session')
+    def restore_session(self, survey):
+        from core.session import SurveyMeasurements
+        for outline_id, circle_id, text_id in self.canvas_points.values():
+            self.canvas.delete(outline_id)
+            self.canvas.delete(circle_id)
+            self.canvas.delete(text_id)
+        self.image_points.clear()
+        self._clear_suggestion()
+        self._clear_walk()
+        self.canvas_points.clear()
+
+        if survey.ssid:
+            values = list(self.combo_wifi['values'])
+            if survey.ssid not in values:
+                self.combo_wifi['values'] = values + [survey.ssid]
+            self.combo_wifi.set(survey.ssid)
+            self.ssid_selecionado = survey.ssid
+            self.enable_controls()
+
+        if survey.floorplan and os.path.exists(survey.floorplan):
+            try:
+                self.floorplan_image = Image.open(survey.floorplan)
+                self.floorplan_path = survey.floorplan
+                self.canvas.delete("all")
+                self._clear_suggestion()
+                self._clear_walk()
+                self.viewer.set_image(self.floorplan_image)
+            except Exception as e:
+                print(f"Aviso: Não foi possível carregar a planta da sessão: {e}")
+
+        # As medições continuam nas colunas da sessão; cada dicionário só é montado quando usado
+        self.measurements = SurveyMeasurements(survey)
+        self._draw_survey_points(survey)
+        self.dispatcher.invalidate('tree', self.update_points_tree)
+
+    def _draw_survey_points(self, survey):
+        # Cores de todos os pontos numa única consulta à paleta, sem o gradiente de vizinhança
+        # ponto a ponto; amostras de caminhada voltam como marcadores de trajeto
+        colors = DBM_PALETTE.colors_for(survey.dbm).tolist()
+        for point_name, x, y, dbm, color in zip(survey.names.tolist(), survey.x.tolist(), survey.y.tolist(),
+                                                survey.dbm.tolist(), colors):
+            x = int(x) if x.is_integer() else x
+            y = int(y) if y.is_integer() else y
+            measured = dbm == dbm
+            if point_name.startswith("Trajeto "):
+                cx, cy = self.viewer.image_to_canvas(x, y)
+                item_id = self.canvas.create_oval(cx-4, cy-4, cx+4, cy+4, fill=color if measured else 'gray',
+                                                  outline='', tags='walk')
+                self.walk_markers[point_name] = (item_id, x, y)
+                continue
+            self.image_points[point_name] = (x, y)
+            if measured:
+                self._draw_point_marker(point_name, x, y, f"{round(dbm, 1):g}", color)
+            else:
+                self._draw_point_marker(point_name, x, y, point_name.split()[-1])
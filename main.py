@@ -1,16 +1,27 @@
+import os
 import tkinter as tk
-from gui.wifi_app import WifiMapApp
+
+from core.startup import profiler
 
 def main():
     """Função principal"""
-    try:
-        import matplotlib
-        matplotlib.use('TkAgg')
-    except ImportError:
-        print("Aviso: matplotlib não encontrado. Instale com: pip install matplotlib")
-    
-    root = tk.Tk()
-    app = WifiMapApp(root)
+    # O matplotlib só é importado quando o primeiro mapa é gerado
+    os.environ.setdefault('MPLBACKEND', 'TkAgg')
+
+    with profiler.phase("import gui.wifi_app"):
+        from gui.wifi_app import WifiMapApp
+
+    with profiler.phase("tk.Tk()"):
+        root = tk.Tk()
+
+    with profiler.phase("WifiMapApp()"):
+        app = WifiMapApp(root, warm_up=os.environ.get('WIFI_MAPA_WARMUP', '1') != '0')
+
+    def first_frame():
+        profiler.mark("primeiro quadro")
+        profiler.print_report()
+
+    root.after_idle(first_frame)
     root.mainloop()
 
 if __name__ == "__main__":